@@ -0,0 +1,86 @@
+"""Benchmark the 33120A driver against the fake SCPI device.
+
+Compares per-attribute and compound reads, per-attribute and batched
+writes, and the cost of reading the error queue, over a few simulated
+buses. Run from the repository root with the application directory on the
+path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_agilent33120a.py
+"""
+import time
+
+from hardware.base_instruments import Instrument
+from hardware.fake_scpi import FakeResourceManager
+from hardware.signal_generator import Agilent33120ASignalGenerator
+
+CHANNEL = (0, 'carrier')
+SETTINGS = {'shape': 'square', 'frequency': 2e3, 'amplitude': 0.5,
+            'offset': 0.1, 'phase': 0}
+
+# name: options for FakeResource
+BUSES = {'no latency': {},
+         'LAN, 1 ms': {'latency': 1e-3, 'jitter': 2e-4},
+         'GPIB, 3 ms': {'latency': 3e-3, 'jitter': 5e-4},
+         'RS-232 9600': {'latency': 2e-3, 'jitter': 5e-4,
+                         'bytes_per_second': 960}}
+
+
+def per_attribute_details(sig_gen):
+    """Read channel details the old way, one query per attribute."""
+    Instrument.get_channel_attributes(sig_gen, CHANNEL, sig_gen.ch_out_attrs)
+
+
+def compound_details(sig_gen):
+    sig_gen.channel_details(CHANNEL)
+
+
+def per_attribute_configure(sig_gen):
+    """Write each attribute separately, then check for errors."""
+    for name, value in SETTINGS.items():
+        sig_gen.set_channel_attribute(CHANNEL, name, value)
+    sig_gen.get_errors()
+
+
+def batched_configure(sig_gen):
+    sig_gen.configure_channel(CHANNEL, **SETTINGS)
+
+
+def bad_configure(sig_gen):
+    """Batched write that fails and leaves an entry in the error queue."""
+    sig_gen.configure_channel(CHANNEL, frequency=1e9)
+    sig_gen.clear_errors()
+
+
+CASES = (('details, per-attribute', per_attribute_details),
+         ('details, compound', compound_details),
+         ('configure, per-attribute', per_attribute_configure),
+         ('configure, batched', batched_configure),
+         ('configure, with error', bad_configure))
+
+
+def run(func, bus_options, repeats):
+    rm = FakeResourceManager(seed=0, **bus_options)
+    sig_gen = Agilent33120ASignalGenerator('FAKE::33120A', rm)
+    resource = rm.resources['FAKE::33120A']
+
+    transactions = resource.transactions
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        func(sig_gen)
+    elapsed = time.perf_counter() - t0
+
+    return (elapsed / repeats,
+            (resource.transactions - transactions) / repeats)
+
+
+def main(repeats=20):
+    print(f'{"bus":>12} {"case":>25} {"time/call":>12} {"round trips":>12}')
+    for bus, options in BUSES.items():
+        for name, func in CASES:
+            per_call, trips = run(func, options, repeats)
+            print(f'{bus:>12} {name:>25} '
+                  f'{per_call * 1e3:>10.3f}ms {trips:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
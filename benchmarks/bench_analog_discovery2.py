@@ -0,0 +1,104 @@
+"""Benchmark the Analog Discovery 2 drivers against the simulated device.
+
+Measures acquisition throughput of the oscilloscope for a few capture
+sizes, samples lost while streaming at a few rates, and the rate of control
+calls for the signal generator, servo and stepper. Run from the repository
+root with the application directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_analog_discovery2.py
+"""
+import asyncio
+import time
+
+from hardware import simulated_dwf
+simulated_dwf.install()
+
+import dwf
+from hardware.oscilloscope import AnalogDiscovery2Oscilloscope
+from hardware.servo import AnalogDiscovery2Servo
+from hardware.signal_generator import AnalogDiscovery2SignalGenerator
+from hardware.stepper import AnalogDiscovery2Stepper
+
+# (buffer size, sampling rate)
+CAPTURES = ((1000, 10e6), (8192, 10e6), (8192, 100e6))
+STREAM_RATES = (100e3, 1e6, 4e6)
+
+
+def acquire(hdwf, buffer_size, sampling_rate, repeats):
+    sig_gen = AnalogDiscovery2SignalGenerator(hdwf)
+    sig_gen.configure_channel((0, 'carrier'), enabled=True,
+                              shape='sinusoid', frequency=1e5, amplitude=1)
+    sig_gen.run()
+
+    scope = AnalogDiscovery2Oscilloscope(hdwf)
+    for c in scope.input_ids:
+        scope.get_channel(c).enabled = True
+    scope.buffer_size = buffer_size
+    scope.sampling_rate = sampling_rate
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        scope.arm()
+        scope.get_data()
+    return (time.perf_counter() - t0) / repeats
+
+
+def stream(hdwf, sampling_rate, duration=1.0):
+    scope = AnalogDiscovery2Oscilloscope(hdwf)
+    for c in scope.input_ids:
+        scope.get_channel(c).enabled = True
+    scope.buffer_size = 8192
+    scope.sampling_rate = sampling_rate
+
+    received = lost = 0
+    for chunk in scope.stream(duration=duration):
+        received += chunk.data.shape[1]
+        lost += chunk.lost
+    return received, lost
+
+
+def control(hdwf, repeats):
+    sig_gen = AnalogDiscovery2SignalGenerator(hdwf)
+    servo = AnalogDiscovery2Servo(hdwf, 2)
+    stepper = AnalogDiscovery2Stepper(hdwf, range(4, 8), step_time=0)
+
+    cases = {'sig gen configure':
+             lambda i: sig_gen.configure_channel(
+                 (0, 'carrier'), frequency=1e3 + i, amplitude=1),
+             'sig gen details':
+             lambda i: sig_gen.channel_details((0, 'carrier')),
+             'servo move': lambda i: servo.set_position(i % 160 - 80),
+             'stepper step': lambda i: asyncio.run(stepper.step_async(1))}
+
+    results = {}
+    for name, func in cases.items():
+        t0 = time.perf_counter()
+        for i in range(repeats):
+            func(i)
+        results[name] = (time.perf_counter() - t0) / repeats
+    return results
+
+
+def main(repeats=10):
+    hdwf = dwf.Dwf()
+    print(f'{"capture":>22} {"time/capture":>14} {"samples/s":>12}')
+    for buffer_size, sampling_rate in CAPTURES:
+        per_capture = acquire(hdwf, buffer_size, sampling_rate, repeats)
+        name = f'{buffer_size} @ {sampling_rate / 1e6:g} MS/s'
+        print(f'{name:>22} {per_capture * 1e3:>12.3f}ms '
+              f'{2 * buffer_size / per_capture:>12.3g}')
+
+    print(f'\n{"stream, 1 s":>22} {"received":>14} {"lost":>12}')
+    for sampling_rate in STREAM_RATES:
+        received, lost = stream(hdwf, sampling_rate)
+        name = f'{sampling_rate / 1e6:g} MS/s'
+        print(f'{name:>22} {received:>14} {lost:>12}')
+
+    print(f'\n{"control":>22} {"time/call":>14}')
+    for name, per_call in control(hdwf, 10 * repeats).items():
+        print(f'{name:>22} {per_call * 1e3:>12.3f}ms')
+    hdwf.close()
+
+
+if __name__ == '__main__':
+    main()
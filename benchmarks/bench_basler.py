@@ -0,0 +1,67 @@
+"""Benchmark sustained frame rates of the Basler camera driver.
+
+Grabs for a few seconds with each grab strategy, pulling frames with `read`
+and pushing them to a callback, and reports frames per second and frames
+skipped. Without a camera attached pylon's emulated camera is used. Run
+from the repository root with the application directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_basler.py
+"""
+import os
+import time
+
+os.environ.setdefault('PYLON_CAMEMU', '1')
+
+from hardware.basler import BaslerAPI
+
+STRATEGIES = ('one_by_one', 'latest_image_only', 'latest_images')
+BUFFER_MODES = ('copy', 'pool')
+
+
+def pull(camera, duration):
+    frames = 0
+    camera.start()
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        image = camera.read(1000)
+        if image is not None:
+            camera.release(image)
+            frames += 1
+    elapsed = time.perf_counter() - t0
+    camera.stop()
+    return frames / elapsed
+
+
+def push(camera, duration):
+    frames = []
+
+    def count(image):
+        frames.append(None)
+        camera.release(image)
+
+    camera.start(callback=count)
+    t0 = time.perf_counter()
+    time.sleep(duration)
+    camera.stop()
+    return len(frames) / (time.perf_counter() - t0)
+
+
+def main(duration=3.0):
+    api = BaslerAPI()
+    print(f'{"strategy":>20} {"buffers":>8} {"mode":>6} '
+          f'{"read fps":>10} {"callback fps":>13} {"skipped":>8}')
+    for strategy in STRATEGIES:
+        for buffer_mode in BUFFER_MODES:
+            camera = api.get_camera(grab_strategy=strategy,
+                                    buffer_mode=buffer_mode,
+                                    max_num_buffer=16)
+            read_fps = pull(camera, duration)
+            skipped = camera.skipped
+            callback_fps = push(camera, duration)
+            print(f'{strategy:>20} {camera.max_num_buffer:>8} '
+                  f'{buffer_mode:>6} {read_fps:>10.1f} {callback_fps:>13.1f} '
+                  f'{skipped:>8}')
+
+
+if __name__ == '__main__':
+    main()
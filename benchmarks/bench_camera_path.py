@@ -0,0 +1,63 @@
+"""Benchmark the camera path end to end with the simulated camera.
+
+A `DummyCamera` paced at a target frame rate feeds a `FrameGrabber`; the
+consumer downsamples every frame for display, records it raw and submits
+it to a centroid pipeline. Reports the frame rate reached and the frames
+lost at each step. Run from the repository root with the application
+directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_camera_path.py
+"""
+import os
+import tempfile
+import time
+
+from analysis.frame_pipeline import FramePipeline, centroid
+from hardware.dummy_instrument import DummyCamera
+from hardware.frame_grabber import FrameGrabber
+from storage.recorder import Recorder
+
+# (width, height, frames per second)
+CASES = ((640, 480, 200), (1920, 1200, 30), (1920, 1200, 100))
+
+
+def run(directory, width, height, frame_rate, duration=3.0):
+    camera = DummyCamera(width, height, frame_rate=frame_rate)
+    recorder = Recorder(os.path.join(directory, f'{width}_{frame_rate}.raw'))
+    pipeline = FramePipeline(block=False)
+    pipeline.register(centroid)
+
+    frames = 0
+    with FrameGrabber(camera, read_timeout=100) as grabber, recorder, \
+            pipeline:
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < duration:
+            frame = grabber.get(timeout=1)
+            # downsample for display
+            frame.image[::4, ::4].copy()
+            recorder.write(frame.image, frame.timestamp)
+            pipeline.submit(frame.image, frame.timestamp)
+            try:
+                while pipeline.pending:
+                    pipeline.get(timeout=0)
+            except TimeoutError:
+                pass
+            frames += 1
+        elapsed = time.perf_counter() - t0
+    return (frames / elapsed, camera.skipped, grabber.stats.dropped,
+            recorder.stats.dropped, pipeline.dropped)
+
+
+def main():
+    print(f'{"camera":>18} {"fps":>8} {"skipped":>8} {"grabber":>8} '
+          f'{"recorder":>9} {"pipeline":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height, frame_rate in CASES:
+            fps, *lost = run(directory, width, height, frame_rate)
+            name = f'{width}x{height}@{frame_rate}'
+            print(f'{name:>18} {fps:>8.1f} {lost[0]:>8} {lost[1]:>8} '
+                  f'{lost[2]:>9} {lost[3]:>9}')
+
+
+if __name__ == '__main__':
+    main()
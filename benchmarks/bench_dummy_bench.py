@@ -0,0 +1,47 @@
+"""Benchmark frequency sweeps on the simulated bench.
+
+Measures the time per sweep point, capture plus measurements, for a few
+capture sizes with and without AM and a filter on the connection. Run
+from the repository root with the application directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_dummy_bench.py
+"""
+import time
+
+import numpy as np
+
+from hardware.dummy_bench import DummyBench
+
+BUFFER_SIZES = (1000, 10000, 100000)
+FREQUENCIES = np.geomspace(1e2, 1e5, 50)
+
+
+def sweep(buffer_size, am=False, bandwidth=None):
+    bench = DummyBench()
+    bench.scope.buffer_size = buffer_size
+    bench.sig_gen.configure_channel((0, 'carrier'), enabled=True,
+                                    shape='sine', amplitude=1.0)
+    bench.sig_gen.configure_channel((0, 'am'), enabled=am, shape='sine',
+                                    frequency=50, amplitude=20)
+    bench.wire(0, 0, bandwidth=bandwidth)
+    bench.wire(1, {0: 0.5}, bandwidth=bandwidth)
+
+    t0 = time.perf_counter()
+    bench.sweep(FREQUENCIES)
+    return (time.perf_counter() - t0) / len(FREQUENCIES)
+
+
+def main():
+    cases = {'plain': {}, 'am': {'am': True},
+             'am + filter': {'am': True, 'bandwidth': 10e3}}
+    print(f'{"sweep point":>22} {"time/point":>14} {"samples/s":>12}')
+    for buffer_size in BUFFER_SIZES:
+        for name, options in cases.items():
+            per_point = sweep(buffer_size, **options)
+            label = f'{buffer_size}, {name}'
+            print(f'{label:>22} {per_point * 1e3:>12.3f}ms '
+                  f'{2 * buffer_size / per_point:>12.3g}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark the frame processing pipeline against the number of workers.
+
+Feeds 1920x1200 frames with a moving spot through threshold, blob
+detection and centroid stages, and reports frames per second and latency
+for 1 up to the number of cores. Run from the repository root with the
+application directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_frame_pipeline.py
+"""
+import os
+import time
+
+import numpy as np
+
+from analysis.frame_pipeline import FramePipeline, blobs, centroid, threshold
+
+SHAPE = (1200, 1920)
+
+
+def make_frames(num_frames=8):
+    y, x = np.indices(SHAPE)
+    frames = []
+    for i in range(num_frames):
+        row, column = 300 + 50 * i, 400 + 100 * i
+        spot = 200 * np.exp(-((y - row) ** 2 + (x - column) ** 2) / 200)
+        frames.append(spot.astype(np.uint8))
+    return frames
+
+
+def run(frames, workers, num_frames=200):
+    with FramePipeline(workers=workers) as pipeline:
+        pipeline.register(threshold, output=False, level=100)
+        pipeline.register(blobs, source='threshold')
+        pipeline.register(centroid)
+        t0 = time.perf_counter()
+        for i in range(num_frames):
+            pipeline.submit(frames[i % len(frames)])
+            while pipeline.pending > 2 * workers:
+                pipeline.get()
+        list(pipeline)
+        elapsed = time.perf_counter() - t0
+        return num_frames / elapsed, pipeline.stats
+
+
+def main():
+    frames = make_frames()
+    print(f'{"workers":>8} {"fps":>8} {"queue":>10} {"blobs":>10} '
+          f'{"centroid":>10} {"total":>10}')
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        fps, stats = run(frames, workers)
+        latencies = ' '.join(f'{stats[s].mean * 1e3:>8.2f}ms' for s in
+                             ('queue', 'blobs', 'centroid', 'total'))
+        print(f'{workers:>8} {fps:>8.1f} {latencies}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark recording of camera-sized frames.
+
+Writes 1920x1200 mono frames as fast as the caller can produce them and
+reports the rate `write` accepts frames at, the rate they reach the disk,
+and the frames dropped when not blocking. Run from the repository root with
+the application directory on the path:
+
+    PYTHONPATH=patchbay python benchmarks/bench_recorder.py
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from storage.recorder import Recorder
+
+SHAPE = (1200, 1920)
+CASES = (('raw', False), ('raw', True), ('video', True))
+
+
+def record(path, file_format, block, num_frames=300):
+    frames = [np.random.default_rng(i).integers(0, 255, SHAPE, np.uint8)
+              for i in range(4)]
+    recorder = Recorder(path, file_format=file_format, block=block, slots=32)
+    t0 = time.perf_counter()
+    for i in range(num_frames):
+        recorder.write(frames[i % len(frames)])
+    accepted = time.perf_counter() - t0
+    recorder.close()
+    total = time.perf_counter() - t0
+    return num_frames / accepted, recorder.stats.recorded / total, \
+        recorder.stats.dropped
+
+
+def main():
+    print(f'{"recording":>14} {"write fps":>10} {"disk fps":>10} '
+          f'{"dropped":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format, block in CASES:
+            suffix = '.avi' if file_format == 'video' else '.raw'
+            path = os.path.join(directory, f'{file_format}{block}{suffix}')
+            write_fps, disk_fps, dropped = record(path, file_format, block)
+            name = f'{file_format}, {"block" if block else "drop"}'
+            print(f'{name:>14} {write_fps:>10.1f} {disk_fps:>10.1f} '
+                  f'{dropped:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Reduce waveforms to screen resolution for display.
+
+`minmax` reduces samples to the lower and upper envelope of a fixed number
+of bins, which keeps every peak visible. `lttb` picks a subset of samples
+that preserves the visual shape of smooth signals (Largest Triangle Three
+Buckets). `MinMaxPyramid` caches envelopes at several resolutions and can
+be extended as samples stream in, so redrawing any zoomed range costs time
+proportional to the number of pixels rather than the number of samples.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Envelope = namedtuple('Envelope', 'index, lower, upper')
+Envelope.__doc__ = """Min/max envelope of binned samples.
+
+`index` is the sample index of the start of each bin, `lower` and `upper`
+are the smallest and largest sample of each bin.
+"""
+
+
+def _bin_edges(num_samples, num_bins):
+    num_bins = max(1, min(num_bins, num_samples))
+    return np.arange(num_bins) * num_samples // num_bins
+
+
+def minmax(data, num_bins, start=0):
+    """Reduce samples to the min/max envelope of `num_bins` bins.
+
+    Bins differ by at most one sample in size if `num_bins` does not divide
+    the number of samples.
+
+    :param data: array of samples, the last axis is time
+    :param num_bins: number of bins, e.g. the width of the plot in pixels
+    :param start: sample index of the first sample, added to `index`
+    :return: `Envelope`
+    """
+    data = np.asarray(data)
+    edges = _bin_edges(data.shape[-1], num_bins)
+    return Envelope(edges + start,
+                    np.minimum.reduceat(data, edges, axis=-1),
+                    np.maximum.reduceat(data, edges, axis=-1))
+
+
+def lttb(y, num_points, x=None):
+    """Select the samples that best preserve the shape of a waveform.
+
+    Implements Largest Triangle Three Buckets: the first and last samples
+    are kept, and from each of `num_points` - 2 buckets in between the
+    sample that forms the largest triangle with the previously selected
+    sample and the mean of the next bucket.
+
+    :param y: 1D array of samples
+    :param num_points: number of samples to select
+    :param x: sample times, sample indices if not given
+    :return: indices of the selected samples
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if num_points >= n or num_points < 3:
+        return np.arange(n) if num_points >= n else \
+            np.array([0, n - 1][:num_points])
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, float)
+
+    # bucket i covers samples edges[i]:edges[i + 1], excluding both ends
+    edges = 1 + (np.arange(num_points - 1) * (n - 2)) // (num_points - 2)
+    edges[-1] = n - 1
+    sums_x = np.add.reduceat(x[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:-1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    # mean of the following bucket, with the last sample after the last one
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    selected = np.empty(num_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(num_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + area.argmax()
+        selected[i + 1] = a
+    return selected
+
+
+class _Buffer:
+    """1D array that can be extended at amortized constant cost."""
+
+    def __init__(self, dtype=float):
+        self._data = np.empty(1024, dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        return self._data[:self._size]
+
+    def extend(self, values):
+        end = self._size + len(values)
+        if end > len(self._data):
+            data = np.empty(max(end, 2 * len(self._data)), self._data.dtype)
+            data[:self._size] = self.values
+            self._data = data
+        self._data[self._size:end] = values
+        self._size = end
+
+
+class MinMaxPyramid:
+    """Min/max envelopes of a growing record at several resolutions.
+
+    Level k holds the envelope of bins of `base * factor ** k` samples.
+    Samples can be appended while a stream is running; only bins that are
+    complete are added to each level. `envelope` serves any range from the
+    coarsest level that still resolves it, so a redraw reads at most about
+    `factor` times `pixels` values plus a short tail of raw samples.
+
+    Every raw sample is kept as a float64, because zooming in below
+    `base` samples per pixel reads them directly, and the levels add about
+    `2 / (base - base / factor)` of that again. A record therefore costs
+    slightly more than 8 bytes per sample for as long as the pyramid
+    lives, e.g. 8 GB for a billion samples; start a new pyramid or keep
+    only the decimated envelopes for recordings that do not fit in memory.
+
+    :param data: initial samples, optional
+    :param base: samples per bin at the finest level
+    :param factor: ratio of bin sizes between successive levels
+    """
+
+    def __init__(self, data=None, base=64, factor=4):
+        self.base = base
+        self.factor = factor
+        self._samples = _Buffer()
+        # [(lower, upper)] per level
+        self._levels = []
+        if data is not None:
+            self.append(data)
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def samples(self):
+        return self._samples.values
+
+    def bin_size(self, level):
+        return self.base * self.factor ** level
+
+    def append(self, data):
+        """Add samples to the end of the record.
+
+        :param data: 1D array of samples
+        """
+        self._samples.extend(np.asarray(data, dtype=float))
+
+        lower_source = upper_source = self.samples
+        size = self.base
+        level = 0
+        while len(lower_source) >= size:
+            if level == len(self._levels):
+                self._levels.append((_Buffer(), _Buffer()))
+            lower, upper = self._levels[level]
+            done = len(lower) * size
+            complete = len(lower_source) // size * size
+            if complete > done:
+                lower.extend(lower_source[done:complete].reshape(
+                    -1, size).min(axis=1))
+                upper.extend(upper_source[done:complete].reshape(
+                    -1, size).max(axis=1))
+            lower_source, upper_source = lower.values, upper.values
+            size = self.factor
+            level += 1
+
+    def envelope(self, start=0, stop=None, pixels=1000):
+        """Min/max envelope of a range of samples at screen resolution.
+
+        :param start: index of the first sample
+        :param stop: index after the last sample, the end of the record if
+            None
+        :param pixels: maximum number of bins to return
+        :return: `Envelope` with at most `pixels` bins
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(0, start)
+        if stop <= start:
+            return Envelope(np.empty(0, int), np.empty(0), np.empty(0))
+        samples_per_pixel = (stop - start) / pixels
+
+        # coarsest level with bins no larger than a pixel
+        level = -1
+        while (level + 1 < len(self._levels)
+               and self.bin_size(level + 1) <= samples_per_pixel):
+            level += 1
+        if level < 0:
+            return minmax(self.samples[start:stop], pixels, start)
+
+        size = self.bin_size(level)
+        lower, upper = (b.values for b in self._levels[level])
+        first = -(-start // size)
+        last = min(stop // size, len(lower))
+        if last <= first:
+            return minmax(self.samples[start:stop], pixels, start)
+
+        # raw samples before the first and after the last whole bin
+        head = self.samples[start:first * size]
+        tail = self.samples[last * size:stop]
+        num_bins = max(1, pixels - bool(len(head)) - bool(len(tail)))
+        edges = _bin_edges(last - first, num_bins)
+        parts = [Envelope(edges * size + first * size,
+                          np.minimum.reduceat(lower[first:last], edges),
+                          np.maximum.reduceat(upper[first:last], edges))]
+        if len(head):
+            parts.insert(0, Envelope(np.array([start]), np.array([head.min()]),
+                                     np.array([head.max()])))
+        if len(tail):
+            parts.append(Envelope(np.array([last * size]),
+                                  np.array([tail.min()]),
+                                  np.array([tail.max()])))
+        return Envelope(*(np.concatenate(p) for p in zip(*parts)))
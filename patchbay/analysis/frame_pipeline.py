@@ -0,0 +1,311 @@
+"""Process camera frames on several cores.
+
+`FramePipeline` copies each submitted frame into a slot of a ring in
+shared memory and hands the slot number to a pool of worker processes.
+Workers run the registered stages on a view of the slot, so pixel data is
+never pickled; only stage outputs travel back, which should be small
+(centroids, blob lists) rather than whole images.
+
+Stages run in the order they were registered, each on the frame or on the
+output of an earlier stage, e.g. `blobs` on the mask from `threshold`
+while `centroid` runs on the frame itself. Stage functions are sent to
+the workers when the first frame is submitted, so they must be picklable,
+i.e. defined at module level, and must not keep references to the frame.
+
+Results come back in frame order, with the time each frame waited for a
+worker, spent in each stage, and spent in the pipeline in total.
+"""
+import multiprocessing
+import os
+import pickle
+import queue
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.ndimage
+
+from hardware.frame_pool import SharedFrameRing
+
+FrameResult = namedtuple('FrameResult', 'index, timestamp, results')
+FrameResult.__doc__ = """Outputs of the pipeline for one frame.
+
+`index` counts the frames accepted by the pipeline and `results` is a dict
+of {stage name: output} for the stages registered with `output` set.
+"""
+
+LatencyStats = namedtuple('LatencyStats', 'count, mean, max')
+LatencyStats.__doc__ = """Time spent in a pipeline stage, in seconds."""
+
+
+def threshold(image, level):
+    """Mask of the pixels above `level`."""
+    return image > level
+
+
+def centroid(image):
+    """Intensity weighted (row, column) centroid, NaN for a blank image."""
+    total = image.sum(dtype=float)
+    if total == 0:
+        return np.nan, np.nan
+    rows = image.sum(axis=1, dtype=float)
+    columns = image.sum(axis=0, dtype=float)
+    return (rows @ np.arange(len(rows)) / total,
+            columns @ np.arange(len(columns)) / total)
+
+
+BLOB_DTYPE = np.dtype([('row', float), ('column', float), ('area', int)])
+
+
+def blobs(mask, min_area=1):
+    """Connected regions of a mask.
+
+    :param mask: boolean image, e.g. from `threshold`
+    :param min_area: smallest number of pixels of a blob
+    :return: structured array of BLOB_DTYPE, largest blob first
+    """
+    labels, num_labels = scipy.ndimage.label(mask)
+    # only the labelled pixels, which are usually few
+    rows, columns = np.nonzero(labels)
+    pixel_labels = labels[rows, columns]
+    areas = np.bincount(pixel_labels, minlength=num_labels + 1)
+    row_sums = np.bincount(pixel_labels, rows, minlength=num_labels + 1)
+    column_sums = np.bincount(pixel_labels, columns,
+                              minlength=num_labels + 1)
+
+    keep = np.flatnonzero(areas[1:] >= min_area) + 1
+    out = np.empty(len(keep), BLOB_DTYPE)
+    out['area'] = areas[keep]
+    out['row'] = row_sums[keep] / areas[keep]
+    out['column'] = column_sums[keep] / areas[keep]
+    return np.sort(out, order='area')[::-1]
+
+
+def _work(ring_name, shape, dtype, num_slots, stages, tasks, results):
+    """Run the stages on frames listed in `tasks` (worker process)."""
+    ring = SharedFrameRing(num_slots, shape, dtype, name=ring_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, slot, submitted = task
+            timings = {'queue': time.time() - submitted}
+            outputs = {}
+            error = None
+            values = {None: ring.slots[slot]}
+            try:
+                for name, func, kwargs, source, output in stages:
+                    start = time.perf_counter()
+                    values[name] = func(values[source], **kwargs)
+                    timings[name] = time.perf_counter() - start
+                    if output:
+                        outputs[name] = values[name]
+            except Exception as e:
+                error = e
+                try:
+                    pickle.dumps(error)
+                except Exception:
+                    # the queue would drop it and leave the frame pending
+                    error = RuntimeError(repr(e))
+            del values
+            results.put((index, slot, outputs, timings, error))
+    finally:
+        results.close()
+        results.join_thread()
+        ring.close()
+
+
+class FramePipeline:
+    """Run per-frame analysis in a pool of worker processes.
+
+    :param workers: number of worker processes, one per core if None
+    :param slots: number of frames in flight, twice the workers if None
+    :param block: when every slot holds a frame still being analysed,
+        wait up to `timeout` seconds for a worker to finish one rather
+        than drop the new frame
+    :param timeout: seconds to wait for a worker when blocking
+    """
+
+    def __init__(self, workers=None, slots=None, block=True, timeout=1.0):
+        self.num_workers = workers or os.cpu_count()
+        self.num_slots = slots or 2 * self.num_workers
+        self.block = block
+        self.timeout = timeout
+
+        self._stages = []
+        self._latency = {}
+        self._dropped = 0
+        self._ring = None
+        self._workers = None
+        self._reset()
+
+    def _reset(self):
+        """Forget the frames in flight, for a fresh start."""
+        self._next_index = 0
+        self._next_result = 0
+        # index: (submit time, timestamp) of frames in flight
+        self._submitted = {}
+        # index: (FrameResult, error) of frames back from the workers
+        self._ready = {}
+        self._tasks = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return self.results()
+
+    @property
+    def pending(self):
+        """Number of accepted frames whose results were not taken yet."""
+        return self._next_index - self._next_result
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    @property
+    def stats(self):
+        """Dict of {stage: `LatencyStats`}, with 'queue' and 'total'."""
+        return {stage: LatencyStats(count, total / count, longest)
+                for stage, (count, total, longest) in self._latency.items()}
+
+    def register(self, func, name=None, source=None, output=True,
+                 **kwargs):
+        """Add a stage to run on every frame.
+
+        :param func: function of the frame, or of the output of `source`,
+            and `kwargs`
+        :param name: name of the stage, the name of `func` if None
+        :param source: name of an earlier stage whose output `func` takes,
+            the frame if None
+        :param output: return the output of the stage with the results
+        :param kwargs: keyword arguments for `func`
+        """
+        if self._workers is not None:
+            raise RuntimeError('Stages must be registered before the first '
+                               'frame is submitted.')
+        name = func.__name__ if name is None else name
+        names = [stage[0] for stage in self._stages]
+        if name in names:
+            raise ValueError(f'Stage {name!r} is already registered.')
+        if source is not None and source not in names:
+            raise ValueError(f'Unknown source stage {source!r}.')
+        self._stages.append((name, func, kwargs, source, output))
+
+    def _start(self, shape, dtype):
+        self._ring = SharedFrameRing(self.num_slots, shape, dtype)
+        self._workers = [multiprocessing.Process(
+            target=_work, daemon=True, name=f'FramePipeline-{i}',
+            args=(self._ring.name, shape, dtype, self.num_slots,
+                  self._stages, self._tasks, self._results))
+            for i in range(self.num_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def _add_latency(self, stage, seconds):
+        count, total, longest = self._latency.get(stage, (0, 0.0, 0.0))
+        self._latency[stage] = (count + 1, total + seconds,
+                                max(longest, seconds))
+
+    def _collect(self, block=True, timeout=None):
+        """Take one result from the workers, raising queue.Empty if none.
+
+        :return: the slot the frame was in, free again
+        """
+        index, slot, outputs, timings, error = \
+            self._results.get(block, timeout)
+        submitted, timestamp = self._submitted.pop(index)
+        for stage, seconds in timings.items():
+            self._add_latency(stage, seconds)
+        self._add_latency('total', time.time() - submitted)
+        self._ready[index] = (FrameResult(index, timestamp, outputs), error)
+        return slot
+
+    def submit(self, image, timestamp=None):
+        """Queue a frame for analysis by the workers.
+
+        The first frame starts the workers and fixes the frame shape and
+        dtype. The pixels are copied into shared memory before this
+        returns, so the stages never see later changes to `image`.
+
+        :param image: the frame
+        :param timestamp: time of the frame, now if None
+        :return: index of the frame, or None if it was dropped
+        """
+        image = np.asarray(image)
+        if self._workers is None:
+            self._start(image.shape, image.dtype)
+        else:
+            self._ring.check(image, 'pipeline')
+
+        slot = self._ring.put(image, self._collect, self.block, self.timeout)
+        if slot is None:
+            self._dropped += 1
+            return None
+
+        index = self._next_index
+        self._next_index += 1
+        now = time.time()
+        self._submitted[index] = (now, now if timestamp is None
+                                  else timestamp)
+        self._tasks.put((index, slot, now))
+        return index
+
+    def get(self, timeout=None):
+        """Take the results of the next frame, in the order submitted.
+
+        Exceptions raised by a stage are raised here, for their frame.
+
+        :param timeout: seconds to wait for the results, forever if None
+        :return: `FrameResult`, or None if no frame is pending
+        """
+        if not self.pending:
+            return None
+        while self._next_result not in self._ready:
+            try:
+                self._ring.release(self._collect(True, timeout))
+            except queue.Empty:
+                raise TimeoutError(f'No result after {timeout} s.') from None
+        result, error = self._ready.pop(self._next_result)
+        self._next_result += 1
+        if error is not None:
+            raise error
+        return result
+
+    def results(self, timeout=None):
+        """Take the results of every pending frame, in order.
+
+        :param timeout: seconds to wait for each result
+        :return: generator of `FrameResult`
+        """
+        while self.pending:
+            yield self.get(timeout)
+
+    def close(self):
+        """Stop the workers. Results not taken yet are discarded.
+
+        The next frame submitted starts the workers again, with the frame
+        index back at 0.
+        """
+        if self._workers is None:
+            return
+        for _ in self._workers:
+            self._tasks.put(None)
+        # keep the result pipe flowing so the workers can exit
+        while any(worker.is_alive() for worker in self._workers):
+            try:
+                self._results.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        for worker in self._workers:
+            worker.join()
+        self._workers = None
+        self._ring.close()
+        self._ring = None
+        self._reset()
@@ -0,0 +1,209 @@
+"""Waveform measurements on oscilloscope data.
+
+All measurements run on every channel and capture at once, with the
+samples along the last axis of a single array. Intermediate results such as
+the spectrum are computed once and shared by the measurements that need
+them.
+
+`measure` accepts the `{channel: samples}` dict returned by the
+`get_data` method of the oscilloscopes, a sequence of such dicts for a
+batch of captures, or an array. It returns a structured array with one
+field per measurement.
+"""
+from functools import cached_property
+
+import numpy as np
+import scipy.fft
+
+DEFAULT_MEASUREMENTS = ('mean', 'rms', 'pk2pk', 'frequency', 'rise_time')
+
+
+class Samples:
+    """Samples along the last axis, with intermediate results cached.
+
+    :param data: array of samples, the last axis is time
+    :param sampling_rate: samples per second
+    """
+
+    def __init__(self, data, sampling_rate):
+        self.data = np.asarray(data, dtype=float)
+        self.sampling_rate = sampling_rate
+
+    @property
+    def num_samples(self):
+        return self.data.shape[-1]
+
+    @cached_property
+    def min(self):
+        return self.data.min(axis=-1)
+
+    @cached_property
+    def max(self):
+        return self.data.max(axis=-1)
+
+    @cached_property
+    def mean(self):
+        return self.data.mean(axis=-1)
+
+    @cached_property
+    def mean_square(self):
+        return np.einsum('...i,...i->...', self.data, self.data) \
+            / self.num_samples
+
+    def _spectrum(self, data):
+        window = np.hanning(self.num_samples)
+        spectrum = np.abs(scipy.fft.rfft(data * window, workers=-1))
+        spectrum *= 2 / window.sum()
+        spectrum[..., 0] /= 2
+        return spectrum
+
+    @cached_property
+    def spectrum(self):
+        """Amplitude spectrum with a Hann window, in volts."""
+        return self._spectrum(self.data)
+
+    @cached_property
+    def ac_spectrum(self):
+        """Amplitude spectrum of the data with the mean removed.
+
+        Keeps a large DC offset from leaking into the lowest bins.
+        """
+        return self._spectrum(self.data - self.mean[..., None])
+
+    @cached_property
+    def frequencies(self):
+        return scipy.fft.rfftfreq(self.num_samples, 1 / self.sampling_rate)
+
+
+def _frequency(s):
+    """Frequency of the largest spectral peak, interpolated between bins."""
+    spectrum = s.ac_spectrum
+    if spectrum.shape[-1] < 3:
+        return np.full(spectrum.shape[:-1], np.nan)
+
+    # skip DC and the last bin so both neighbours of the peak exist
+    k = spectrum[..., 1:-1].argmax(axis=-1)[..., None] + 1
+    a, b, c = (np.take_along_axis(spectrum, k + i, axis=-1)[..., 0]
+               for i in (-1, 0, 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = 0.5 * (a - c) / (a - 2 * b + c)
+    delta = np.where(np.isfinite(delta), delta, 0)
+    return (k[..., 0] + delta) * s.sampling_rate / s.num_samples
+
+
+def _first(mask, axis=-1):
+    """Index of the first True along an axis, or -1 if there is none."""
+    return np.where(mask.any(axis=axis), mask.argmax(axis=axis), -1)
+
+
+def _crossing(x, i, level):
+    """Fractional index where x crosses `level` between i and i + 1."""
+    x0 = np.take_along_axis(x, i[..., None], axis=-1)[..., 0]
+    x1 = np.take_along_axis(x, i[..., None] + 1, axis=-1)[..., 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return i + np.clip((level - x0) / (x1 - x0), 0, 1)
+
+
+def _rise_time(s):
+    """Time of the first 10 % to 90 % rising edge, NaN if there is none."""
+    x = s.data
+    low = (s.min + 0.1 * (s.max - s.min))[..., None]
+    high = (s.min + 0.9 * (s.max - s.min))[..., None]
+    index = np.arange(s.num_samples)
+
+    below = x <= low
+    start = _first(below)
+    end = _first((x >= high) & (index > start[..., None]))
+    # last sample below the low level before the edge
+    last_below = below & (index < end[..., None])
+    last_below = s.num_samples - 1 - _first(last_below[..., ::-1])
+
+    found = (start >= 0) & (end > 0) & (s.max > s.min)
+    last_below = np.where(found, last_below, 0)
+    end = np.where(found, end, 1)
+    t_low = _crossing(x, np.minimum(last_below, s.num_samples - 2),
+                      low[..., 0])
+    t_high = _crossing(x, end - 1, high[..., 0])
+    return np.where(found, (t_high - t_low) / s.sampling_rate, np.nan)
+
+
+# name: function of a `Samples` returning one value (or array) per waveform
+MEASUREMENTS = {
+    'mean': lambda s: s.mean,
+    'rms': lambda s: np.sqrt(s.mean_square),
+    'std': lambda s: np.sqrt(np.maximum(s.mean_square - s.mean ** 2, 0)),
+    'min': lambda s: s.min,
+    'max': lambda s: s.max,
+    'pk2pk': lambda s: s.max - s.min,
+    'frequency': _frequency,
+    'rise_time': _rise_time,
+    'spectrum': lambda s: s.spectrum,
+}
+
+
+def measure_array(data, sampling_rate, measurements=DEFAULT_MEASUREMENTS):
+    """Measure waveforms held in an array.
+
+    :param data: array of samples, the last axis is time
+    :param sampling_rate: samples per second
+    :param measurements: names of entries in `MEASUREMENTS`
+    :return: structured array shaped like `data` without the last axis
+    """
+    samples = Samples(data, sampling_rate)
+    batch_shape = samples.data.shape[:-1]
+
+    results = {}
+    for name in measurements:
+        try:
+            func = MEASUREMENTS[name]
+        except KeyError:
+            raise KeyError(f'Unknown measurement "{name}".') from None
+        results[name] = np.asarray(func(samples))
+
+    dtype = [(name, value.dtype, value.shape[len(batch_shape):])
+             for name, value in results.items()]
+    out = np.empty(batch_shape, dtype=dtype)
+    for name, value in results.items():
+        out[name] = value
+    return out
+
+
+def _channel_array(channels):
+    channels = list(channels)
+    if all(isinstance(c, (int, np.integer)) for c in channels):
+        return np.array(channels, dtype=int)
+    array = np.empty(len(channels), dtype=object)
+    array[:] = channels
+    return array
+
+
+def measure(data, sampling_rate, measurements=DEFAULT_MEASUREMENTS):
+    """Measure oscilloscope data.
+
+    Dicts need the same channels and number of samples. The result has a
+    'channel' field followed by one field per measurement, and is shaped
+    (channels,) for one capture or (captures, channels) for a batch.
+
+    :param data: {channel: samples} from `get_data`, or a sequence of them
+    :param sampling_rate: samples per second
+    :param measurements: names of entries in `MEASUREMENTS`
+    :return: structured array
+    """
+    if not len(data) or not isinstance(data, dict) and not len(data[0]):
+        raise ValueError('No captures or channels to measure.')
+    if isinstance(data, dict):
+        channels = list(data)
+        samples = np.stack([data[c] for c in channels])
+    else:
+        channels = list(data[0])
+        samples = np.stack([np.stack([capture[c] for c in channels])
+                            for capture in data])
+
+    results = measure_array(samples, sampling_rate, measurements)
+    channel_ids = _channel_array(channels)
+    dtype = [('channel', channel_ids.dtype)] + results.dtype.descr
+    out = np.empty(results.shape, dtype=dtype)
+    out['channel'] = channel_ids
+    for name in results.dtype.names:
+        out[name] = results[name]
+    return out
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# device key: [executor, number of holders]
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def device_executor(device_key):
+    """Get the single-worker executor that serializes calls to a device.
+
+    Instruments that share hardware (e.g. the oscilloscope and signal
+    generator of one AnalogDiscovery2) should use the same key so that
+    their driver calls never overlap. Every call must be paired with a
+    `release_executor` once the executor is no longer needed.
+
+    :param device_key: hashable object identifying the device
+    :return: `ThreadPoolExecutor` with one worker
+    """
+    with _executors_lock:
+        if device_key not in _executors:
+            _executors[device_key] = [ThreadPoolExecutor(max_workers=1), 0]
+        entry = _executors[device_key]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_executor(device_key, wait=True):
+    """Give back an executor taken with `device_executor`.
+
+    The executor is shut down and forgotten when its last holder releases
+    it.
+
+    :param device_key: key previously passed to `device_executor`
+    :param wait: block until pending calls have finished, if shut down
+    """
+    with _executors_lock:
+        entry = _executors.get(device_key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _executors[device_key]
+    entry[0].shutdown(wait=wait)
+
+
+class AsyncInstrument:
+    """Awaitable wrapper around a blocking `Instrument`.
+
+    Driver calls run on a per-device executor, so calls to one device stay
+    in order while different devices work concurrently and the event loop
+    is never blocked.
+
+    :param instrument: the `Instrument` to wrap
+    :param device_key: key of the executor to use, defaults to `instrument`
+    :param limit: maximum number of calls in progress, as an int or an
+        `asyncio.Semaphore` to share a limit between instruments
+    :param timeout: seconds to wait for each call, or None to wait forever
+    """
+
+    def __init__(self, instrument, device_key=None, limit=None, timeout=None):
+        self.instrument = instrument
+        self.device_key = instrument if device_key is None else device_key
+        self.timeout = timeout
+        self._executor = device_executor(self.device_key)
+        self._limit = limit
+        self._semaphore = limit if isinstance(limit, asyncio.Semaphore) \
+            else None
+
+    def __str__(self):
+        return f'Async{self.instrument}'
+
+    @property
+    def channel_ids(self):
+        return self.instrument.channel_ids
+
+    def get_channel(self, channel_id):
+        # raise KeyError now rather than on first use
+        self.instrument.get_channel(channel_id)
+        return AsyncChannel(self, channel_id)
+
+    async def call(self, func, *args, timeout=None):
+        """Run a blocking function on this device's executor.
+
+        On timeout `asyncio.TimeoutError` is raised. The driver call itself
+        cannot be interrupted and still completes in the background before
+        the next call to the device starts; it counts towards `limit` until
+        it does.
+
+        :param func: callable to run
+        :param args: positional arguments for `func`
+        :param timeout: seconds to wait, defaults to `self.timeout`
+        :return: the return value of `func`
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if self._semaphore is None and self._limit is not None:
+            # created here so it belongs to the running loop
+            self._semaphore = asyncio.Semaphore(self._limit)
+
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore
+        if semaphore is None:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, func, *args), timeout)
+
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            # keep the permit until the driver call has really finished
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # the loop is closed, and the semaphore with it
+
+        future.add_done_callback(release)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    async def get(self, channel_id, name):
+        return await self.call(self.instrument.read_channel_attribute,
+                               channel_id, name)
+
+    async def set(self, channel_id, name, value):
+        await self.call(self.instrument.set_channel_attribute,
+                        channel_id, name, value)
+
+    async def configure(self, channel_id, **kwargs):
+        await self.call(lambda: self.instrument.configure_channel(channel_id,
+                                                                  **kwargs))
+
+    async def details(self, channel_id, attributes=None):
+        return await self.call(self.instrument.channel_details,
+                               channel_id, attributes)
+
+    def close(self, wait=True):
+        """Release the executor used by this instrument's device.
+
+        The executor is shut down once no other wrapper or group of the
+        same device uses it.
+        """
+        if self._executor is not None:
+            self._executor = None
+            release_executor(self.device_key, wait=wait)
+
+
+class AsyncChannel:
+    """Awaitable counterpart of `Channel` for an `AsyncInstrument`."""
+
+    def __init__(self, instrument, channel_id):
+        self._instrument = instrument
+        self._id = channel_id
+
+    def __str__(self):
+        return f'{self._instrument.instrument}:{self._id}'
+
+    def __repr__(self):
+        return f'{self._instrument.instrument}:{self._id}'
+
+    @property
+    def id(self):
+        """Return the ID for this channel."""
+        return self._id
+
+    async def get(self, name):
+        return await self._instrument.get(self._id, name)
+
+    async def set(self, name, value):
+        await self._instrument.set(self._id, name, value)
+
+    async def configure(self, **kwargs):
+        """Change the configuration of this channel."""
+        await self._instrument.configure(self._id, **kwargs)
+
+    async def details(self, attributes=None):
+        """Read the configuration details of this channel"""
+        return await self._instrument.details(self._id, attributes)
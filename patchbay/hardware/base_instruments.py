@@ -1,15 +1,34 @@
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+_channel_classes = {}
+
+Average = namedtuple('Average', 'channels, mean, segments, num_shots')
+Average.__doc__ = """Result of `GenericOscilloscope.average`.
+
+`mean` has one row per channel in `channels`. `segments` holds the most
+recent captures, oldest first, shaped (segments, channels, samples), or is
+None if no history was kept.
+"""
+
+
 class Channel:
     """Channel is a source or sink associated with an instrument.
 
     Data can be sent to or received from a channel and configuration can be
     updated. Channel passes responsibility off to the instrument.
+
+    Instruments hand out subclasses made by `channel_class`, which expose
+    each attribute named in the channel spec as a property.
     """
+    __slots__ = ('_instrument', '_id')
     attributes = ()
 
-    def __init__(self, instrument, channel_id, attributes):
+    def __init__(self, instrument, channel_id):
         self._instrument = instrument
         self._id = channel_id
-        self.attributes = attributes
 
     def __str__(self):
         return f'{self._instrument}:{self._id}'
@@ -17,18 +36,6 @@ class Channel:
     def __repr__(self):
         return f'{self._instrument}:{self._id}'
 
-    def __getattr__(self, item):
-        if item in self.attributes:
-            return self._instrument.get_channel_attribute(self._id, item)
-        else:
-            super().__getattribute__(item)
-
-    def __setattr__(self, key, value):
-        if key in self.attributes:
-            self._instrument.set_channel_attribute(self._id, key, value)
-        else:
-            super().__setattr__(key, value)
-
     @property
     def id(self):
         """Return the ID for this channel."""
@@ -43,17 +50,89 @@ class Channel:
         return self._instrument.channel_details(self._id, attributes)
 
 
+def _channel_property(name):
+    def fget(self):
+        return self._instrument.read_channel_attribute(self._id, name)
+
+    def fset(self, value):
+        self._instrument.set_channel_attribute(self._id, name, value)
+
+    return property(fget, fset, doc=f"Channel attribute '{name}'.")
+
+
+def channel_class(attributes):
+    """Get the `Channel` subclass for a channel spec.
+
+    One class is generated for each distinct sequence of attribute names and
+    shared by every channel with that spec. Its `attributes` tuple is the
+    interned copy of the spec.
+
+    :param attributes: iterable of attribute names
+    :return: `Channel` subclass
+    """
+    attributes = tuple(attributes)
+    try:
+        return _channel_classes[attributes]
+    except KeyError:
+        pass
+
+    namespace = {'__slots__': (), 'attributes': attributes}
+    for name in attributes:
+        if hasattr(Channel, name):
+            raise ValueError(f"Channel attribute '{name}' is reserved")
+        namespace[name] = _channel_property(name)
+
+    cls = type('Channel_' + '_'.join(attributes), (Channel,), namespace)
+    return _channel_classes.setdefault(attributes, cls)
+
+
 class Instrument:
+    """Base class for an instrument made up of one or more channels.
+
+    Channel attributes can optionally be shadowed in a write-through cache.
+    With `use_cache` set, values written through `set_channel_attribute` or
+    `configure_channel` are remembered once the device has accepted them,
+    and reads made through a `Channel` or `channel_details` are served from
+    the cache instead of the device. Names listed in `live_attrs` are never
+    cached (e.g. values the device can change on its own).
+    `get_channel_attribute` always reads the device.
+
+    Subclasses write to the device in `set_channel_attribute` after calling
+    the base method, which drops the cached value, and then pass the value
+    as it reads back to `_cache_written`, or call `_cache_read_back` if
+    only the device knows it. A failed write leaves nothing cached.
+    """
+    live_attrs = ()
+
     def __init__(self, channel_specs):
         # source and sinks are dictionaries of id and channel
-        self._channel_specs = channel_specs
+        self._channel_specs = {channel_id: channel_class(attrs).attributes
+                               for channel_id, attrs in channel_specs.items()}
+        self._channels = {}
+        self._use_cache = False
+        self._cache = {}
+
+    @property
+    def use_cache(self):
+        return self._use_cache
+
+    @use_cache.setter
+    def use_cache(self, use_cache):
+        # anything cached before now may be stale, so always start over
+        self._cache.clear()
+        self._use_cache = bool(use_cache)
 
     @property
     def channel_ids(self):
         return list(self._channel_specs.keys())
 
     def get_channel(self, channel_id):
-        return Channel(self, channel_id, self._channel_specs[channel_id])
+        try:
+            return self._channels[channel_id]
+        except KeyError:
+            cls = channel_class(self._channel_specs[channel_id])
+            channel = self._channels[channel_id] = cls(self, channel_id)
+            return channel
 
     def get_channel_attribute(self, channel_id, name):
         if name not in self._channel_specs[channel_id]:
@@ -62,16 +141,128 @@ class Instrument:
     def set_channel_attribute(self, channel_id, name, value):
         if name not in self._channel_specs[channel_id]:
             raise AttributeError(f"Channel has no attribute '{name}'")
+        self._cache.pop((channel_id, name), None)
+
+    def _cache_written(self, channel_id, name, value):
+        """Remember a value the device has accepted.
+
+        :param value: the value as reading the attribute back returns it
+        """
+        if self._is_cacheable(name):
+            self._cache[(channel_id, name)] = value
+
+    def _cache_read_back(self, channel_id, name):
+        """Remember a value the device has accepted, as it reports it.
+
+        For devices that coerce or quantize written values. The device is
+        only read if the value would be cached.
+        """
+        if self._is_cacheable(name):
+            self._cache[(channel_id, name)] = \
+                self.get_channel_attribute(channel_id, name)
 
     def configure_channel(self, channel_id, **kwargs):
-        for key, val in kwargs.items():
-            self.set_channel_attribute(channel_id, key, val)
+        with self.transaction():
+            for key, val in kwargs.items():
+                self.set_channel_attribute(channel_id, key, val)
+
+    @contextmanager
+    def transaction(self):
+        """Group attribute writes so they can be sent to the device together.
+
+        Instruments that can apply several settings in one bus transaction
+        override this. By default each write is applied immediately.
+        """
+        yield self
+
+    def get_channel_attributes(self, channel_id, names):
+        """Read several channel attributes from the device.
+
+        Instruments that can read several values in one bus transaction
+        override this. By default each attribute is read in turn.
+
+        :param channel_id: ID of the channel to read
+        :param names: names of the attributes to read
+        :return: dict of values keyed by attribute name
+        """
+        return {name: self.get_channel_attribute(channel_id, name)
+                for name in names}
 
     def channel_details(self, channel_id, attributes=None):
         if attributes is None:
             attributes = self._channel_specs[channel_id]
-        return {attr: self.get_channel_attribute(channel_id, attr)
-                for attr in attributes}
+
+        details = {}
+        if self._use_cache:
+            for attr in attributes:
+                if (self._is_cacheable(attr)
+                        and (channel_id, attr) in self._cache):
+                    details[attr] = self._cache[(channel_id, attr)]
+
+        missing = [attr for attr in attributes if attr not in details]
+        if missing:
+            values = self.get_channel_attributes(channel_id, missing)
+            for attr, value in values.items():
+                if self._is_cacheable(attr):
+                    self._cache[(channel_id, attr)] = value
+            details.update(values)
+
+        return {attr: details[attr] for attr in attributes}
+
+    def read_channel_attribute(self, channel_id, name):
+        """Get a channel attribute, from the cache if possible.
+
+        :param channel_id: ID of the channel to read
+        :param name: name of the attribute to read
+        :return: the attribute value
+        """
+        if self._is_cacheable(name):
+            try:
+                return self._cache[(channel_id, name)]
+            except KeyError:
+                pass
+
+        value = self.get_channel_attribute(channel_id, name)
+        if self._is_cacheable(name):
+            self._cache[(channel_id, name)] = value
+        return value
+
+    def invalidate(self, channel_id=None, name=None):
+        """Discard cached attribute values.
+
+        With no arguments the whole cache is cleared. Otherwise only entries
+        matching the given channel and/or attribute name are removed.
+
+        :param channel_id: restrict to this channel
+        :param name: restrict to this attribute name
+        """
+        if channel_id is None and name is None:
+            self._cache.clear()
+            return
+
+        for key in list(self._cache):
+            if ((channel_id is None or key[0] == channel_id)
+                    and (name is None or key[1] == name)):
+                del self._cache[key]
+
+    def refresh(self, channel_id=None):
+        """Re-read cacheable attributes from the device into the cache.
+
+        :param channel_id: channel to refresh, or all channels if None
+        """
+        channel_ids = self.channel_ids if channel_id is None else [channel_id]
+        self.invalidate(channel_id)
+        if not self.use_cache:
+            return
+
+        for c in channel_ids:
+            for name in self._channel_specs[c]:
+                if self._is_cacheable(name):
+                    self._cache[(c, name)] = self.get_channel_attribute(c,
+                                                                        name)
+
+    def _is_cacheable(self, name):
+        return self._use_cache and name not in self.live_attrs
 
 
 class GenericCamera(Instrument):
@@ -92,6 +283,10 @@ class GenericCamera(Instrument):
         """End acquisition"""
         raise NotImplementedError
 
+    def release(self, image):
+        """Give an image from `read` back so its memory can be reused"""
+        pass
+
 
 class GenericSignalGenerator(Instrument):
     """Class for a generic signal generator.
@@ -101,9 +296,9 @@ class GenericSignalGenerator(Instrument):
 
     Output channels are counted from 0 and have three possible nodes:
     carrier, am, fm sync channels are 'sync' """
-    ch_out_attrs = ['enabled', 'shape', 'frequency', 'amplitude', 'offset',
-                    'phase', 'master']
-    ch_sync_attrs = ['enabled']
+    ch_out_attrs = ('enabled', 'shape', 'frequency', 'amplitude', 'offset',
+                    'phase', 'master')
+    ch_sync_attrs = ('enabled',)
 
     output_nodes = ('carrier', 'am', 'fm')
     shapes = ('sinusoid', 'square', 'triangle', 'ramp', 'noise', 'dc', 'user')
@@ -112,7 +307,7 @@ class GenericSignalGenerator(Instrument):
         out_nodes = [node for node, include in zip(['carrier', 'fm', 'am'],
                                                    [True, has_fm, has_am])
                      if include]
-        channel_specs = {(i, node): self.ch_out_attrs.copy()
+        channel_specs = {(i, node): self.ch_out_attrs
                          for i in range(num_outputs) for node in out_nodes}
         if has_sync:
             channel_specs['sync'] = self.ch_sync_attrs
@@ -138,14 +333,41 @@ class GenericSignalGenerator(Instrument):
 class GenericOscilloscope(Instrument):
     """Base class to represent an oscilloscope.
 
+    Inputs are counted from 0. The trigger is configured through the
+    'trigger' channel:
+
+    - source: None to start capturing as soon as armed, the id of an input
+      to trigger on its level, or the name of another source the instrument
+      supports (e.g. 'external1')
+    - level: trigger level in volts
+    - edge: 'rising' or 'falling'
+    - holdoff: minimum time between triggers in seconds
+    - position: time from the middle of the buffer to the trigger in seconds
+    - auto_timeout: time after which to capture without a trigger in
+      seconds, 0 to wait for a trigger indefinitely
     """
 
-    ch_in_attrs = ['enabled', 'scale', 'offset']
+    ch_in_attrs = ('enabled', 'scale', 'offset')
+    ch_trigger_attrs = ('source', 'level', 'edge', 'holdoff', 'position',
+                        'auto_timeout')
+    trigger_edges = ('rising', 'falling')
 
-    def __init__(self, num_inputs):
-        channel_specs = {i: self.ch_in_attrs.copy() for i in range(num_inputs)}
+    def __init__(self, num_inputs, *, has_trigger=True):
+        channel_specs = {i: self.ch_in_attrs for i in range(num_inputs)}
+        if has_trigger:
+            channel_specs['trigger'] = self.ch_trigger_attrs
         super().__init__(channel_specs)
 
+    @property
+    def input_ids(self):
+        """IDs of the input channels."""
+        return [c for c in self.channel_ids if c != 'trigger']
+
+    @property
+    def trigger(self):
+        """The trigger channel."""
+        return self.get_channel('trigger')
+
     def arm(self):
         """Arm the instrument."""
         raise NotImplementedError
@@ -158,5 +380,55 @@ class GenericOscilloscope(Instrument):
         """Reset to default settings (i.e., auto-configure)."""
         raise NotImplementedError
 
-    # def get_data(self):
-    #     raise NotImplementedError
+    def get_data(self, timeout=None, out=None):
+        """Wait for the capture to finish and return the samples.
+
+        The samples are in new arrays that later captures leave alone,
+        unless `out` is given.
+
+        :param timeout: maximum time to wait in seconds, or None to wait
+            indefinitely
+        :param out: array shaped (channels, samples) to fill instead, with
+            one row per enabled channel in order
+        :return: dict of samples for each enabled channel
+        """
+        raise NotImplementedError
+
+    def average(self, num_shots, history=0, timeout=None):
+        """Average back-to-back captures.
+
+        The next capture is armed as soon as the previous one has been read,
+        and the samples are summed in place into a float64 buffer while it
+        runs.
+
+        :param num_shots: number of captures to average
+        :param history: number of the most recent captures to keep
+        :param timeout: maximum time to wait for each capture in seconds
+        :return: `Average`
+        """
+        total = segments = None
+        channels = ()
+        self.arm()
+        for shot in range(num_shots):
+            data = self.get_data(timeout)
+            if shot + 1 < num_shots:
+                self.arm()
+
+            if total is None:
+                channels = tuple(data)
+                shape = (len(channels), len(next(iter(data.values()), ())))
+                total = np.zeros(shape)
+                if history:
+                    segments = np.empty((min(history, num_shots),) + shape)
+            for row, samples in zip(total, data.values()):
+                row += samples
+            if segments is not None:
+                segment = segments[shot % len(segments)]
+                for row, samples in zip(segment, data.values()):
+                    row[:] = samples
+
+        if segments is not None:
+            segments = np.roll(segments, -(num_shots % len(segments)), axis=0)
+        if total is not None:
+            total /= num_shots
+        return Average(channels, total, segments, num_shots)
@@ -1,4 +1,7 @@
+import warnings
+
 from hardware.base_instruments import GenericCamera
+from hardware.frame_pool import FramePool
 from pypylon import pylon
 import numpy as np
 
@@ -11,38 +14,162 @@ class BaslerAPI():
     def list_cameras(self):
         pass
 
-    def get_camera(self):
-        return BaslerCamera(self.camera)
+    def get_camera(self, **kwargs):
+        """Get the first camera, see `BaslerCamera` for the arguments."""
+        return BaslerCamera(self.camera, **kwargs)
+
+
+class _ImageHandler(pylon.ImageEventHandler):
+    """Pass the frames grabbed by pylon's grab loop to a callback."""
+
+    def __init__(self, camera, callback):
+        super().__init__()
+        self.camera = camera
+        self.callback = callback
+
+    def OnImageGrabbed(self, device_handle, grab_result):
+        try:
+            image = self.camera._to_array(grab_result, self.camera.timeout)
+        except TimeoutError:
+            warnings.warn('Frame dropped, no free buffer in the frame pool')
+            return
+        if image is not None:
+            self.callback(image)
 
 
 class BaslerCamera(GenericCamera):
-    def __init__(self, device_handle):
+    """Basler camera through pylon.
+
+    Frames are grabbed continuously once started, into `max_num_buffer`
+    driver buffers, and handed out in the order given by `grab_strategy`:
+
+    - 'one_by_one': every frame, oldest first
+    - 'latest_image_only': only the newest frame, older ones are skipped
+    - 'latest_images': the newest `output_queue_size` frames, oldest
+      first; with a size of 1, the same as 'latest_image_only'
+    - 'upcoming_image': a frame acquired after `read` is called
+
+    Frames skipped by the strategy are counted in `skipped`. Frames are
+    pulled with `read`, or pushed to a callback passed to `start`, which
+    runs on pylon's grab thread.
+
+    Frames are copied once, straight out of the grab buffer, which goes
+    back to pylon before `read` returns. With `buffer_mode` 'copy' each
+    frame is a new array; with 'pool' it is a buffer of `pool`, to be given
+    back with `release`. Frames are converted to `pixel_format` (a pylon
+    PixelType) if set and the camera delivers another format; None keeps
+    the camera format, e.g. to debayer later or not at all.
+
+    :param device_handle: `pylon.InstantCamera`
+    :param buffer_mode: one of `buffer_modes`
+    :param pool_size: number of frames in the pool
+    :param grab_strategy: one of `grab_strategies`
+    :param max_num_buffer: number of buffers pylon grabs into
+    :param output_queue_size: number of frames kept by 'latest_images', at
+        most `max_num_buffer`
+    """
+    buffer_modes = ('copy', 'pool')
+    grab_strategies = {'one_by_one': pylon.GrabStrategy_OneByOne,
+                       'latest_image_only': pylon.GrabStrategy_LatestImageOnly,
+                       'latest_images': pylon.GrabStrategy_LatestImages,
+                       'upcoming_image': pylon.GrabStrategy_UpcomingImage}
+
+    def __init__(self, device_handle, buffer_mode='copy', pool_size=8,
+                 grab_strategy='one_by_one', max_num_buffer=10,
+                 output_queue_size=1):
         super().__init__()
+        if buffer_mode not in self.buffer_modes:
+            raise ValueError(f'Unknown buffer mode {buffer_mode!r}.')
+        if grab_strategy not in self.grab_strategies:
+            raise ValueError(f'Unknown grab strategy {grab_strategy!r}.')
         self.device_handle = device_handle
+        self.buffer_mode = buffer_mode
+        self.pool = FramePool(pool_size)
+        self.pixel_format = None
+        self.grab_strategy = grab_strategy
+        self.max_num_buffer = max_num_buffer
+        self.output_queue_size = output_queue_size
+        self.timeout = 500
+        self.skipped = 0
+        self._converter = pylon.ImageFormatConverter()
+        self._handler = None
 
-    def read(self, timeout=500):
-        image_out = None
-        if self.device_handle.IsGrabbing():
-            grabResult = self.device_handle.RetrieveResult(timeout,
-                                                           pylon.TimeoutHandling_ThrowException)
+    def _to_array(self, grab_result, timeout):
+        """Copy a grab result into an array, None if the grab failed."""
+        if not grab_result.GrabSucceeded():
+            warnings.warn(f'Grab failed with error {grab_result.ErrorCode}'
+                          f': {grab_result.ErrorDescription}')
+            return None
+        self.skipped += grab_result.GetNumberOfSkippedImages()
 
-            # Image grabbed successfully?
-            if grabResult.GrabSucceeded():
-                # Access the image data.
-                print("SizeX: ", grabResult.Width)
-                print("SizeY: ", grabResult.Height)
-                print("Min: ", np.min(grabResult.Array))
-                image_out = grabResult.Array
+        image = grab_result
+        if self.pixel_format is not None \
+                and grab_result.PixelType != self.pixel_format:
+            self._converter.OutputPixelFormat = self.pixel_format
+            image = self._converter.Convert(grab_result)
 
+        with image.GetArrayZeroCopy() as data:
+            if self.buffer_mode == 'pool':
+                image_out = self.pool.acquire(data.shape, data.dtype,
+                                              timeout / 1000)
+                np.copyto(image_out, data)
             else:
-                print("Error: ", grabResult.ErrorCode,
-                      grabResult.ErrorDescription)
-            grabResult.Release()
+                image_out = data.copy()
         return image_out
 
-    def start(self):
-        self.device_handle.StartGrabbingMax(5)
+    def read(self, timeout=None):
+        """Get the next image, or None if the grab failed.
+
+        Raises TimeoutError if no image arrives in time. Not available
+        while frames go to a callback.
 
+        :param timeout: milliseconds to wait for the image, `timeout` if
+            None
+        """
+        if self._handler is not None:
+            raise RuntimeError('Frames are delivered to a callback.')
+        if not self.device_handle.IsGrabbing():
+            return None
+        timeout = self.timeout if timeout is None else timeout
+        grab_result = self.device_handle.RetrieveResult(
+            timeout, pylon.TimeoutHandling_Return)
+        try:
+            if not grab_result.IsValid():
+                raise TimeoutError('Image acquisition timed out.')
+            return self._to_array(grab_result, timeout)
+        finally:
+            grab_result.Release()
+
+    def release(self, image):
+        self.pool.release(image)
+
+    def start(self, callback=None):
+        """Start grabbing continuously.
+
+        :param callback: function called with each frame on pylon's grab
+            thread instead of returning frames from `read`
+        """
+        if self.device_handle.IsGrabbing():
+            return
+        self.device_handle.MaxNumBuffer.SetValue(self.max_num_buffer)
+        if self.grab_strategy == 'latest_images':
+            self.device_handle.OutputQueueSize.SetValue(
+                self.output_queue_size)
+        self.skipped = 0
+        strategy = self.grab_strategies[self.grab_strategy]
+        if callback is None:
+            self._handler = None
+            self.device_handle.StartGrabbing(strategy)
+        else:
+            self._handler = _ImageHandler(self, callback)
+            self.device_handle.RegisterImageEventHandler(
+                self._handler, pylon.RegistrationMode_ReplaceAll,
+                pylon.Cleanup_None)
+            self.device_handle.StartGrabbing(
+                strategy, pylon.GrabLoop_ProvidedByInstantCamera)
 
     def stop(self):
         self.device_handle.StopGrabbing()
+        if self._handler is not None:
+            self.device_handle.DeregisterImageEventHandler(self._handler)
+            self._handler = None
@@ -0,0 +1,75 @@
+"""Simulated bench of a signal generator wired to an oscilloscope.
+
+The generator outputs, with their AM and FM nodes, are synthesized with
+NumPy for every capture and routed to the oscilloscope inputs through a
+wiring map, optionally low-pass filtered, with noise added at the inputs.
+This lets sweeps and measurements run end to end without hardware, e.g.
+to test a measurement script or benchmark the processing behind it.
+"""
+import numpy as np
+
+from analysis.measurements import measure
+from hardware.dummy_instrument import DummyOscilloscope, DummySignalGenerator
+
+
+class DummyBench:
+    """A `DummySignalGenerator` wired to a `DummyOscilloscope`.
+
+    :param sig_gen: signal generator, a new `DummySignalGenerator` if None
+    :param scope: oscilloscope, a new `DummyOscilloscope` if None
+    :param wiring: dict of {input: output} as for `wire`, by default input
+        i is connected to output i
+    """
+
+    def __init__(self, sig_gen=None, scope=None, wiring=None):
+        self.sig_gen = DummySignalGenerator() if sig_gen is None else sig_gen
+        self.scope = DummyOscilloscope() if scope is None else scope
+        self.scope.connect(self.sig_gen, wiring)
+
+    @property
+    def wiring(self):
+        """Dict of {input: {output: gain}} of the connected inputs."""
+        return self.scope.connections
+
+    def wire(self, input_id, output, noise=None, bandwidth=None):
+        """Connect an input to one or more outputs.
+
+        :param input_id: oscilloscope input
+        :param output: output index, or dict of {output: gain} to sum
+            several outputs
+        :param noise: noise at the input in volts rms, unchanged if None
+        :param bandwidth: -3 dB frequency in Hz of a first-order low-pass
+            filter on the connection, None for no filter
+        """
+        self.scope.connect(self.sig_gen, {input_id: output}, bandwidth)
+        if noise is not None:
+            self.scope.noise[input_id] = noise
+
+    def capture(self, timeout=None):
+        """Arm the oscilloscope and return the next capture.
+
+        :param timeout: seconds to wait for a trigger, forever if None
+        :return: {input: samples}
+        """
+        self.scope.arm()
+        return self.scope.get_data(timeout)
+
+    def sweep(self, frequencies, output=0, node='carrier',
+              measurements=('rms', 'pk2pk', 'frequency'), timeout=None):
+        """Step the frequency of an output and measure the enabled inputs.
+
+        :param frequencies: frequencies to set, in Hz
+        :param output: output index
+        :param node: node of the output to sweep, e.g. 'am'
+        :param measurements: names of entries in
+            `analysis.measurements.MEASUREMENTS`
+        :param timeout: seconds to wait for each capture
+        :return: structured array shaped (frequencies, inputs), see
+            `analysis.measurements.measure`
+        """
+        results = []
+        for frequency in frequencies:
+            self.sig_gen.configure_channel((output, node), frequency=frequency)
+            results.append(measure(self.capture(timeout),
+                                   self.scope.sampling_rate, measurements))
+        return np.stack(results)
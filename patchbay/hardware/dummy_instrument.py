@@ -1,9 +1,161 @@
+import time
+
+import numpy as np
+import scipy.signal
+
 from hardware import base_instruments
-from numpy.random import rand
 
 
-class DummyCamera(base_instruments.Instrument):
-    pass
+class DummyCamera(base_instruments.GenericCamera):
+    """Simulated camera with pre-rendered frames and paced acquisition.
+
+    A set of `num_frames` frames is rendered once and played back in a
+    loop, so reading costs no more than a real driver would. Patterns:
+
+    - 'spot': a gaussian spot moving around a circle
+    - 'noise': uniform noise over the full range of the dtype
+    - 'test_card': grey bars over a horizontal ramp, with a bar that moves
+      from frame to frame
+
+    Once started, frames become due every 1 / `frame_rate` seconds, like a
+    free running sensor. `read` waits for the next frame. Like a driver,
+    the camera holds the last `buffer_frames` due frames; when a reader
+    falls further behind, older frames are overwritten and counted in
+    `skipped`. `timestamp` is the time.time() at which the last
+    frame read was due. With `frame_rate` None frames come as fast as they
+    are read.
+
+    Frames are read-only and shared by every read of the same frame.
+
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param dtype: pixel dtype; integer frames use the full range of the
+        type, float frames range from 0 to 1
+    :param frame_rate: frames per second, or None for no pacing
+    :param pattern: one of `patterns`
+    :param num_frames: number of frames rendered ahead of time
+    :param seed: seed of the noise
+    """
+    patterns = ('spot', 'noise', 'test_card')
+    buffer_frames = 4
+    # longest busy wait before a frame is due, in seconds
+    spin_time = 200e-6
+
+    def __init__(self, width=640, height=480, dtype=np.uint8,
+                 frame_rate=30.0, pattern='spot', num_frames=16, seed=0):
+        super().__init__()
+        if pattern not in self.patterns:
+            raise ValueError(f'Unknown pattern {pattern!r}.')
+        self.width = width
+        self.height = height
+        self.dtype = np.dtype(dtype)
+        self.frame_rate = frame_rate
+        self.pattern = pattern
+        self.num_frames = num_frames
+        self.seed = seed
+
+        self.timestamp = None
+        self.skipped = 0
+        self._frames = None
+        self._started_at = None
+        self._wall_start = None
+        self._index = 0
+
+    def __str__(self):
+        return 'DummyCamera'
+
+    @property
+    def frames(self):
+        """The pre-rendered frames, shaped (num_frames, height, width)."""
+        settings = (self.width, self.height, self.dtype, self.pattern,
+                    self.num_frames, self.seed)
+        if self._frames is None or self._frames[0] != settings:
+            frames = self._render()
+            frames.flags.writeable = False
+            self._frames = (settings, frames)
+        return self._frames[1]
+
+    def _render(self):
+        shape = (self.num_frames, self.height, self.width)
+        if np.issubdtype(self.dtype, np.integer):
+            full_scale = np.iinfo(self.dtype).max
+        else:
+            full_scale = 1.0
+
+        if self.pattern == 'noise':
+            rng = np.random.default_rng(self.seed)
+            return (rng.random(shape) * full_scale).astype(self.dtype)
+
+        y = np.arange(self.height)[:, None]
+        x = np.arange(self.width)[None, :]
+        frames = np.empty(shape, self.dtype)
+        if self.pattern == 'spot':
+            sigma = min(self.width, self.height) / 20
+            radius = min(self.width, self.height) / 4
+            angles = 2 * np.pi * np.arange(self.num_frames) / self.num_frames
+            for frame, angle in zip(frames, angles):
+                row = self.height / 2 + radius * np.sin(angle)
+                column = self.width / 2 + radius * np.cos(angle)
+                # the gaussian is separable, so build it from two profiles
+                spot = np.exp(-(y - row) ** 2 / (2 * sigma ** 2)) \
+                    * np.exp(-(x - column) ** 2 / (2 * sigma ** 2))
+                frame[:] = 0.9 * full_scale * spot
+            return frames
+
+        bars = (x * 8 // self.width) / 7 * np.ones((self.height, 1))
+        ramp_rows = slice(self.height * 3 // 4, None)
+        bars[ramp_rows] = x / max(self.width - 1, 1)
+        bar_width = max(self.width // 32, 1)
+        for i, frame in enumerate(frames):
+            card = bars.copy()
+            start = i * (self.width - bar_width) // max(self.num_frames - 1, 1)
+            card[:self.height // 8, start:start + bar_width] = 1
+            frame[:] = card * full_scale
+        return frames
+
+    def start(self):
+        self.frames  # render before the first read
+        self._started_at = time.perf_counter()
+        self._wall_start = time.time()
+        self._index = 0
+        self.skipped = 0
+
+    def stop(self):
+        self._started_at = None
+
+    def read(self, timeout=None):
+        """Get the next frame, or None if the camera is not started.
+
+        :param timeout: milliseconds to wait for the frame, forever if None
+        """
+        if self._started_at is None:
+            return None
+        frames = self.frames
+        index = self._index
+        if self.frame_rate:
+            due = index / self.frame_rate
+            now = time.perf_counter() - self._started_at
+            oldest = int(now * self.frame_rate) - self.buffer_frames + 1
+            if oldest > index:
+                self.skipped += oldest - index
+                index = oldest
+                due = index / self.frame_rate
+            wait = due - now
+            if timeout is not None and wait > timeout / 1000:
+                time.sleep(timeout / 1000)
+                raise TimeoutError('Image acquisition timed out.')
+            # sleep until just before the frame is due, then spin briefly
+            # for an accurate frame time
+            while wait > self.spin_time:
+                time.sleep(wait - self.spin_time)
+                wait = due - (time.perf_counter() - self._started_at)
+            while time.perf_counter() - self._started_at < due:
+                pass
+            self.timestamp = self._wall_start + due
+        else:
+            self.timestamp = time.time()
+        self._index = index + 1
+        return frames[index % len(frames)]
 
 
 class DummySignalGenerator(base_instruments.GenericSignalGenerator):
@@ -25,24 +177,408 @@ class DummySignalGenerator(base_instruments.GenericSignalGenerator):
     def set_channel_attribute(self, channel_id, name, value):
         super().set_channel_attribute(channel_id, name, value)
         self._dummy_channels[channel_id][name] = value
+        self._cache_written(channel_id, name, value)
 
     def run(self):
         pass
 
 
+def add_waveform(out, t, shape='sinusoid', frequency=1e3, amplitude=1.0,
+                 offset=0.0, phase=0.0, symmetry=50.0, rng=None):
+    """Add a waveform to the samples in `out`, in place.
+
+    :param out: float64 array of samples to add to
+    :param t: sample times in seconds, same shape as `out`
+    :param shape: one of `GenericSignalGenerator.shapes`, or 'sine'
+    :param frequency: frequency in Hz
+    :param amplitude: peak amplitude in volts
+    :param offset: DC offset in volts
+    :param phase: phase in degrees
+    :param symmetry: duty cycle of square and triangle waves in percent
+    :param rng: numpy Generator for 'noise', a new one if None
+    """
+    out += offset
+    if shape == 'dc' or shape == 'user' or amplitude == 0:
+        return
+    if shape == 'noise':
+        rng = np.random.default_rng() if rng is None else rng
+        out += amplitude * rng.uniform(-1, 1, out.shape)
+        return
+
+    x = t * frequency + phase / 360
+    np.mod(x, 1, out=x)
+    duty = symmetry / 100
+    if shape in ('sinusoid', 'sine'):
+        np.sin(2 * np.pi * x, out=x)
+    elif shape == 'square':
+        x[:] = np.where(x < duty, 1.0, -1.0)
+    elif shape == 'triangle':
+        x[:] = np.where(x < duty, 2 * x / duty - 1,
+                        1 - 2 * (x - duty) / (1 - duty))
+    elif shape == 'ramp':
+        x *= 2
+        x -= 1
+    else:
+        raise ValueError(f'Unknown waveform shape {shape!r}.')
+    x *= amplitude
+    out += x
+
+
+def _enabled_node(sig_gen, channel_id):
+    """Settings of a signal generator node, None if missing or disabled."""
+    if channel_id not in sig_gen.channel_ids:
+        return None
+    details = sig_gen.channel_details(channel_id)
+    return details if details.get('enabled', True) else None
+
+
+def add_output(out, t, sig_gen, output, gain=1.0, rng=None):
+    """Add the signal of a signal generator output to `out`, in place.
+
+    The carrier is frequency modulated by the 'fm' node and amplitude
+    modulated by the 'am' node when those are enabled. As on the Analog
+    Discovery 2, the amplitudes of the modulation nodes are in percent.
+
+    :param out: float64 array of samples to add to
+    :param t: sample times in seconds, evenly spaced, same shape as `out`
+    :param sig_gen: a `GenericSignalGenerator`
+    :param output: index of the output
+    :param gain: factor applied to the signal, e.g. of a divider
+    :param rng: numpy Generator for 'noise' shapes
+    """
+    carrier = _enabled_node(sig_gen, (output, 'carrier'))
+    if carrier is None:
+        return
+    shape = {'shape': carrier['shape'], 'amplitude': carrier['amplitude'],
+             'phase': carrier['phase']}
+    am = _enabled_node(sig_gen, (output, 'am'))
+    fm = _enabled_node(sig_gen, (output, 'fm'))
+
+    wave = np.zeros_like(out)
+    if fm is not None:
+        # integrate the modulated frequency to get the carrier phase
+        deviation = np.ones_like(out)
+        add_waveform(deviation, t, fm['shape'], fm['frequency'],
+                     fm['amplitude'] / 100, phase=fm['phase'], rng=rng)
+        deviation *= carrier['frequency'] * (t[1] - t[0] if len(t) > 1 else 0)
+        cycles = t[0] * carrier['frequency'] - deviation[0] \
+            + np.cumsum(deviation)
+        add_waveform(wave, cycles, frequency=1, rng=rng, **shape)
+    else:
+        add_waveform(wave, t, frequency=carrier['frequency'], rng=rng,
+                     **shape)
+    if am is not None:
+        envelope = np.ones_like(out)
+        add_waveform(envelope, t, am['shape'], am['frequency'],
+                     am['amplitude'] / 100, phase=am['phase'], rng=rng)
+        wave *= envelope
+    wave += carrier['offset']
+    wave *= gain
+    out += wave
+
+
+class SignalPath:
+    """Signal generator outputs wired to an oscilloscope input.
+
+    The outputs are summed with their gains and, if a bandwidth is given,
+    low-pass filtered by a first-order filter, like the RC of a long cable
+    or the bandwidth limit of an input. The filter starts settled: a few
+    time constants before each capture are rendered and discarded.
+
+    :param sig_gen: a `GenericSignalGenerator`
+    :param outputs: dict of {output index: gain}
+    :param bandwidth: -3 dB frequency of the filter in Hz, None to not
+        filter
+    """
+    max_settling = 2 ** 16
+
+    def __init__(self, sig_gen, outputs, bandwidth=None):
+        self.sig_gen = sig_gen
+        self.outputs = dict(outputs)
+        self.bandwidth = bandwidth
+        self._filter = None
+
+    def settings(self):
+        """Settings of the connected outputs, to tell when they change."""
+        return [self.sig_gen.channel_details(c) for output in self.outputs
+                for c in ((output, 'carrier'), (output, 'am'),
+                          (output, 'fm'))
+                if c in self.sig_gen.channel_ids]
+
+    def render(self, out, t, rng=None):
+        """Add the signal at times `t` to `out`, in place."""
+        sampling_rate = 1 / (t[1] - t[0]) if len(t) > 1 else None
+        if self.bandwidth is None or sampling_rate is None \
+                or self.bandwidth >= sampling_rate / 2:
+            for output, gain in self.outputs.items():
+                add_output(out, t, self.sig_gen, output, gain, rng)
+            return
+
+        if self._filter is None or self._filter[0] != (self.bandwidth,
+                                                       sampling_rate):
+            sos = scipy.signal.butter(1, self.bandwidth, fs=sampling_rate,
+                                      output='sos')
+            self._filter = ((self.bandwidth, sampling_rate), sos,
+                            scipy.signal.sosfilt_zi(sos))
+        _, sos, zi = self._filter
+
+        settling = min(int(5 * sampling_rate / (2 * np.pi * self.bandwidth))
+                       + 1, self.max_settling)
+        t = np.concatenate((t[0] - np.arange(settling, 0, -1) / sampling_rate,
+                            t))
+        x = np.zeros(len(t))
+        for output, gain in self.outputs.items():
+            add_output(x, t, self.sig_gen, output, gain, rng)
+        y, _ = scipy.signal.sosfilt(sos, x, zi=zi * x[0])
+        out += y[settling:]
+
+
 class DummyOscilloscope(base_instruments.GenericOscilloscope):
-    def __init__(self):
-        super().__init__(2)
+    """Simulated oscilloscope with deterministic, configurable inputs.
+
+    Each input sees the sum of its `signals` (dicts of `add_waveform`
+    arguments) plus gaussian noise of `noise` volts rms, clipped to the
+    input range given by its scale (full range in volts) and offset.
+    Inputs can instead follow the outputs of a signal generator, see
+    `connect` and `hardware.dummy_bench.DummyBench`. Captures are taken
+    back to back from a virtual clock, so the same seed gives the same
+    data.
+
+    With `max_throughput` set, `get_data` cycles through `bank_size`
+    captures synthesized ahead of time, to feed downstream processing as
+    fast as possible. With `realtime` set, a capture is only returned once
+    its capture time has passed since `arm`.
+
+    :param num_inputs: number of input channels
+    :param buffer_size: samples per capture
+    :param sampling_rate: samples per second
+    :param seed: seed of the noise generator
+    """
+    bank_size = 8
+    # longest pause between captures searched for a trigger, in seconds
+    trigger_poll_interval = 1e-3
+
+    def __init__(self, num_inputs=2, buffer_size=4000, sampling_rate=1e6,
+                 seed=0):
+        super().__init__(num_inputs)
+        self._buffer_size = int(buffer_size)
+        self._sampling_rate = sampling_rate
+        self._seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._time = 0.0
+        self._armed_at = None
+        self._bank = None
+        self._bank_sources = None
+        self._bank_index = 0
+        self.max_throughput = False
+        self.realtime = False
+
+        self.signals = {c: [{'shape': 'sinusoid' if c % 2 == 0
+                             else 'square', 'frequency': 1e3,
+                             'amplitude': 1.0}]
+                        for c in self.input_ids}
+        self.noise = {c: 0.01 for c in self.input_ids}
+        self._sources = {}
+
+        input_defaults = {'enabled': True, 'scale': 10.0, 'offset': 0.0}
+        trigger_defaults = {'source': None, 'level': 0.0, 'edge': 'rising',
+                            'holdoff': 0.0, 'position': 0.0,
+                            'auto_timeout': 0.0}
+        self._dummy_channels = {c: input_defaults.copy()
+                                for c in self.input_ids}
+        self._dummy_channels['trigger'] = trigger_defaults
+
+    def get_channel_attribute(self, channel_id, name):
+        super().get_channel_attribute(channel_id, name)
+        return self._dummy_channels[channel_id][name]
+
+    def set_channel_attribute(self, channel_id, name, value):
+        super().set_channel_attribute(channel_id, name, value)
+        if channel_id == 'trigger':
+            if name == 'source' and value is not None \
+                    and value not in self.input_ids:
+                raise ValueError(f'Unknown trigger source {value!r}.')
+            if name == 'edge' and value not in self.trigger_edges:
+                raise ValueError(f'Unknown trigger edge {value!r}.')
+        self._dummy_channels[channel_id][name] = value
+        self._bank = None
+        self._cache_written(channel_id, name, value)
+
+    @property
+    def buffer_size(self):
+        return self._buffer_size
+
+    @buffer_size.setter
+    def buffer_size(self, buffer_size):
+        self._buffer_size = int(buffer_size)
+        self._bank = None
+
+    @property
+    def sampling_rate(self):
+        return self._sampling_rate
+
+    @sampling_rate.setter
+    def sampling_rate(self, sampling_rate):
+        self._sampling_rate = sampling_rate
+        self._bank = None
+
+    def set_signal(self, channel_id, *components, noise=None):
+        """Set what an input sees.
+
+        :param channel_id: input channel
+        :param components: dicts of `add_waveform` keyword arguments
+        :param noise: noise in volts rms, unchanged if None
+        """
+        self.signals[channel_id] = [dict(c) for c in components]
+        if noise is not None:
+            self.noise[channel_id] = noise
+        self._sources.pop(channel_id, None)
+        self._bank = None
+
+    def connect(self, sig_gen, outputs=None, bandwidth=None):
+        """Feed inputs from the outputs of a signal generator.
+
+        The output settings are read for every capture, and outputs that
+        are not enabled contribute nothing.
+
+        :param sig_gen: a `GenericSignalGenerator`
+        :param outputs: dict of {input: output}, where output is an output
+            index, a carrier channel id such as (0, 'carrier'), or a dict
+            of {output: gain} to sum several outputs; by default input i is
+            connected to output i
+        :param bandwidth: -3 dB frequency in Hz of a first-order low-pass
+            filter between the outputs and the inputs, None for no filter
+        """
+        if outputs is None:
+            outputs = {c: c for c in self.input_ids
+                       if (c, 'carrier') in sig_gen.channel_ids}
+        for c, output in outputs.items():
+            gains = output if isinstance(output, dict) else {output: 1.0}
+            gains = {o[0] if isinstance(o, tuple) else o: gain
+                     for o, gain in gains.items()}
+            self._sources[c] = SignalPath(sig_gen, gains, bandwidth)
+        self._bank = None
+
+    @property
+    def connections(self):
+        """Dict of {input: {output: gain}} of the inputs fed by `connect`."""
+        return {c: dict(path.outputs) for c, path in self._sources.items()}
 
     def arm(self):
-        pass
+        self._armed_at = time.perf_counter()
 
     def stop(self):
-        pass
+        self._armed_at = None
 
     def reset(self):
-        pass
+        self._time = 0.0
+        self._rng = np.random.default_rng(self._seed)
+        self._bank = None
+
+    def _render(self, out, channels, start):
+        """Synthesize the inputs for a capture starting at time `start`."""
+        t = start + np.arange(out.shape[1]) / self.sampling_rate
+        for row, c in zip(out, channels):
+            row.fill(0)
+            if c in self._sources:
+                self._sources[c].render(row, t, self._rng)
+            else:
+                for component in self.signals[c]:
+                    add_waveform(row, t, rng=self._rng, **component)
+            if self.noise.get(c):
+                row += self.noise[c] * self._rng.standard_normal(len(row))
+            settings = self._dummy_channels[c]
+            half_range = settings['scale'] / 2
+            np.clip(row, settings['offset'] - half_range,
+                    settings['offset'] + half_range, out=row)
+
+    def _trigger_index(self, samples, trigger):
+        """Index of the first trigger edge after the pre-trigger samples."""
+        pre_trigger = int(len(samples) / 2
+                          + trigger['position'] * self.sampling_rate)
+        pre_trigger = min(max(pre_trigger, 1), len(samples) - 1)
+        x = samples[pre_trigger - 1:]
+        if trigger['edge'] == 'rising':
+            crossed = (x[:-1] < trigger['level']) & (x[1:] >= trigger['level'])
+        else:
+            crossed = (x[:-1] > trigger['level']) & (x[1:] <= trigger['level'])
+        if not crossed.any():
+            return None, pre_trigger
+        return pre_trigger + crossed.argmax(), pre_trigger
+
+    def _capture(self, out, channels, timeout=None):
+        """Synthesize the next capture into `out`."""
+        trigger = self._dummy_channels['trigger']
+        capture_time = out.shape[1] / self.sampling_rate
+        source = trigger['source']
+        if source is not None and source not in channels:
+            channels = channels + (source,)
+            work = np.empty((len(channels), out.shape[1]))
+        else:
+            work = out
+
+        start = time.perf_counter()
+        while True:
+            self._render(work, channels, self._time)
+            if source is None:
+                break
+            index, position = self._trigger_index(
+                work[channels.index(source)], trigger)
+            if index is not None:
+                # move the edge to the trigger position
+                self._time += (index - position) / self.sampling_rate
+                self._render(work, channels, self._time)
+                break
+            self._time += capture_time
+            elapsed = time.perf_counter() - start
+            if trigger['auto_timeout'] and trigger['auto_timeout'] <= elapsed:
+                break
+            if timeout is not None and elapsed > timeout:
+                raise TimeoutError(f'No trigger after {timeout} s.')
+            # don't spin while waiting for a trigger that may never come
+            time.sleep(min(capture_time, self.trigger_poll_interval))
+
+        self._time += capture_time + trigger['holdoff']
+        if work is not out:
+            out[:] = work[:len(out)]
+
+    def _enabled_inputs(self):
+        return tuple(c for c in self.input_ids
+                     if self._dummy_channels[c]['enabled'])
+
+    def get_data(self, timeout=None, out=None):
+        """Return the next capture of the enabled inputs.
+
+        :param timeout: seconds to wait for a trigger, forever if None
+        :param out: float64 array shaped (channels, samples) to fill
+            instead of a new one
+        :return: dict of samples for each enabled channel
+        """
+        channels = self._enabled_inputs()
+        shape = (len(channels), self.buffer_size)
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape or out.dtype != np.float64:
+            raise ValueError(f'out must be a float64 array of shape {shape}.')
+
+        if self.max_throughput:
+            # the bank follows the settings of connected generators
+            sources = {c: path.settings()
+                       for c, path in self._sources.items()}
+            if self._bank is None or self._bank.shape[1:] != shape \
+                    or self._bank_sources != sources:
+                self._bank_sources = sources
+                self._bank = np.empty((self.bank_size,) + shape)
+                for capture in self._bank:
+                    self._capture(capture, channels, timeout)
+            out[:] = self._bank[self._bank_index % len(self._bank)]
+            self._bank_index += 1
+        else:
+            self._capture(out, channels, timeout)
 
-    def get_data(self):
-        return {0: rand(4000),
-                1: rand(4000)}
+        if self.realtime and self._armed_at is not None:
+            remaining = self._armed_at + self.buffer_size \
+                / self.sampling_rate - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+        return dict(zip(channels, out))
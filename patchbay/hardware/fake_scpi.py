@@ -0,0 +1,308 @@
+import random
+import socketserver
+import threading
+import time
+
+
+class _ScpiError(Exception):
+    pass
+
+
+def _short_form(mnemonic):
+    return ''.join(c for c in mnemonic if not c.islower())
+
+
+class FakeAgilent33120A:
+    """Command interpreter standing in for an Agilent 33120A.
+
+    Understands the subset of SCPI used by `Agilent33120ASignalGenerator`
+    plus the common commands needed to drive it. Headers are case
+    insensitive and may use either the long or short (upper case) form of
+    each mnemonic, e.g. `FUNCtion:SHAPe` accepts `function:shape`,
+    `FUNC:SHAP` or `func:shape`. Several commands can be joined with ';'
+    into a single program.
+
+    Failed commands push an entry onto the error queue, which holds up to
+    `error_queue_size` entries like the real instrument.
+    """
+    error_queue_size = 20
+    identity = 'HEWLETT-PACKARD,33120A,0,8.0-5.0-1.0'
+
+    _shapes = ('SIN', 'SQU', 'TRI', 'RAMP', 'NOIS', 'DC', 'USER')
+    _limits = {'frequency': (100e-6, 15e6),
+               'voltage': (50e-3, 10.0),
+               'voltage:offset': (-5.0, 5.0)}
+    _defaults = {'function:shape': 'SIN',
+                 'frequency': 1e3,
+                 'voltage': 0.1,
+                 'voltage:offset': 0.0,
+                 'output:sync': True}
+
+    # header as spelled in the manual: canonical (long, lower case) name
+    _headers = {'FUNCtion:SHAPe': 'function:shape',
+                'FREQuency': 'frequency',
+                'VOLTage': 'voltage',
+                'VOLTage:OFFSet': 'voltage:offset',
+                'OUTPut:SYNC': 'output:sync',
+                'SYSTem:ERRor': 'system:error',
+                'SYSTem:REMote': 'system:remote',
+                'SYSTem:LOCal': 'system:local',
+                '*IDN': '*idn',
+                '*RST': '*rst',
+                '*CLS': '*cls'}
+
+    def __init__(self):
+        self.remote = False
+        self.settings = self._defaults.copy()
+        self.error_queue = []
+        self.commands_executed = 0
+
+        self._header_lookup = {}
+        for spelling, canonical in self._headers.items():
+            options = [(m.lower(), _short_form(m).lower())
+                       for m in spelling.split(':')]
+            self._header_lookup[tuple(options)] = canonical
+
+    def execute(self, program):
+        """Run a program and return the joined query responses, if any.
+
+        :param program: one or more commands separated by ';'
+        :return: response string or None if nothing was queried
+        """
+        responses = []
+        for command in program.split(';'):
+            header, _, argument = command.strip().lstrip(':').partition(' ')
+            if not header:
+                continue
+            self.commands_executed += 1
+
+            is_query = header.endswith('?')
+            canonical = self._canonical_header(header.rstrip('?'))
+            if canonical is None:
+                self.push_error(-113, 'Undefined header')
+                continue
+
+            try:
+                if is_query:
+                    responses.append(self._query(canonical))
+                else:
+                    self._set(canonical, argument.strip())
+            except _ScpiError as e:
+                self.push_error(*e.args)
+
+        return ';'.join(responses) if responses else None
+
+    def push_error(self, code, message):
+        if len(self.error_queue) < self.error_queue_size - 1:
+            self.error_queue.append((code, message))
+        elif len(self.error_queue) < self.error_queue_size:
+            self.error_queue.append((-350, 'Too many errors'))
+
+    def _canonical_header(self, header):
+        mnemonics = header.lower().split(':')
+        for options, canonical in self._header_lookup.items():
+            if len(options) == len(mnemonics) and all(
+                    m in option for m, option in zip(mnemonics, options)):
+                return canonical
+        return None
+
+    def _query(self, header):
+        if header == 'system:error':
+            code, message = self.error_queue.pop(0) if self.error_queue \
+                else (0, 'No error')
+            return f'{code:+d},"{message}"'
+        if header == '*idn':
+            return self.identity
+        if header not in self.settings:
+            raise _ScpiError(-113, 'Undefined header')
+
+        value = self.settings[header]
+        if isinstance(value, bool):
+            return str(int(value))
+        if isinstance(value, float):
+            return f'{value:+.14E}'
+        return value
+
+    def _set(self, header, argument):
+        if header == 'system:remote':
+            self.remote = True
+        elif header == 'system:local':
+            self.remote = False
+        elif header == '*rst':
+            self.settings = self._defaults.copy()
+        elif header == '*cls':
+            self.error_queue.clear()
+        elif header == 'function:shape':
+            try:
+                self.settings[header] = next(
+                    shape for shape in self._shapes
+                    if argument.upper().startswith(shape))
+            except StopIteration:
+                raise _ScpiError(-224, 'Illegal parameter value')
+        elif header == 'output:sync':
+            if argument.upper() not in ('0', '1', 'ON', 'OFF'):
+                raise _ScpiError(-224, 'Illegal parameter value')
+            self.settings[header] = argument.upper() in ('1', 'ON')
+        elif header in self._limits:
+            self.settings[header] = self._parse_number(header, argument)
+        else:
+            raise _ScpiError(-113, 'Undefined header')
+
+    def _parse_number(self, header, argument):
+        low, high = self._limits[header]
+        keyword = argument.upper()
+        if keyword in ('MIN', 'MINIMUM'):
+            return low
+        if keyword in ('MAX', 'MAXIMUM'):
+            return high
+        if keyword in ('DEF', 'DEFAULT'):
+            return self._defaults[header]
+
+        try:
+            value = float(argument)
+        except ValueError:
+            raise _ScpiError(-104, 'Data type error')
+        if not low <= value <= high:
+            raise _ScpiError(-222, 'Data out of range')
+        return value
+
+
+class FakeResource:
+    """Minimal VISA message based resource wrapping a fake device.
+
+    Every `write` and `query` is one bus transaction. Each transaction waits
+    `latency` seconds, varied uniformly by up to +/- `jitter`, plus the time
+    to transfer the message and response at `bytes_per_second` (e.g. 960 for
+    9600 baud RS-232), if given. Transactions are counted in
+    `transactions`.
+
+    :param device: the fake device that executes programs
+    :param latency: fixed delay per transaction, in seconds
+    :param jitter: maximum random variation of the delay, in seconds
+    :param bytes_per_second: transfer rate of the bus, or None for no limit
+    :param seed: seed for the jitter, for repeatable runs
+    """
+
+    def __init__(self, device, latency=0.0, jitter=0.0, bytes_per_second=None,
+                 seed=None):
+        self.device = device
+        self.latency = latency
+        self.jitter = jitter
+        self.bytes_per_second = bytes_per_second
+        self.transactions = 0
+
+        self._random = random.Random(seed)
+        self._response = None
+
+    def _transact(self, message):
+        self.transactions += 1
+        response = self.device.execute(message)
+
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        if self.bytes_per_second:
+            size = len(message) + 1 + (len(response) + 1 if response else 0)
+            delay += size / self.bytes_per_second
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    def write(self, message):
+        response = self._transact(message)
+        if response is not None:
+            self._response = response
+        return len(message)
+
+    def read(self):
+        response, self._response = self._response, None
+        if response is None:
+            raise TimeoutError('No response pending.')
+        return response + '\n'
+
+    def query(self, message):
+        self._response = self._transact(message)
+        return self.read()
+
+    def close(self):
+        pass
+
+
+class FakeResourceManager:
+    """Stand-in for `visa.ResourceManager` that opens fake resources.
+
+    Keyword arguments are passed on to every `FakeResource` it opens.
+    """
+
+    def __init__(self, device_class=FakeAgilent33120A, **resource_options):
+        self.device_class = device_class
+        self.resource_options = resource_options
+        self.resources = {}
+
+    def open_resource(self, resource_name):
+        resource = FakeResource(self.device_class(), **self.resource_options)
+        self.resources[resource_name] = resource
+        return resource
+
+
+class _ScpiRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            program = line.decode('ascii').strip()
+            if not program:
+                continue
+
+            with server.device_lock:
+                response = server.resource._transact(program)
+            if response is not None:
+                self.wfile.write(response.encode('ascii') + b'\n')
+
+
+class FakeScpiServer(socketserver.ThreadingTCPServer):
+    """TCP server exposing a fake device as a raw SCPI socket.
+
+    Programs are newline terminated and every query response is sent back
+    followed by a newline. All connections share one device. With pyvisa
+    the server can be opened as `TCPIP::<host>::<port>::SOCKET` with
+    `read_termination='\\n'`.
+
+    Keyword arguments other than `device` set the latency model, as for
+    `FakeResource`.
+
+    :param address: (host, port) to listen on; port 0 picks a free port
+    :param device: device to serve, a new `FakeAgilent33120A` by default
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), device=None,
+                 **resource_options):
+        super().__init__(address, _ScpiRequestHandler)
+        if device is None:
+            device = FakeAgilent33120A()
+        self.resource = FakeResource(device, **resource_options)
+        self.device_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def device(self):
+        return self.resource.device
+
+    @property
+    def resource_name(self):
+        host, port = self.server_address[:2]
+        return f'TCPIP::{host}::{port}::SOCKET'
+
+    def start(self):
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True, name='FakeScpiServer')
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
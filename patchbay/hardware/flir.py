@@ -1,8 +1,11 @@
 import warnings
 from collections import namedtuple
 
+import numpy as np
 import PySpin
 
+from hardware.frame_pool import FramePool
+
 
 class FlirAPI:
     def __init__(self):
@@ -205,7 +208,40 @@ class FlirNodeMap:
 
 
 class FlirCamera:
-    def __init__(self, camera_ptr):
+    """FLIR camera through Spinnaker.
+
+    How frames are handed out depends on `buffer_mode`:
+
+    - 'copy': each frame is a new array
+    - 'pool': frames are copied into buffers of `pool`
+    - 'view': frames are views of the driver buffers, with no copy
+
+    In 'pool' and 'view' mode frames must be given back with `release`; in
+    'view' mode the driver buffer is held until then, so keep fewer frames
+    than the stream has buffers (StreamBufferCountManual).
+
+    Frames are converted to `pixel_format` with `interpolation` if set and
+    the camera delivers another format; None keeps the camera format, e.g.
+    to debayer later or not at all. Converted frames are copied by the
+    conversion, but still not again in 'view' mode.
+
+    :param camera_ptr: `PySpin.CameraPtr`
+    :param buffer_mode: one of `buffer_modes`
+    :param pool_size: number of frames in the pool
+    """
+    buffer_modes = ('copy', 'pool', 'view')
+
+    def __init__(self, camera_ptr, buffer_mode='copy', pool_size=8):
+        if buffer_mode not in self.buffer_modes:
+            raise ValueError(f'Unknown buffer mode {buffer_mode!r}.')
+        self.buffer_mode = buffer_mode
+        self.pool = FramePool(pool_size)
+        self.pixel_format = PySpin.PixelFormat_Mono8
+        self.interpolation = PySpin.HQ_LINEAR
+        # id of a frame handed out as a view: (frame, driver image, converted
+        # image), the images holding the memory of the frame
+        self._views = {}
+
         self._camera_ptr = camera_ptr
         self._camera_ptr.Init()
 
@@ -227,6 +263,10 @@ class FlirCamera:
         pass
 
     def read(self, timeout=None):
+        """Get the next image, or None if it was incomplete.
+
+        :param timeout: milliseconds to wait for the image, forever if None
+        """
         if timeout is None:
             timeout = PySpin.EVENT_TIMEOUT_INFINITE
         try:
@@ -234,20 +274,46 @@ class FlirCamera:
         except PySpin.SpinnakerException as e:
             raise TimeoutError('Image acquisition timed out.')
 
-        image_out = None
-        if image.IsIncomplete():
-            print('Image incomplete with '
-                  'status %d ...' % image.GetImageStatus())
-        else:
-            width = image.GetWidth()
-            height = image.GetHeight()
-
-            image_out = image.Convert(PySpin.PixelFormat_Mono8,
-                                      PySpin.HQ_LINEAR)
-            image_out = image_out.GetData().reshape((height, width))
-
-            image.Release()
-        return image_out
+        converted = None
+        try:
+            if image.IsIncomplete():
+                warnings.warn(f'Image incomplete with status '
+                              f'{image.GetImageStatus()}')
+                return None
+
+            if self.pixel_format is not None \
+                    and image.GetPixelFormat() != self.pixel_format:
+                converted = image.Convert(self.pixel_format,
+                                          self.interpolation)
+            data = (image if converted is None else converted).GetNDArray()
+
+            if self.buffer_mode == 'view':
+                if converted is None:
+                    # keep the driver buffer until the frame is released
+                    self._views[id(data)] = (data, image, None)
+                    image = None
+                else:
+                    self._views[id(data)] = (data, None, converted)
+                return data
+            if self.buffer_mode == 'pool':
+                pool_timeout = None if timeout == \
+                    PySpin.EVENT_TIMEOUT_INFINITE else timeout / 1000
+                image_out = self.pool.acquire(data.shape, data.dtype,
+                                              pool_timeout)
+                np.copyto(image_out, data)
+                return image_out
+            return data.copy()
+        finally:
+            if image is not None:
+                image.Release()
+
+    def release(self, image):
+        """Give a frame from `read` back, in 'pool' or 'view' mode."""
+        if self.pool.release(image):
+            return
+        _, driver_image, _ = self._views.pop(id(image), (None, None, None))
+        if driver_image is not None:
+            driver_image.Release()
 
     def stop(self):
         try:
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+Frame = namedtuple('Frame', 'index, timestamp, image')
+Frame.__doc__ = """Image grabbed from a camera.
+
+`index` counts the frames grabbed since the grabber started and
+`timestamp` is the time.time() at which `read` returned the image.
+"""
+
+GrabberStats = namedtuple('GrabberStats', 'grabbed, dropped, late, queued')
+GrabberStats.__doc__ = """Frame counters of a `FrameGrabber`.
+
+`dropped` frames were discarded before a consumer took them, `late` frames
+were handed out after a newer frame had already been grabbed, and `queued`
+frames are waiting in the buffer.
+"""
+
+
+class FrameGrabber:
+    """Read frames from a camera on a dedicated acquisition thread.
+
+    Frames go into a bounded buffer so a slow consumer never holds up the
+    camera. What happens when the buffer is full depends on the policy:
+
+    - 'latest': only the newest frame is kept, for live displays
+    - 'drop_oldest': the oldest frame is discarded to make room
+    - 'block': the acquisition thread waits for a consumer, which loses
+      frames in the camera driver instead, but none in the grabber; the
+      frame waiting when the grabber stops is still buffered
+
+    Consumers call `get` or iterate over the grabber to take frames in
+    order, or `latest` to look at the newest frame without taking it.
+    Cameras that lend out their image memory (see `GenericCamera.release`)
+    get dropped frames back from the grabber, and taken frames through
+    `release`; with `copy` set they get every image back right away.
+
+    The camera needs `start`, `stop` and `read(timeout)` as in
+    `GenericCamera`; `read` may return None for a bad frame and raise
+    TimeoutError if no frame arrived in time. Any other exception stops
+    the grabber and is raised to the consumer.
+
+    :param camera: the camera to read from
+    :param size: number of frames the buffer holds, 1 for 'latest'
+    :param policy: one of `policies`
+    :param read_timeout: timeout passed to `camera.read`, in the units of
+        the camera; it also bounds how long `stop` takes
+    :param copy: copy images before buffering them, for cameras that
+        reuse the memory of returned images
+    """
+    policies = ('latest', 'drop_oldest', 'block')
+
+    def __init__(self, camera, size=8, policy='drop_oldest',
+                 read_timeout=500, copy=False):
+        if policy not in self.policies:
+            raise ValueError(f'Unknown policy {policy!r}.')
+        self.camera = camera
+        self.size = 1 if policy == 'latest' else size
+        self.policy = policy
+        self.read_timeout = read_timeout
+        self.copy = copy
+
+        self._frames = deque()
+        self._latest = None
+        self._grabbed = self._dropped = self._late = 0
+        self._error = None
+        self._done = True
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __iter__(self):
+        """Take frames in order until the grabber stops."""
+        while True:
+            frame = self.get()
+            if frame is None:
+                return
+            yield frame
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stats(self):
+        with self._condition:
+            return GrabberStats(self._grabbed, self._dropped, self._late,
+                                len(self._frames))
+
+    def start(self):
+        """Start the camera and the acquisition thread.
+
+        Frames left from an earlier run are discarded and the counters
+        start over.
+        """
+        if self.running:
+            return
+        with self._condition:
+            while self._frames:
+                self._drop(self._frames.popleft())
+            self._latest = None
+            self._grabbed = self._dropped = self._late = 0
+        self._stop.clear()
+        self._error = None
+        self._done = False
+        self.camera.start()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f'FrameGrabber-{self.camera}')
+        self._thread.start()
+
+    def stop(self):
+        """Stop the acquisition thread and the camera.
+
+        Frames still in the buffer can be taken afterwards.
+        """
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.camera.stop()
+
+    def latest(self):
+        """Return the newest frame grabbed, or None if there is none yet.
+
+        The frame stays in the buffer for `get`. Once its image went back
+        to the camera, through `release` or by being dropped, there is no
+        latest frame until the next one is grabbed.
+        """
+        with self._condition:
+            return self._latest
+
+    def get(self, timeout=None):
+        """Take the next frame from the buffer.
+
+        :param timeout: seconds to wait for a frame, forever if None
+        :return: `Frame`, or None once the grabber has stopped and the
+            buffer is empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._frames or self._done, timeout):
+                raise TimeoutError(f'No frame after {timeout} s.')
+            if not self._frames:
+                if self._error is not None:
+                    raise self._error
+                return None
+            frame = self._frames.popleft()
+            if frame.index < self._grabbed - 1:
+                self._late += 1
+            self._condition.notify_all()
+            return frame
+
+    def release(self, frame):
+        """Give the image of a taken frame back to the camera."""
+        self._drop(frame)
+
+    def _drop(self, frame):
+        with self._condition:
+            if self._latest is frame:
+                self._latest = None
+        if not self.copy:
+            self._release(frame.image)
+
+    def _release(self, image):
+        release = getattr(self.camera, 'release', None)
+        if release is not None:
+            release(image)
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    image = self.camera.read(self.read_timeout)
+                except TimeoutError:
+                    continue
+                if image is None:
+                    continue
+                timestamp = time.time()
+                if self.copy:
+                    copied = np.array(image, copy=True)
+                    self._release(image)
+                    image = copied
+                self._put(image, timestamp)
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def _put(self, image, timestamp):
+        with self._condition:
+            frame = Frame(self._grabbed, timestamp, image)
+            self._grabbed += 1
+            self._latest = frame
+            if self.policy == 'block':
+                # when stopping, the frame goes in even if the buffer is full
+                self._condition.wait_for(
+                    lambda: len(self._frames) < self.size
+                    or self._stop.is_set())
+            else:
+                while len(self._frames) >= self.size:
+                    self._dropped += 1
+                    self._drop(self._frames.popleft())
+            self._frames.append(frame)
+            self._condition.notify_all()
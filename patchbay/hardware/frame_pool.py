@@ -0,0 +1,140 @@
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FramePool:
+    """Fixed number of image buffers that are handed out and given back.
+
+    Cameras copy each frame straight from the driver into a buffer of the
+    pool instead of allocating a new array, and the consumer releases the
+    buffer once done with the frame. Buffers are allocated on first use;
+    when the frame shape or dtype changes, e.g. after setting a region of
+    interest, buffers of the old format are dropped as they come back.
+
+    :param size: number of buffers
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self._format = None
+        self._free = []
+        self._in_use = {}
+        self._condition = threading.Condition()
+
+    @property
+    def available(self):
+        """Number of buffers that can be acquired without waiting."""
+        with self._condition:
+            return self.size - len(self._in_use)
+
+    def acquire(self, shape, dtype, timeout=None):
+        """Take a buffer from the pool, waiting for one to be released.
+
+        :param shape: shape of the frame
+        :param dtype: dtype of the frame
+        :param timeout: seconds to wait, forever if None
+        :return: uninitialized array
+        """
+        frame_format = (tuple(shape), np.dtype(dtype))
+        with self._condition:
+            if frame_format != self._format:
+                self._format = frame_format
+                self._free.clear()
+            if not self._condition.wait_for(
+                    lambda: len(self._in_use) < self.size, timeout):
+                raise TimeoutError('No free buffer in the frame pool.')
+            buffer = self._free.pop() if self._free \
+                else np.empty(*frame_format)
+            self._in_use[id(buffer)] = buffer
+            return buffer
+
+    def release(self, array):
+        """Give a buffer back to the pool.
+
+        :param array: array returned by `acquire`
+        :return: True if the array came from the pool, otherwise False
+        """
+        with self._condition:
+            buffer = self._in_use.pop(id(array), None)
+            if buffer is None:
+                return False
+            if (buffer.shape, buffer.dtype) == self._format:
+                self._free.append(buffer)
+            self._condition.notify()
+            return True
+
+
+class SharedFrameRing:
+    """Fixed number of frame slots in shared memory.
+
+    The owning process copies frames into free slots and passes slot
+    numbers to other processes, which open the same ring by name and read
+    the slots in place. Slots are given back with `release` once the other
+    process is done with them.
+
+    :param num_slots: number of slots
+    :param shape: shape of a frame
+    :param dtype: dtype of a frame
+    :param name: name of an existing ring to open, a new ring if None
+    """
+
+    def __init__(self, num_slots, shape, dtype, name=None):
+        self.num_slots = num_slots
+        self._owner = name is None
+        if self._owner:
+            nbytes = num_slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.slots = np.ndarray((num_slots,) + tuple(shape), dtype,
+                                buffer=self._shm.buf)
+        self._free = list(range(num_slots)) if self._owner else []
+
+    @property
+    def name(self):
+        """Name to open the ring by in another process."""
+        return self._shm.name
+
+    def check(self, image, what):
+        """Raise ValueError unless `image` fits the slots of the ring.
+
+        :param what: what the ring holds frames for, for the message
+        """
+        if image.shape != self.slots.shape[1:] \
+                or image.dtype != self.slots.dtype:
+            raise ValueError(f'Frame of shape {image.shape} and dtype '
+                             f'{image.dtype} does not match the {what}.')
+
+    def put(self, image, reclaim, block=True, timeout=None):
+        """Copy a frame into a free slot.
+
+        :param image: the frame
+        :param reclaim: function of (block, timeout) that waits for a slot
+            another process is done with and returns it, raising
+            queue.Empty if none comes back; called when no slot is free
+        :param block: wait for a slot to come back if none is free
+        :param timeout: seconds to wait, forever if None
+        :return: slot number, or None if no slot was free in time
+        """
+        if not self._free:
+            try:
+                self._free.append(reclaim(block, timeout))
+            except queue.Empty:
+                return None
+        slot = self._free.pop()
+        self.slots[slot] = image
+        return slot
+
+    def release(self, slot):
+        """Give a slot back once the other process is done with it."""
+        self._free.append(slot)
+
+    def close(self):
+        """Close the ring, and free the memory if this process made it."""
+        self.slots = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
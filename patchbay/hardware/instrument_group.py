@@ -0,0 +1,145 @@
+from concurrent.futures import wait
+
+from hardware.async_instrument import device_executor, release_executor
+
+
+def _channel_id(channel_id):
+    """Undo the tuple to list conversion of a JSON round trip."""
+    return tuple(channel_id) if isinstance(channel_id, list) else channel_id
+
+
+def diff_snapshots(target, current):
+    """Find the attribute values that must change to reach a target state.
+
+    :param target: snapshot to move to
+    :param current: snapshot of the present state
+    :return: dict of {instrument name: {channel_id: {attr: new value}}}
+    """
+    changes = {}
+    for name, channels in target.items():
+        present = {_channel_id(c): details
+                   for c, details in current.get(name, [])}
+        for channel_id, details in channels:
+            channel_id = _channel_id(channel_id)
+            now = present.get(channel_id, {})
+            diff = {attr: value for attr, value in details.items()
+                    if attr not in now or now[attr] != value}
+            if diff:
+                changes.setdefault(name, {})[channel_id] = diff
+    return changes
+
+
+class InstrumentGroup:
+    """Named instruments whose configuration is saved and restored together.
+
+    Every instrument is handled on its device executor (see
+    `hardware.async_instrument.device_executor`), so different devices are
+    read and written concurrently while calls to a single device stay in
+    order, including calls made through an `AsyncInstrument`.
+
+    Snapshots have the form {instrument name: [[channel_id, details], ...]}
+    and contain only built-in types, so they can be saved with `json` (tuple
+    channel IDs come back as lists, which `restore` accepts).
+
+    Call `close`, or use the group as a context manager, to release the
+    executors once done.
+
+    :param instruments: dict of instruments keyed by name
+    :param device_keys: optional dict of executor keys by instrument name,
+        for instruments that share one physical device
+    """
+
+    def __init__(self, instruments, device_keys=None):
+        self.instruments = dict(instruments)
+        self.device_keys = dict(device_keys or {})
+        # device key: executor taken from `device_executor`
+        self._executors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getitem__(self, name):
+        return self.instruments[name]
+
+    def _executor(self, name):
+        key = self.device_keys.get(name, self.instruments[name])
+        if key not in self._executors:
+            self._executors[key] = device_executor(key)
+        return self._executors[key]
+
+    def _run_all(self, func, names):
+        """Call `func(instrument, name)` for each instrument concurrently.
+
+        Waits for every call to finish, then raises RuntimeError naming the
+        instruments whose call failed, chained from the first failure.
+        """
+        futures = {name: self._executor(name).submit(
+            func, self.instruments[name], name) for name in names}
+        wait(futures.values())
+
+        errors = {name: future.exception()
+                  for name, future in futures.items()
+                  if future.exception() is not None}
+        if errors:
+            failures = '; '.join(f'{name}: {error!r}'
+                                 for name, error in errors.items())
+            raise RuntimeError(f'Failed on {failures}.') \
+                from next(iter(errors.values()))
+        return {name: future.result() for name, future in futures.items()}
+
+    def snapshot(self, names=None):
+        """Read the details of every channel of every instrument.
+
+        :param names: instruments to include, or all if None
+        :return: snapshot of the instruments' configuration
+        """
+        if names is None:
+            names = list(self.instruments)
+
+        def read(instrument, name):
+            return [[c, instrument.channel_details(c)]
+                    for c in instrument.channel_ids]
+
+        return self._run_all(read, names)
+
+    def restore(self, snapshot, reference=None):
+        """Configure the instruments to match a snapshot.
+
+        Only attributes that differ from the present state are written. The
+        present state is read from the instruments (served from their
+        attribute caches where enabled) unless a `reference` snapshot that is
+        known to match them is given.
+
+        :param snapshot: snapshot to restore
+        :param reference: snapshot of the present state, if known
+        :return: the changes that were written, as from `diff_snapshots`
+        """
+        if reference is None:
+            def read(instrument, name):
+                return [[_channel_id(c),
+                         instrument.channel_details(_channel_id(c),
+                                                    list(details))]
+                        for c, details in snapshot[name]]
+
+            reference = self._run_all(read, snapshot)
+
+        changes = diff_snapshots(snapshot, reference)
+
+        def write(instrument, name):
+            for channel_id, diff in changes[name].items():
+                instrument.configure_channel(channel_id, **diff)
+
+        self._run_all(write, changes)
+        return changes
+
+    def close(self, wait=True):
+        """Release the device executors used by the group.
+
+        :param wait: block until pending calls have finished
+        """
+        for key in self._executors:
+            release_executor(key, wait=wait)
+        self._executors.clear()
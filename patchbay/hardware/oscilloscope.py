@@ -1,7 +1,81 @@
-import dwf
+import asyncio
 import time
+from collections import namedtuple
+from ctypes import POINTER, c_double
+
+import dwf
+import numpy as np
+
+from hardware.base_instruments import Average, GenericOscilloscope
+
+StreamChunk = namedtuple('StreamChunk', 'start, channels, data, lost, corrupt')
+StreamChunk.__doc__ = """Block of samples from a streaming acquisition.
+
+`data` holds one row per channel in `channels`. It is a view into the
+stream's ring buffer that stays valid until the ring wraps around, so copy
+it to keep it longer. `start` is the index of the first sample since the
+stream started, counting lost samples: the `lost` samples right before it
+were dropped by the device and `corrupt` samples in it may be invalid.
+"""
+
+AcquisitionPlan = namedtuple('AcquisitionPlan',
+                             'channels, samples, dtype, capture_time')
+AcquisitionPlan.__doc__ = """What a capture returns, resolved once when armed.
+
+`channels` are the enabled channels in the order of the rows of the data
+array, `samples` the number of samples per channel and `capture_time` the
+time to fill the buffer in seconds.
+"""
+
+
+def _read_samples(device, channel, out):
+    """Copy the samples of a channel straight into a float64 array.
+
+    :param device: `dwf.DwfAnalogIn` holding the data
+    :param channel: channel index
+    :param out: C contiguous 1D float64 array to fill
+    """
+    dwf.FDwfAnalogInStatusData(device.hdwf, channel,
+                               out.ctypes.data_as(POINTER(c_double)),
+                               len(out))
+
+
+class _Recorder:
+    """Pull record mode samples from the device into a ring buffer."""
+
+    def __init__(self, device, channels, ring_size):
+        self.device = device
+        self.channels = tuple(channels)
+        self.ring = np.empty((len(self.channels), int(ring_size)))
+        self.received = 0
+        self.lost = 0
+        self.corrupt = 0
+        self._write = 0
+
+    def poll(self):
+        """Read the samples recorded since the last poll.
 
-from hardware.base_instruments import GenericOscilloscope
+        :return: (StreamChunk or None, True once the record is complete)
+        """
+        done = self.device.status(True) == dwf.DwfAnalogIn.STATE.DONE
+        available, lost, corrupt = self.device.statusRecord()
+        if not (available or lost or corrupt):
+            return None, done
+
+        # keep each chunk contiguous by wrapping early
+        if self._write + available > self.ring.shape[1]:
+            self._write = 0
+        block = self.ring[:, self._write:self._write + available]
+        for row, c in zip(block, self.channels):
+            _read_samples(self.device, c, row)
+
+        self.lost += lost
+        self.corrupt += corrupt
+        chunk = StreamChunk(self.received + self.lost, self.channels, block,
+                            lost, corrupt)
+        self.received += available
+        self._write += available
+        return chunk, done
 
 
 class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
@@ -17,22 +91,41 @@ class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
                              {'enabled': 'enable',
                               'offset': 'offset',
                               'scale': 'range'}.items()}
+    _map_trigger_commands = {n: f'trigger{m}{{}}' for n, m in
+                             {'level': 'Level',
+                              'edge': 'Condition',
+                              'holdoff': 'HoldOff',
+                              'position': 'Position',
+                              'auto_timeout': 'AutoTimeout'}.items()}
+    _map_edges = {'rising': 'RISING_POSITIVE', 'falling': 'FALLING_NEGATIVE'}
+
+    # polling interval after the expected capture time has passed, in seconds
+    min_poll_interval = 100e-6
+    max_poll_interval = 10e-3
+    # fraction of the expected capture time to sleep before polling
+    sleep_fraction = 0.9
 
     def __init__(self, device_handle=-1):
         self.device = dwf.DwfAnalogIn(device_handle)
         super().__init__(2)
+        self._armed_at = None
+        self._plan = None
+        self._buffer = None
         self.buffer_size = 4e3
         self.sampling_rate = 20e6
 
     def _preformat_channel_value(self, channel_id, attr_name, value):
-        formatters = {}
+        formatters = {'edge': lambda x: self._trigger_conditions[
+            self._map_edges[x]]}
         try:
             return formatters[attr_name](value)
         except KeyError:
             return value
 
     def _postformat_channel_value(self, channel_id, attr_name, value):
-        formatters = {}
+        edges = {v: k for k, v in self._map_edges.items()}
+        formatters = {'edge': lambda x:
+                      edges[self._trigger_conditions(x).name]}
         try:
             return formatters[attr_name](value)
         except KeyError:
@@ -41,7 +134,12 @@ class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
     def get_channel_attribute(self, channel_id, name):
         super().get_channel_attribute(channel_id, name)
 
-        if name in self._map_channel_commands:
+        if channel_id == 'trigger':
+            if name == 'source':
+                return self._get_trigger_source()
+            handler_name = self._map_trigger_commands[name].format('Get')
+            value = getattr(self.device, handler_name)()
+        elif name in self._map_channel_commands:
             handler_name = self._map_channel_commands[name].format('Get')
             value = getattr(self.device, handler_name)(channel_id)
         else:
@@ -52,13 +150,70 @@ class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
     def set_channel_attribute(self, channel_id, name, value):
         super().set_channel_attribute(channel_id, name, value)
 
-        value = self._preformat_channel_value(channel_id, name, value)
-        if name in self._map_channel_commands:
-            handler_name = self._map_channel_commands[name].format('Set')
-            getattr(self.device, handler_name)(channel_id, value)
+        if channel_id == 'trigger':
+            if name == 'source':
+                self._set_trigger_source(value)
+            else:
+                device_value = self._preformat_channel_value(channel_id, name,
+                                                             value)
+                handler_name = self._map_trigger_commands[name].format('Set')
+                getattr(self.device, handler_name)(device_value)
+        else:
+            device_value = self._preformat_channel_value(channel_id, name,
+                                                         value)
+            if name in self._map_channel_commands:
+                handler_name = self._map_channel_commands[name].format('Set')
+                getattr(self.device, handler_name)(channel_id, device_value)
+            if name == 'enabled':
+                self._plan = None
+        # the device normalizes sources and quantizes ranges and levels
+        self._cache_read_back(channel_id, name)
+
+    def _get_trigger_source(self):
+        source = self._trigger_sources(self.device.triggerSourceGet())
+        if source == self._trigger_sources.NONE:
+            return None
+        if source == self._trigger_sources.DETECTOR_ANALOG_IN:
+            return self.device.triggerChannelGet()
+        return source.name.lower()
+
+    def _set_trigger_source(self, source):
+        if source is None:
+            self.device.triggerSourceSet(self._trigger_sources.NONE)
+        elif source in self.input_ids:
+            self.device.triggerSourceSet(
+                self._trigger_sources.DETECTOR_ANALOG_IN)
+            self.device.triggerChannelSet(source)
+            self.device.triggerTypeSet(self._trigger_types.EDGE)
+        else:
+            try:
+                self.device.triggerSourceSet(
+                    self._trigger_sources[str(source).upper()])
+            except KeyError:
+                raise ValueError(f'Unknown trigger source {source!r}.') \
+                    from None
+
+    @property
+    def plan(self):
+        """The `AcquisitionPlan` for the current settings.
+
+        Resolved from the device the first time it is needed after the
+        enabled channels, buffer size or sampling rate were changed through
+        this driver.
+        """
+        if self._plan is None:
+            channels = tuple(
+                c for c in self.input_ids
+                if self.channel_details(c, ['enabled'])['enabled'])
+            buffer_size = self.buffer_size
+            self._plan = AcquisitionPlan(channels, buffer_size, np.float64,
+                                         buffer_size / self.sampling_rate)
+        return self._plan
 
     def arm(self):
+        self.plan
         self.device.configure(False, True)
+        self._armed_at = time.perf_counter()
 
     def stop(self):
         self.device.configure(False, False)
@@ -74,6 +229,7 @@ class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
     @buffer_size.setter
     def buffer_size(self, buffer_size):
         self.device.bufferSizeSet(int(buffer_size))
+        self._plan = None
 
     @property
     def sampling_rate(self):
@@ -82,17 +238,206 @@ class AnalogDiscovery2Oscilloscope(GenericOscilloscope):
     @sampling_rate.setter
     def sampling_rate(self, sampling_rate):
         self.device.frequencySet(sampling_rate)
+        self._plan = None
+
+    @property
+    def capture_time(self):
+        """Time to fill the buffer once triggered, in seconds."""
+        return self.buffer_size / self.sampling_rate
 
-    def get_data(self):
+    def _poll_delays(self, timeout):
+        """Generate the delays to wait before each status check.
+
+        The first delay covers most of the expected capture time left since
+        `arm`, the following ones start short and back off exponentially.
+        Raises TimeoutError once `timeout` seconds have passed.
+        """
+        start = time.perf_counter()
+        armed_at = self._armed_at if self._armed_at is not None else start
+        remaining = armed_at + self.plan.capture_time - start
+        first = max(0.0, remaining * self.sleep_fraction)
+        yield first if timeout is None else min(first, timeout)
+
+        delay = self.min_poll_interval
         while True:
-            sts = self.device.status(True)
-            if sts == self._states.DONE:
-                break
-            time.sleep(0.1)
-        valid_samples = self.device.statusSamplesValid()
-
-        data = {}
-        for c in self.channel_ids:
-            if self.channel_details(c)['enabled']:
-                data[c] = self.device.statusData(c, valid_samples)
-        return data
+            if timeout is not None and time.perf_counter() - start > timeout:
+                raise TimeoutError(f'Acquisition not done after {timeout} s.')
+            yield delay
+            delay = min(2 * delay, self.max_poll_interval)
+
+    def wait(self, timeout=None):
+        """Block until the acquisition is done.
+
+        :param timeout: maximum time to wait in seconds, or None to wait
+            indefinitely
+        """
+        for delay in self._poll_delays(timeout):
+            time.sleep(delay)
+            if self.device.status(True) == self._states.DONE:
+                return
+
+    async def wait_async(self, timeout=None):
+        """Wait for the acquisition to be done without blocking the loop.
+
+        :param timeout: maximum time to wait in seconds, or None to wait
+            indefinitely
+        """
+        for delay in self._poll_delays(timeout):
+            await asyncio.sleep(delay)
+            if self.device.status(True) == self._states.DONE:
+                return
+
+    def _read_array(self, out):
+        plan = self.plan
+        shape = (len(plan.channels), plan.samples)
+        if out is None:
+            if self._buffer is None or self._buffer.shape != shape:
+                self._buffer = np.empty(shape, plan.dtype)
+            out = self._buffer
+        elif (out.shape != shape or out.dtype != plan.dtype
+              or not out.flags.c_contiguous):
+            raise ValueError(f'out must be a C contiguous '
+                             f'{plan.dtype.__name__} array of shape {shape}.')
+
+        for row, c in zip(out, plan.channels):
+            _read_samples(self.device, c, row)
+        return out
+
+    def get_array(self, timeout=None, out=None):
+        """Wait for the acquisition to finish and return the samples.
+
+        Without `out`, the samples are written to a buffer owned by the
+        oscilloscope that is reused by the next capture; copy it to keep it.
+
+        :param timeout: maximum time to wait in seconds, or None to wait
+            indefinitely
+        :param out: array to fill, shaped (channels, samples) as given by
+            `plan`
+        :return: array with one row per channel in `plan.channels`
+        """
+        self.wait(timeout)
+        return self._read_array(out)
+
+    async def get_array_async(self, timeout=None, out=None):
+        """Awaitable version of `get_array`."""
+        await self.wait_async(timeout)
+        return self._read_array(out)
+
+    def _new_array(self):
+        plan = self.plan
+        return np.empty((len(plan.channels), plan.samples), plan.dtype)
+
+    def get_data(self, timeout=None, out=None):
+        """Wait for the acquisition to finish and return the samples.
+
+        Same as `get_array`, with the rows keyed by channel, except that
+        without `out` the samples go to a new array, so they stay valid
+        after the next capture.
+
+        :return: dict of samples for each enabled channel
+        """
+        if out is None:
+            out = self._new_array()
+        return dict(zip(self.plan.channels, self.get_array(timeout, out)))
+
+    async def get_data_async(self, timeout=None, out=None):
+        """Awaitable version of `get_data`."""
+        if out is None:
+            out = self._new_array()
+        data = await self.get_array_async(timeout, out)
+        return dict(zip(self.plan.channels, data))
+
+    def average(self, num_shots, history=0, timeout=None):
+        """Average back-to-back captures.
+
+        Same as `GenericOscilloscope.average`, with the kept captures read
+        straight into the history buffer.
+        """
+        plan = self.plan
+        shape = (len(plan.channels), plan.samples)
+        total = np.zeros(shape)
+        segments = None
+        if history:
+            segments = np.empty((min(history, num_shots),) + shape)
+
+        self.arm()
+        for shot in range(num_shots):
+            out = None if segments is None \
+                else segments[shot % len(segments)]
+            data = self.get_array(timeout, out)
+            if shot + 1 < num_shots:
+                self.arm()
+            total += data
+
+        if segments is not None:
+            segments = np.roll(segments, -(num_shots % len(segments)), axis=0)
+        total /= max(num_shots, 1)
+        return Average(plan.channels, total, segments, num_shots)
+
+    def _start_stream(self, duration, ring_size, poll_interval):
+        channels = [c for c in self.input_ids
+                    if self.channel_details(c, ['enabled'])['enabled']]
+        buffer_size = self.buffer_size
+        if ring_size < buffer_size:
+            raise ValueError(f'ring_size must hold at least one device '
+                             f'buffer ({buffer_size} samples).')
+        if poll_interval is None:
+            # read before the device buffer is half full
+            poll_interval = min(0.5 * buffer_size / self.sampling_rate, 0.1)
+
+        recorder = _Recorder(self.device, channels, ring_size)
+        previous_mode = self.device.acquisitionModeGet()
+        self.device.acquisitionModeSet(self._acquisition_modes.RECORD)
+        self.device.recordLengthSet(duration or 0)
+        self.device.configure(False, True)
+        return recorder, poll_interval, previous_mode
+
+    def _stop_stream(self, previous_mode):
+        self.device.configure(False, False)
+        self.device.acquisitionModeSet(previous_mode)
+
+    def stream(self, duration=None, ring_size=2**20, poll_interval=None):
+        """Acquire continuously in record mode and yield the samples.
+
+        Samples of the enabled channels are copied into a preallocated ring
+        buffer and yielded as `StreamChunk` views into it. Samples dropped
+        by the device are reported in each chunk instead of being skipped
+        silently. Closing the generator stops the acquisition.
+
+        :param duration: length of the record in seconds, or None to stream
+            until the generator is closed
+        :param ring_size: samples per channel held by the ring buffer
+        :param poll_interval: time between reads from the device, by default
+            half the time to fill the device buffer
+        :return: generator of `StreamChunk`
+        """
+        recorder, poll_interval, previous_mode = self._start_stream(
+            duration, ring_size, poll_interval)
+        try:
+            done = False
+            next_poll = time.perf_counter()
+            while not done:
+                next_poll += poll_interval
+                time.sleep(max(0.0, next_poll - time.perf_counter()))
+                chunk, done = recorder.poll()
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self._stop_stream(previous_mode)
+
+    async def stream_async(self, duration=None, ring_size=2**20,
+                           poll_interval=None):
+        """Async iterator version of `stream`."""
+        recorder, poll_interval, previous_mode = self._start_stream(
+            duration, ring_size, poll_interval)
+        try:
+            done = False
+            next_poll = time.perf_counter()
+            while not done:
+                next_poll += poll_interval
+                await asyncio.sleep(max(0.0, next_poll - time.perf_counter()))
+                chunk, done = recorder.poll()
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self._stop_stream(previous_mode)
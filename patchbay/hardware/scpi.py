@@ -0,0 +1,92 @@
+import threading
+import warnings
+from collections import deque, namedtuple
+
+ErrorMessage = namedtuple('ErrorMessage', 'timestamp, code, message, commands',
+                          defaults=((),))
+ErrorMessage.__doc__ = """Entry read from a SCPI error queue.
+
+`commands` holds the programs written since the previous read of the queue,
+i.e. the batch that caused the error.
+"""
+
+
+class ErrorMonitor:
+    """Background reader for the error queue of a SCPI instrument.
+
+    The queue is drained every `interval` seconds, or soon after `notify` is
+    called (e.g. following a batch of writes). Reads never wait for the bus:
+    if the instrument is busy the drain is retried shortly afterwards.
+    Errors are kept in a bounded deque and passed to any registered
+    callbacks, which run on the monitor thread.
+
+    The instrument must provide `_drain_errors(blocking)` returning a list
+    of `ErrorMessage`, or None if it could not get the bus without waiting.
+
+    :param instrument: the instrument to monitor
+    :param interval: seconds between routine reads of the queue
+    :param maxlen: number of errors to keep
+    """
+    retry_interval = 0.01
+
+    def __init__(self, instrument, interval=1.0, maxlen=100):
+        self.instrument = instrument
+        self.interval = interval
+        self.errors = deque(maxlen=maxlen)
+
+        self._callbacks = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_callback(self, callback):
+        """Call `callback(error)` for every new error."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def notify(self):
+        """Ask for the error queue to be read as soon as possible."""
+        self._wake.set()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f'ErrorMonitor-{self.instrument}')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        timeout = self.interval
+        while not self._stop.is_set():
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            errors = self.instrument._drain_errors(blocking=False)
+            if errors is None:
+                timeout = self.retry_interval
+                continue
+            timeout = self.interval
+
+            for error in errors:
+                self.errors.append(error)
+                for callback in list(self._callbacks):
+                    try:
+                        callback(error)
+                    except Exception as e:
+                        warnings.warn(f'Error monitor callback failed: {e!r}')
@@ -1,10 +1,13 @@
-from collections import namedtuple
+import threading
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
 import dwf
 import visa
 
 from hardware.base_instruments import GenericSignalGenerator
+from hardware.scpi import ErrorMessage, ErrorMonitor
 
 
 class Agilent33120ASignalGenerator(GenericSignalGenerator):
@@ -20,22 +23,32 @@ class Agilent33120ASignalGenerator(GenericSignalGenerator):
     _map_shape = {'SIN': 'sinusoid', 'SQU': 'square', 'TRI': 'triangle',
                   'RAMP': 'ramp', 'NOIS': 'noise', 'DC': 'dc', 'USER': 'user'}
 
-    def __init__(self, resource_name):
+    max_sent = 100
+
+    def __init__(self, resource_name, resource_manager=None):
         super().__init__(1)
-        resource_manager = visa.ResourceManager('@py')
+        if resource_manager is None:
+            resource_manager = visa.ResourceManager('@py')
         self.device = resource_manager.open_resource(resource_name)
-        self.device.write('system:remote')
         self.errors = []
+        self.error_monitor = None
+        self._batch = None
+        self._io_lock = threading.RLock()
+        # programs written since the error queue was read, for attribution
+        self._sent = deque(maxlen=self.max_sent)
+        # cached (channel_id, name) written since the error queue was read
+        self._unchecked = set()
+        self._write('system:remote')
 
     def _preformat_channel_value(self, channel_id, attr_name, value):
-        formatters = {'enabled': lambda x: x.lower() == 'on'}
+        formatters = {'enabled': lambda x: 'ON' if x else 'OFF'}
         try:
             return formatters[attr_name](value)
         except KeyError:
             return value
 
     def _postformat_channel_value(self, channel_id, attr_name, value):
-        formatters = {'enabled': lambda x: True,
+        formatters = {'enabled': lambda x: x is None or x == '1',
                       'shape': lambda x: self._map_shape[x],
                       'frequency': float,
                       'amplitude': float,
@@ -47,44 +60,178 @@ class Agilent33120ASignalGenerator(GenericSignalGenerator):
         except KeyError:
             return value
 
+    def _written_channel_value(self, channel_id, attr_name, value):
+        """The value reading a setting back returns after writing `value`."""
+        if not self._map_command[channel_id][attr_name]:
+            # not settable, reads return a fixed value
+            return self._postformat_channel_value(channel_id, attr_name, None)
+        formatters = {'enabled': bool,
+                      'frequency': float,
+                      'amplitude': float,
+                      'offset': float}
+        try:
+            return formatters[attr_name](value)
+        except KeyError:
+            return value
+
     def get_channel_attribute(self, channel_id, name):
         super().get_channel_attribute(channel_id, name)
         scpi_command = self._map_command[channel_id][name]
 
         if scpi_command:
-            response = self.device.query(scpi_command + '?').strip()
+            with self._io_lock:
+                response = self.device.query(scpi_command + '?').strip()
         else:
             response = None
         return self._postformat_channel_value(channel_id, name, response)
 
+    def get_channel_attributes(self, channel_id, names):
+        """Read several channel attributes with one compound SCPI query."""
+        scpi_commands = []
+        for name in names:
+            super().get_channel_attribute(channel_id, name)
+            scpi_commands.append(self._map_command[channel_id][name])
+
+        queries = [cmd + '?' for cmd in scpi_commands if cmd]
+        if queries:
+            with self._io_lock:
+                responses = self.device.query(';:'.join(queries)).strip()
+            responses = iter(responses.split(';'))
+
+        values = {}
+        for name, scpi_command in zip(names, scpi_commands):
+            response = next(responses).strip() if scpi_command else None
+            values[name] = self._postformat_channel_value(channel_id, name,
+                                                          response)
+        return values
+
     def set_channel_attribute(self, channel_id, name, value):
         super().set_channel_attribute(channel_id, name, value)
         scpi_command = self._map_command[channel_id][name]
 
         if scpi_command:
-            value = self._preformat_channel_value(channel_id, name, value)
-            self.device.write(scpi_command + ' {}'.format(value))
+            device_value = self._preformat_channel_value(channel_id, name,
+                                                         value)
+            command = scpi_command + ' {}'.format(device_value)
+            if self._batch is None:
+                self._write(command)
+            else:
+                self._batch.append(command)
+        self._cache_written(channel_id, name,
+                            self._written_channel_value(channel_id, name,
+                                                        value))
+        if scpi_command:
+            self._unchecked.add((channel_id, name))
+
+    @contextmanager
+    def transaction(self):
+        """Collect attribute writes and send them as one SCPI program.
+
+        Writes made inside the block are queued and sent as a single
+        semicolon-joined command when the block exits, after which the error
+        queue is read once (by the error monitor, if running). A nested
+        transaction joins the outer one. If the block raises, the queued
+        writes are discarded.
+        """
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = []
+        try:
+            yield self
+            commands, self._batch = self._batch, None
+            if commands:
+                self._write(';:'.join(commands))
+        except Exception:
+            # cached values were updated for writes that were never sent
+            self.invalidate()
+            raise
+        finally:
+            self._batch = None
+
+        if commands:
+            if self.error_monitor is not None and self.error_monitor.running:
+                self.error_monitor.notify()
+            else:
+                self.get_errors()
+
+    def _write(self, program):
+        with self._io_lock:
+            self.device.write(program)
+            self._sent.append(program)
+
+    def start_error_monitor(self, interval=1.0, maxlen=100):
+        """Read the error queue in the background instead of on demand.
+
+        While the monitor runs, `get_errors` returns the errors it has
+        collected without touching the bus.
+
+        :param interval: seconds between routine reads of the queue
+        :param maxlen: number of errors to keep
+        :return: the running `ErrorMonitor`, for adding callbacks
+        """
+        self.stop_error_monitor()
+        self.error_monitor = ErrorMonitor(self, interval, maxlen)
+        self.error_monitor.start()
+        return self.error_monitor
+
+    def stop_error_monitor(self):
+        if self.error_monitor is not None:
+            self.error_monitor.stop()
+            self.errors.extend(self.error_monitor.errors)
+            self.error_monitor = None
 
     def get_errors(self):
-        self.errors.extend([err for err in self._error_buffer()])
+        """Return the errors read so far, oldest first.
+
+        These are the errors collected before the error monitor started
+        followed by those the monitor has collected, if it runs.
+        """
+        if self.error_monitor is not None:
+            return self.errors + list(self.error_monitor.errors)
+        self.errors.extend(self._drain_errors())
         return self.errors
 
     def clear_errors(self):
         self.errors = []
+        if self.error_monitor is not None:
+            self.error_monitor.errors.clear()
+
+    def _drain_errors(self, blocking=True):
+        """Read all entries from the error queue.
+
+        Errors are attributed to the last `max_sent` programs written since
+        the previous drain. The bus stays locked until the queue is empty,
+        so no program written meanwhile can add errors to this batch. If
+        there are errors, the cached values of every attribute written in
+        the batch are dropped, since any of them may have been rejected.
+        Returns None if `blocking` is False and the bus is busy.
+        """
+        if not self._io_lock.acquire(blocking):
+            return None
+        try:
+            commands = tuple(self._sent)
+            self._sent.clear()
+            written, self._unchecked = self._unchecked, set()
+            errors = []
+            error = self._next_error()
+            while error.code:
+                errors.append(error._replace(commands=commands))
+                error = self._next_error()
+        finally:
+            self._io_lock.release()
+
+        if errors:
+            for key in written:
+                self._cache.pop(key, None)
+        return errors
 
     def _next_error(self):
-        ErrorMessage = namedtuple('ErrorMessage', 'timestamp, code, message')
-
         error_string = self.device.query('system:error?')
-        code, message = error_string.strip().split(',')
+        code, message = error_string.strip().split(',', 1)
         return ErrorMessage(datetime.now(), int(code), message.strip('"'))
 
-    def _error_buffer(self):
-        err = self._next_error()
-        while err.code:
-            yield err
-            err = self._next_error()
-
 
 class AnalogDiscovery2SignalGenerator(GenericSignalGenerator):
     _trigger_sources = dwf.DwfAnalogOut.TRIGSRC
@@ -141,15 +288,17 @@ class AnalogDiscovery2SignalGenerator(GenericSignalGenerator):
     def set_channel_attribute(self, channel_id, name, value):
         super().set_channel_attribute(channel_id, name, value)
 
-        channel_id = self._map_node(channel_id)
-        value = self._preformat_channel_value(channel_id, name, value)
+        node = self._map_node(channel_id)
+        device_value = self._preformat_channel_value(node, name, value)
         if name in self._map_node_commands:
             handler_name = self._map_node_commands[name].format('Set')
-            getattr(self.device, handler_name)(*channel_id, value)
+            getattr(self.device, handler_name)(*node, device_value)
 
         elif name in self._map_channel_commands:
             handler_name = self._map_channel_commands[name].format('Set')
-            getattr(self.device, handler_name)(channel_id[0], value)
+            getattr(self.device, handler_name)(node[0], device_value)
+        # the device quantizes frequencies, amplitudes and offsets
+        self._cache_read_back(channel_id, name)
 
     @staticmethod
     def _map_node(channel_id):
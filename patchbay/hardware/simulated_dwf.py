@@ -0,0 +1,1156 @@
+"""Pure Python stand-in for the `dwf` package (Digilent WaveForms SDK).
+
+Simulates an Analog Discovery 2 closely enough for the drivers in
+`hardware` to run without the device or the native library. The classes
+mirror the names, arguments and return types of the `dwf` wrapper for the
+AnalogIn, AnalogOut, AnalogIO, DigitalIO and DigitalOut instruments.
+
+The analog inputs are wired to the analog outputs (W1 to 1+, W2 to 2+), so
+captured samples are rendered with NumPy from the configured output
+waveforms, plus noise and 14 bit quantization over the input range.
+Captures take `buffer size / sampling rate` seconds of wall clock time and
+every API call waits `call_latency` seconds, with data transfers limited to
+`transfer_rate` bytes per second, to approximate a device on USB.
+
+Call `install()` before importing any driver to use the simulation in
+place of the real package.
+"""
+import sys
+import threading
+import time
+from enum import IntEnum
+
+import numpy as np
+
+# simulated USB timing, may be changed at run time
+call_latency = 100e-6
+transfer_rate = 20e6
+# rms noise added to analog inputs, in volts
+noise_level = 1e-3
+
+DwfDigitalOutIdleInit = 0
+DwfDigitalOutIdleLow = 1
+DwfDigitalOutIdleHigh = 2
+DwfDigitalOutIdleZet = 3
+
+
+def _bus(num_bytes=0):
+    """Wait as long as a USB round trip moving `num_bytes` would take."""
+    delay = call_latency + num_bytes / transfer_rate
+    if delay > 0:
+        time.sleep(delay)
+
+
+def FDwfGetVersion():
+    return '3.10.9 (simulated)'
+
+
+def FDwfAnalogInStatusData(hdwf, idxChannel, rgdVoltData_or_cdData,
+                           cdData=None):
+    """Read captured samples, into a POINTER(c_double) if one is given."""
+    _bus()
+    if cdData is None:
+        cdData = rgdVoltData_or_cdData
+        return tuple(hdwf.analog_in.data[idxChannel, :cdData])
+    out = np.ctypeslib.as_array(rgdVoltData_or_cdData, (cdData,))
+    out[:] = hdwf.analog_in.data[idxChannel, :cdData]
+
+
+def FDwfDeviceCloseAll():
+    for device in _devices:
+        device.close()
+
+
+class ENUMFILTER(IntEnum):
+    ALL = 0
+    EEXPLORER = 1
+    DISCOVERY = 2
+
+
+class _NodeState:
+    def __init__(self, enabled=False):
+        self.enable = enabled
+        self.function = DwfAnalogOut.FUNC.DC
+        self.frequency = 1e3
+        self.amplitude = 1.0
+        self.offset = 0.0
+        self.symmetry = 50.0
+        self.phase = 0.0
+        self.data = np.zeros(1)
+
+
+class _AnalogOutState:
+    def __init__(self, index):
+        self.master = index
+        self.trigger_source = Dwf.TRIGSRC.NONE
+        self.run = 0.0
+        self.wait = 0.0
+        self.repeat = 0
+        self.mode = DwfAnalogOut.MODE.VOLTAGE
+        self.idle = DwfAnalogOut.IDLE.OFFSET
+        self.limitation = 0.0
+        self.nodes = {node: _NodeState() for node in DwfAnalogOut.NODE}
+        self.started_at = None
+
+
+class _AnalogInState:
+    channel_count = 2
+    max_buffer_size = 8192
+    max_frequency = 100e6
+
+    def __init__(self):
+        self.frequency = self.max_frequency
+        self.buffer_size = self.max_buffer_size
+        self.acquisition_mode = DwfAnalogIn.ACQMODE.SINGLE
+        self.record_length = 0.0
+        self.enabled = [False] * self.channel_count
+        self.range = [5.0] * self.channel_count
+        self.offset = [0.0] * self.channel_count
+        self.filter = [DwfAnalogIn.FILTER.DECIMATE] * self.channel_count
+        self.attenuation = [1.0] * self.channel_count
+
+        self.trigger = {'source': Dwf.TRIGSRC.NONE,
+                        'type': DwfAnalogIn.TRIGTYPE.EDGE,
+                        'channel': 0,
+                        'filter': DwfAnalogIn.FILTER.DECIMATE,
+                        'level': 0.0,
+                        'hysteresis': 0.0,
+                        'condition': DwfAnalogIn.TRIGCOND.RISING_POSITIVE,
+                        'position': 0.0,
+                        'auto_timeout': 0.0,
+                        'holdoff': 0.0,
+                        'length': 0.0,
+                        'length_condition': DwfAnalogIn.TRIGLEN.LESS}
+
+        self.armed_at = None
+        self.done = False
+        self.auto_triggered = False
+        self.data = np.zeros((self.channel_count, 0))
+        # samples produced so far and (available, lost, corrupt) of the last
+        # status call in record mode
+        self.record_position = 0
+        self.record_status = (0, 0, 0)
+        # time of the first sample of a triggered capture and of the last
+        # trigger, how far the input has been searched for a trigger
+        self.first_sample_at = None
+        self.last_trigger_at = None
+        self.searched_to = None
+        self.pc_trigger_at = None
+
+
+class _SimulatedDevice:
+    """State of one simulated Analog Discovery 2."""
+    name = 'Analog Discovery 2'
+
+    def __init__(self, index):
+        self.index = index
+        self.serial_number = f'SN:SIM{index:08d}'
+        self.opened = False
+        self.lock = threading.RLock()
+        self.rng = np.random.default_rng(index)
+        self.reset()
+
+    def reset(self):
+        self.auto_configure = 1
+        self.analog_in = _AnalogInState()
+        self.analog_out = [_AnalogOutState(i) for i in range(2)]
+        self.io_output = 0
+        self.io_output_enable = 0
+        self.io_output_changes = 0
+        self.digital_out = [{'enable': False, 'idle': DwfDigitalOutIdleInit,
+                             'divider': 1, 'divider_init': 0,
+                             'counter': (0, 0), 'counter_init': (False, 0),
+                             'type': 0, 'output': 0}
+                            for _ in range(16)]
+        self.digital_out_running = False
+
+    def close(self):
+        self.reset()
+        self.opened = False
+
+    def render_output(self, channel, t):
+        """Voltages on an analog output at times `t` (seconds)."""
+        state = self.analog_out[channel]
+        carrier = state.nodes[DwfAnalogOut.NODE.CARRIER]
+        if state.started_at is None or not carrier.enable:
+            if state.idle == DwfAnalogOut.IDLE.OFFSET:
+                return np.full(t.shape, carrier.offset)
+            return np.zeros(t.shape)
+
+        t = t - state.started_at
+        if carrier.function == DwfAnalogOut.FUNC.DC:
+            return np.full(t.shape, carrier.offset)
+
+        fm = state.nodes[DwfAnalogOut.NODE.FM]
+        if fm.enable:
+            # integrate the modulated frequency to get the carrier phase
+            deviation = fm.amplitude / 100 * self._wave(fm, fm.frequency * t)
+            dt = np.diff(t, prepend=t[0])
+            cycles = t[0] * carrier.frequency + np.cumsum(
+                carrier.frequency * (1 + deviation) * dt)
+        else:
+            cycles = carrier.frequency * t
+        wave = carrier.amplitude * self._wave(carrier, cycles)
+
+        am = state.nodes[DwfAnalogOut.NODE.AM]
+        if am.enable:
+            wave *= 1 + am.amplitude / 100 * self._wave(am, am.frequency * t)
+
+        return carrier.offset + wave
+
+    def _wave(self, node, cycles):
+        """Unit amplitude waveform of a node for the given cycle counts."""
+        func = node.function
+        if func == DwfAnalogOut.FUNC.NOISE:
+            return self.rng.uniform(-1, 1, cycles.shape)
+        if func == DwfAnalogOut.FUNC.DC:
+            return np.zeros(cycles.shape)
+
+        x = (cycles + node.phase / 360) % 1
+        symmetry = node.symmetry / 100
+        if func == DwfAnalogOut.FUNC.SINE:
+            return np.sin(2 * np.pi * x)
+        if func == DwfAnalogOut.FUNC.SQUARE:
+            return np.where(x < symmetry, 1.0, -1.0)
+        if func == DwfAnalogOut.FUNC.TRIANGLE:
+            return np.where(x < symmetry, 2 * x / symmetry - 1,
+                            1 - 2 * (x - symmetry) / (1 - symmetry))
+        if func == DwfAnalogOut.FUNC.RAMP_UP:
+            return 2 * x - 1
+        if func == DwfAnalogOut.FUNC.RAMP_DOWN:
+            return 1 - 2 * x
+        # custom and play: data spread over one period
+        data = np.asarray(node.data, dtype=float)
+        return data[(x * len(data)).astype(int) % len(data)]
+
+    def render_input(self, channel, t):
+        """Samples captured by an analog input channel at times `t`."""
+        state = self.analog_in
+        volts = self.render_output(channel, t) if channel < 2 \
+            else np.zeros(t.shape)
+        if noise_level:
+            volts = volts + self.rng.normal(0, noise_level, t.shape)
+
+        half_range = state.range[channel] / 2
+        low = state.offset[channel] - half_range
+        step = state.range[channel] / 2 ** 14
+        volts = np.clip(volts, low, low + 2 * half_range - step)
+        return np.round((volts - low) / step) * step + low
+
+    def find_trigger(self, now):
+        """Look for the trigger of the armed capture up to time `now`.
+
+        Sets the time of the first sample once the trigger has been found.
+        The buffer is filled up to the trigger position before a trigger is
+        accepted, and triggers closer than the holdoff to the previous one
+        are ignored.
+        """
+        state = self.analog_in
+        trigger = state.trigger
+        capture_time = state.buffer_size / state.frequency
+        pre_trigger = min(max(capture_time / 2 - trigger['position'], 0),
+                          capture_time)
+        earliest = state.armed_at + pre_trigger
+        if state.last_trigger_at is not None:
+            earliest = max(earliest,
+                           state.last_trigger_at + trigger['holdoff'])
+
+        source = trigger['source']
+        trigger_at = None
+        if source == Dwf.TRIGSRC.NONE:
+            trigger_at = earliest
+        elif source == Dwf.TRIGSRC.PC:
+            if state.pc_trigger_at is not None:
+                trigger_at = max(state.pc_trigger_at, earliest)
+        elif source == Dwf.TRIGSRC.DETECTOR_ANALOG_IN:
+            start = max(earliest, state.searched_to or earliest)
+            t = np.arange(start, now, 1 / state.frequency)
+            if len(t) > 1:
+                x = self.render_input(trigger['channel'], t)
+                level = trigger['level']
+                if trigger['condition'] == \
+                        DwfAnalogIn.TRIGCOND.RISING_POSITIVE:
+                    crossed = (x[:-1] < level) & (x[1:] >= level)
+                else:
+                    crossed = (x[:-1] > level) & (x[1:] <= level)
+                if crossed.any():
+                    trigger_at = t[crossed.argmax() + 1]
+                state.searched_to = t[-1]
+
+        timeout = trigger['auto_timeout']
+        if trigger_at is None and timeout > 0 \
+                and now >= state.armed_at + timeout:
+            trigger_at = max(state.armed_at + timeout, earliest)
+            state.auto_triggered = True
+
+        if trigger_at is not None:
+            state.last_trigger_at = trigger_at
+            state.first_sample_at = trigger_at - pre_trigger
+
+    def capture(self):
+        """Fill the analog in buffer for an acquisition that has finished."""
+        state = self.analog_in
+        n = state.buffer_size
+        t = state.first_sample_at + np.arange(n) / state.frequency
+        state.data = np.vstack([self.render_input(c, t)
+                                for c in range(state.channel_count)])
+
+    def record(self):
+        """Move the samples recorded since the last call to the buffer.
+
+        The device holds at most `buffer_size` samples between status calls,
+        older samples are lost. Returns True once the record is complete.
+        """
+        state = self.analog_in
+        total = int((time.perf_counter() - state.armed_at) * state.frequency)
+        if state.record_length > 0:
+            total = min(total, round(state.record_length * state.frequency))
+
+        new = total - state.record_position
+        lost = max(0, new - state.buffer_size)
+        t = state.armed_at + np.arange(state.record_position + lost,
+                                       total) / state.frequency
+        state.data = np.vstack([self.render_input(c, t)
+                                for c in range(state.channel_count)])
+        state.record_position = total
+        state.record_status = (new - lost, lost, 0)
+
+        length = state.record_length * state.frequency
+        return 0 < length <= total
+
+
+def DwfEnumeration(enumfilter=ENUMFILTER.ALL):
+    _bus()
+    return tuple(DwfDevice(i) for i in range(len(_devices)))
+
+
+class DwfDevice(object):
+    class DEVID(IntEnum):
+        EEXPLORER = 1
+        DISCOVERY = 2
+
+    class DEVVER(IntEnum):
+        EEXPLORER_C = 2
+        EEXPLORER_E = 4
+        EEXPLORER_F = 5
+        DISCOVERY_A = 1
+        DISCOVERY_B = 2
+        DISCOVERY_C = 3
+
+    def __init__(self, idxDevice):
+        self.idxDevice = idxDevice
+
+    def deviceType(self):
+        return self.DEVID.DISCOVERY, self.DEVVER.DISCOVERY_C
+
+    def isOpened(self):
+        return _devices[self.idxDevice].opened
+
+    def userName(self):
+        return 'Discovery2'
+
+    def deviceName(self):
+        return _devices[self.idxDevice].name
+
+    def SN(self):
+        return _devices[self.idxDevice].serial_number
+
+    def open(self, config=None):
+        return Dwf(self.idxDevice, idxCfg=config)
+
+
+class Dwf(object):
+    DEVICE_NONE = 0
+
+    class TRIGSRC(IntEnum):
+        NONE = 0
+        PC = 1
+        DETECTOR_ANALOG_IN = 2
+        DETECTOR_DIGITAL_IN = 3
+        ANALOG_IN = 4
+        DIGITAL_IN = 5
+        DIGITAL_OUT = 6
+        ANALOG_OUT1 = 7
+        ANALOG_OUT2 = 8
+        ANALOG_OUT3 = 9
+        ANALOG_OUT4 = 10
+        EXTERNAL1 = 11
+        EXTERNAL2 = 12
+        EXTERNAL3 = 13
+        EXTERNAL4 = 14
+
+    class STATE(IntEnum):
+        READY = 0
+        CONFIG = 4
+        PREFILL = 5
+        ARMED = 1
+        WAIT = 7
+        TRIGGERED = 3
+        RUNNING = 3
+        DONE = 2
+
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            raise Exception()
+        if isinstance(idxDevice, DwfDevice):
+            idxDevice = idxDevice.idxDevice
+        _bus()
+        if idxDevice == -1:
+            idxDevice = next((d.index for d in _devices if not d.opened), -1)
+        if not 0 <= idxDevice < len(_devices) or _devices[idxDevice].opened:
+            raise RuntimeError('Device is not found')
+        self.hdwf = _devices[idxDevice]
+        self.hdwf.opened = True
+
+    def close(self):
+        self.hdwf.close()
+
+    def autoConfigureSet(self, auto_configure):
+        _bus()
+        self.hdwf.auto_configure = auto_configure
+
+    def autoConfigureGet(self):
+        _bus()
+        return bool(self.hdwf.auto_configure)
+
+    def reset(self):
+        _bus()
+        self.hdwf.reset()
+
+    def enableSet(self, enable):
+        _bus()
+
+    def triggerPC(self):
+        _bus()
+        self.hdwf.analog_in.pc_trigger_at = time.perf_counter()
+
+
+class DwfAnalogIn(Dwf):
+    class ACQMODE(IntEnum):
+        SINGLE = 0
+        SCAN_SHIFT = 1
+        SCAN_SCREEN = 2
+        RECORD = 3
+
+    class FILTER(IntEnum):
+        DECIMATE = 0
+        AVERAGE = 1
+        MIN_MAX = 2
+
+    class TRIGTYPE(IntEnum):
+        EDGE = 0
+        PULSE = 1
+        TRANSITION = 2
+
+    class TRIGCOND(IntEnum):
+        RISING_POSITIVE = 0
+        FALLING_NEGATIVE = 1
+
+    class TRIGLEN(IntEnum):
+        LESS = 0
+        TIMEOUT = 1
+        MORE = 2
+
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            self.hdwf = idxDevice.hdwf
+        else:
+            super(DwfAnalogIn, self).__init__(idxDevice, idxCfg)
+
+    @property
+    def _state(self):
+        return self.hdwf.analog_in
+
+    def reset(self, parent=False):
+        _bus()
+        self.hdwf.analog_in = _AnalogInState()
+
+    def configure(self, reconfigure, start):
+        _bus()
+        state = self._state
+        if start:
+            state.armed_at = time.perf_counter()
+            state.done = False
+            state.auto_triggered = False
+            state.record_position = 0
+            state.record_status = (0, 0, 0)
+            state.first_sample_at = None
+            state.searched_to = None
+            state.pc_trigger_at = None
+        elif not reconfigure:
+            state.armed_at = None
+            state.done = False
+
+    def status(self, read_data):
+        _bus()
+        state = self._state
+        with self.hdwf.lock:
+            if state.armed_at is None:
+                return self.STATE.READY
+            if state.acquisition_mode == self.ACQMODE.RECORD:
+                if state.done:
+                    state.data = state.data[:, :0]
+                    state.record_status = (0, 0, 0)
+                else:
+                    state.done = self.hdwf.record()
+                    _bus(2 * state.data.size)
+                return self.STATE.DONE if state.done else self.STATE.RUNNING
+            if not state.done:
+                now = time.perf_counter()
+                if state.first_sample_at is None:
+                    self.hdwf.find_trigger(now)
+                if state.first_sample_at is None:
+                    return self.STATE.ARMED
+                capture_time = state.buffer_size / state.frequency
+                if now - state.first_sample_at < capture_time:
+                    return self.STATE.TRIGGERED
+                state.done = True
+                self.hdwf.capture()
+            if read_data:
+                _bus(2 * state.data.size)
+            return self.STATE.DONE
+
+    def statusSamplesLeft(self):
+        _bus()
+        state = self._state
+        if state.armed_at is None or state.done:
+            return 0
+        if state.first_sample_at is None:
+            return state.buffer_size
+        elapsed = time.perf_counter() - state.first_sample_at
+        return max(0, state.buffer_size - int(elapsed * state.frequency))
+
+    def statusSamplesValid(self):
+        _bus()
+        state = self._state
+        if state.acquisition_mode == self.ACQMODE.RECORD:
+            return state.record_status[0]
+        return state.data.shape[1] if state.done else 0
+
+    def statusIndexWrite(self):
+        _bus()
+        return self.statusSamplesValid() % self._state.buffer_size
+
+    def statusAutotriggered(self):
+        _bus()
+        return self._state.auto_triggered
+
+    def statusData(self, idxChannel, data_num):
+        return FDwfAnalogInStatusData(self.hdwf, idxChannel, data_num)
+
+    def statusSample(self, idxChannel):
+        _bus()
+        t = np.array([time.perf_counter()])
+        return float(self.hdwf.render_input(idxChannel, t)[0])
+
+    def statusRecord(self):
+        _bus()
+        return self._state.record_status
+
+    def recordLengthSet(self, length):
+        _bus()
+        self._state.record_length = length
+
+    def recordLengthGet(self):
+        _bus()
+        return self._state.record_length
+
+    def frequencyInfo(self):
+        _bus()
+        return 0.0, self._state.max_frequency
+
+    def frequencySet(self, hzFrequency):
+        _bus()
+        # the sampling clock is the system clock divided by an integer
+        divider = max(1, round(self._state.max_frequency / hzFrequency))
+        self._state.frequency = self._state.max_frequency / divider
+
+    def frequencyGet(self):
+        _bus()
+        return self._state.frequency
+
+    def bitsInfo(self):
+        _bus()
+        return 14
+
+    def bufferSizeInfo(self):
+        _bus()
+        return 16, self._state.max_buffer_size
+
+    def bufferSizeSet(self, size):
+        _bus()
+        self._state.buffer_size = min(max(16, int(size)),
+                                      self._state.max_buffer_size)
+
+    def bufferSizeGet(self):
+        _bus()
+        return self._state.buffer_size
+
+    def acquisitionModeSet(self, acqmode):
+        _bus()
+        self._state.acquisition_mode = self.ACQMODE(acqmode)
+
+    def acquisitionModeGet(self):
+        _bus()
+        return self._state.acquisition_mode
+
+    def channelCount(self):
+        _bus()
+        return self._state.channel_count
+
+    def channelEnableSet(self, idxChannel, enable):
+        _bus()
+        self._state.enabled[idxChannel] = bool(enable)
+
+    def channelEnableGet(self, idxChannel):
+        _bus()
+        return self._state.enabled[idxChannel]
+
+    def channelFilterSet(self, idxChannel, filter_):
+        _bus()
+        self._state.filter[idxChannel] = self.FILTER(filter_)
+
+    def channelFilterGet(self, idxChannel):
+        _bus()
+        return self._state.filter[idxChannel]
+
+    def channelRangeInfo(self):
+        _bus()
+        return 5.0, 50.0, 2
+
+    def channelRangeSteps(self):
+        _bus()
+        return (5.0, 50.0)
+
+    def channelRangeSet(self, idxChannel, voltsRange):
+        _bus()
+        # the AD2 has two input ranges: 5 V and 50 V peak to peak
+        self._state.range[idxChannel] = 5.0 if voltsRange <= 5.0 else 50.0
+
+    def channelRangeGet(self, idxChannel):
+        _bus()
+        return self._state.range[idxChannel]
+
+    def channelOffsetInfo(self):
+        _bus()
+        return -25.0, 25.0, 2 ** 14
+
+    def channelOffsetSet(self, idxChannel, voltOffset):
+        _bus()
+        self._state.offset[idxChannel] = float(voltOffset)
+
+    def channelOffsetGet(self, idxChannel):
+        _bus()
+        return self._state.offset[idxChannel]
+
+    def channelAttenuationSet(self, idxChannel, attenuation):
+        _bus()
+        self._state.attenuation[idxChannel] = attenuation
+
+    def channelAttenuationGet(self, idxChannel):
+        _bus()
+        return self._state.attenuation[idxChannel]
+
+    def _trigger_setter(key, convert=None):
+        def setter(self, value):
+            _bus()
+            self._state.trigger[key] = convert(value) if convert else value
+        return setter
+
+    def _trigger_getter(key):
+        def getter(self):
+            _bus()
+            return self._state.trigger[key]
+        return getter
+
+    triggerSourceSet = _trigger_setter('source', Dwf.TRIGSRC)
+    triggerSourceGet = _trigger_getter('source')
+    triggerPositionSet = _trigger_setter('position', float)
+    triggerPositionGet = _trigger_getter('position')
+    triggerAutoTimeoutSet = _trigger_setter('auto_timeout', float)
+    triggerAutoTimeoutGet = _trigger_getter('auto_timeout')
+    triggerHoldOffSet = _trigger_setter('holdoff', float)
+    triggerHoldOffGet = _trigger_getter('holdoff')
+    triggerTypeSet = _trigger_setter('type', TRIGTYPE)
+    triggerTypeGet = _trigger_getter('type')
+    triggerChannelSet = _trigger_setter('channel', int)
+    triggerChannelGet = _trigger_getter('channel')
+    triggerFilterSet = _trigger_setter('filter', FILTER)
+    triggerFilterGet = _trigger_getter('filter')
+    triggerLevelSet = _trigger_setter('level', float)
+    triggerLevelGet = _trigger_getter('level')
+    triggerHysteresisSet = _trigger_setter('hysteresis', float)
+    triggerHysteresisGet = _trigger_getter('hysteresis')
+    triggerConditionSet = _trigger_setter('condition', TRIGCOND)
+    triggerConditionGet = _trigger_getter('condition')
+    triggerLengthSet = _trigger_setter('length', float)
+    triggerLengthGet = _trigger_getter('length')
+    triggerLengthConditionSet = _trigger_setter('length_condition', TRIGLEN)
+    triggerLengthConditionGet = _trigger_getter('length_condition')
+    del _trigger_setter, _trigger_getter
+
+
+class DwfAnalogOut(Dwf):
+    class FUNC(IntEnum):
+        DC = 0
+        SINE = 1
+        SQUARE = 2
+        TRIANGLE = 3
+        RAMP_UP = 4
+        RAMP_DOWN = 5
+        NOISE = 6
+        CUSTOM = 30
+        PLAY = 31
+
+    class NODE(IntEnum):
+        CARRIER = 0
+        FM = 1
+        AM = 2
+
+    class MODE(IntEnum):
+        VOLTAGE = 0
+        CURRENT = 1
+
+    class IDLE(IntEnum):
+        DISABLE = 0
+        OFFSET = 1
+        INITIAL = 2
+
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            self.hdwf = idxDevice.hdwf
+        else:
+            super(DwfAnalogOut, self).__init__(idxDevice, idxCfg)
+
+    def _channel(self, idxChannel):
+        return self.hdwf.analog_out[idxChannel]
+
+    def _node(self, idxChannel, node):
+        return self.hdwf.analog_out[idxChannel].nodes[self.NODE(node)]
+
+    def reset(self, idxChannel=-1, parent=False):
+        _bus()
+        channels = range(2) if idxChannel == -1 else [idxChannel]
+        for c in channels:
+            self.hdwf.analog_out[c] = _AnalogOutState(c)
+
+    def configure(self, idxChannel, start):
+        _bus()
+        now = time.perf_counter()
+        for state in self.hdwf.analog_out:
+            if state.master == idxChannel:
+                state.started_at = now if start else None
+
+    def status(self, idxChannel):
+        _bus()
+        if self._channel(idxChannel).started_at is None:
+            return self.STATE.READY
+        return self.STATE.RUNNING
+
+    def channelCount(self):
+        _bus()
+        return len(self.hdwf.analog_out)
+
+    def masterSet(self, idxChannel, idxMaster):
+        _bus()
+        self._channel(idxChannel).master = idxMaster
+
+    def masterGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).master
+
+    def triggerSourceSet(self, idxChannel, trigsrc):
+        _bus()
+        self._channel(idxChannel).trigger_source = self.TRIGSRC(trigsrc)
+
+    def triggerSourceGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).trigger_source
+
+    def runSet(self, idxChannel, secRun):
+        _bus()
+        self._channel(idxChannel).run = secRun
+
+    def runGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).run
+
+    def waitSet(self, idxChannel, secWait):
+        _bus()
+        self._channel(idxChannel).wait = secWait
+
+    def waitGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).wait
+
+    def repeatSet(self, idxChannel, repeat):
+        _bus()
+        self._channel(idxChannel).repeat = repeat
+
+    def repeatGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).repeat
+
+    def limitationSet(self, idxChannel, limit):
+        _bus()
+        self._channel(idxChannel).limitation = limit
+
+    def limitationGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).limitation
+
+    def modeSet(self, idxChannel, mode):
+        _bus()
+        self._channel(idxChannel).mode = self.MODE(mode)
+
+    def modeGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).mode
+
+    def idleSet(self, idxChannel, idle):
+        _bus()
+        self._channel(idxChannel).idle = self.IDLE(idle)
+
+    def idleGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel).idle
+
+    def nodeInfo(self, idxChannel):
+        _bus()
+        return frozenset(self.NODE)
+
+    def nodeEnableSet(self, idxChannel, node, enable):
+        _bus()
+        self._node(idxChannel, node).enable = bool(enable)
+
+    def nodeEnableGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).enable
+
+    def nodeFunctionInfo(self, idxChannel, node):
+        _bus()
+        return frozenset(self.FUNC)
+
+    def nodeFunctionSet(self, idxChannel, node, func):
+        _bus()
+        self._node(idxChannel, node).function = self.FUNC(func)
+
+    def nodeFunctionGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).function
+
+    def nodeFrequencyInfo(self, idxChannel, node):
+        _bus()
+        return 0.0, 20e6
+
+    def nodeFrequencySet(self, idxChannel, node, hzFrequency):
+        _bus()
+        self._node(idxChannel, node).frequency = float(hzFrequency)
+
+    def nodeFrequencyGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).frequency
+
+    def nodeAmplitudeInfo(self, idxChannel, node):
+        _bus()
+        return (0.0, 100.0) if node else (-5.0, 5.0)
+
+    def nodeAmplitudeSet(self, idxChannel, node, amplitude):
+        _bus()
+        self._node(idxChannel, node).amplitude = float(amplitude)
+
+    def nodeAmplitudeGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).amplitude
+
+    nodeModulationSet = nodeAmplitudeSet
+    nodeModulationGet = nodeAmplitudeGet
+
+    def nodeOffsetInfo(self, idxChannel, node):
+        _bus()
+        return -5.0, 5.0
+
+    def nodeOffsetSet(self, idxChannel, node, offset):
+        _bus()
+        self._node(idxChannel, node).offset = float(offset)
+
+    def nodeOffsetGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).offset
+
+    def nodeSymmetrySet(self, idxChannel, node, percentageSymmetry):
+        _bus()
+        self._node(idxChannel, node).symmetry = float(percentageSymmetry)
+
+    def nodeSymmetryGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).symmetry
+
+    def nodePhaseSet(self, idxChannel, node, degreePhase):
+        _bus()
+        self._node(idxChannel, node).phase = float(degreePhase)
+
+    def nodePhaseGet(self, idxChannel, node):
+        _bus()
+        return self._node(idxChannel, node).phase
+
+    def nodeDataInfo(self, idxChannel, node):
+        _bus()
+        return 16, 4096
+
+    def nodeDataSet(self, idxChannel, node, rgdData):
+        _bus(2 * len(rgdData))
+        self._node(idxChannel, node).data = np.array(rgdData, dtype=float)
+
+
+class DwfAnalogIO(Dwf):
+    class TYPE(IntEnum):
+        ENABLE = 1
+        VOLTAGE = 2
+        CURRENT = 3
+        POWER = 4
+        TEMPERATURE = 5
+
+    # channel name: {node: (type, value)}
+    _channels = (('V+', {0: (TYPE.ENABLE, 0), 1: (TYPE.VOLTAGE, 0.0)}),
+                 ('V-', {0: (TYPE.ENABLE, 0), 1: (TYPE.VOLTAGE, 0.0)}),
+                 ('USB', {0: (TYPE.VOLTAGE, 5.0), 1: (TYPE.CURRENT, 0.3),
+                          2: (TYPE.TEMPERATURE, 45.0)}),
+                 ('AUX', {0: (TYPE.VOLTAGE, 0.0), 1: (TYPE.CURRENT, 0.0)}))
+
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            self.hdwf = idxDevice.hdwf
+        else:
+            super(DwfAnalogIO, self).__init__(idxDevice, idxCfg)
+        self._enabled = False
+        self._values = {(c, node): value
+                        for c, (_, nodes) in enumerate(self._channels)
+                        for node, (_, value) in nodes.items()}
+
+    def reset(self, parent=False):
+        _bus()
+
+    def configure(self):
+        _bus()
+
+    def status(self):
+        _bus()
+
+    def enableSet(self, master_enable):
+        _bus()
+        self._enabled = bool(master_enable)
+
+    def enableGet(self):
+        _bus()
+        return self._enabled
+
+    def enableStatus(self):
+        _bus()
+        return self._enabled
+
+    def channelCount(self):
+        _bus()
+        return len(self._channels)
+
+    def channelName(self, idxChannel):
+        _bus()
+        name = self._channels[idxChannel][0]
+        return name, name
+
+    def channelInfo(self, idxChannel):
+        _bus()
+        return len(self._channels[idxChannel][1])
+
+    def channelNodeInfo(self, idxChannel, idxNode):
+        _bus()
+        return self._channels[idxChannel][1][idxNode][0]
+
+    def channelNodeSet(self, idxChannel, idxNode, value):
+        _bus()
+        self._values[(idxChannel, idxNode)] = value
+
+    def channelNodeGet(self, idxChannel, idxNode):
+        _bus()
+        return self._values[(idxChannel, idxNode)]
+
+    def channelNodeStatus(self, idxChannel, idxNode):
+        _bus()
+        return self._values[(idxChannel, idxNode)]
+
+
+class DwfDigitalIO(Dwf):
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            self.hdwf = idxDevice.hdwf
+        else:
+            super(DwfDigitalIO, self).__init__(idxDevice, idxCfg)
+
+    def reset(self, parent=False):
+        _bus()
+        self.hdwf.io_output = 0
+        self.hdwf.io_output_enable = 0
+
+    def configure(self):
+        _bus()
+
+    def status(self):
+        _bus()
+
+    def outputEnableInfo(self):
+        _bus()
+        return 0xFFFF
+
+    def outputEnableSet(self, output_enable):
+        _bus()
+        self.hdwf.io_output_enable = output_enable & 0xFFFF
+
+    def outputEnableGet(self):
+        _bus()
+        return self.hdwf.io_output_enable
+
+    def outputInfo(self):
+        _bus()
+        return 0xFFFF
+
+    def outputSet(self, output):
+        _bus()
+        self.hdwf.io_output = output & 0xFFFF
+        self.hdwf.io_output_changes += 1
+
+    def outputGet(self):
+        _bus()
+        return self.hdwf.io_output
+
+    def inputInfo(self):
+        _bus()
+        return 0xFFFF
+
+    def inputStatus(self):
+        _bus()
+        return self.hdwf.io_output & self.hdwf.io_output_enable
+
+
+class DwfDigitalOut(Dwf):
+    class OUTPUT(IntEnum):
+        PUSH_PULL = 0
+        OPEN_DRAIN = 1
+        OPEN_SOURCE = 2
+        TRISTATE = 3
+
+    class TYPE(IntEnum):
+        PULSE = 0
+        CUSTOM = 1
+        RANDOM = 2
+
+    class IDLE(IntEnum):
+        INIT = DwfDigitalOutIdleInit
+        LOW = DwfDigitalOutIdleLow
+        HIGH = DwfDigitalOutIdleHigh
+        HiZ = DwfDigitalOutIdleZet
+
+    def __init__(self, idxDevice=-1, idxCfg=None):
+        if isinstance(idxDevice, Dwf):
+            self.hdwf = idxDevice.hdwf
+        else:
+            super(DwfDigitalOut, self).__init__(idxDevice, idxCfg)
+
+    def _channel(self, idxChannel):
+        return self.hdwf.digital_out[idxChannel]
+
+    def reset(self, parent=False):
+        _bus()
+        self.hdwf.digital_out_running = False
+
+    def configure(self, start):
+        _bus()
+        self.hdwf.digital_out_running = bool(start)
+
+    def status(self):
+        _bus()
+        if self.hdwf.digital_out_running:
+            return self.STATE.RUNNING
+        return self.STATE.READY
+
+    def internalClockInfo(self):
+        _bus()
+        return 100e6
+
+    def channelCount(self):
+        _bus()
+        return len(self.hdwf.digital_out)
+
+    def enableSet(self, idxChannel, enable):
+        _bus()
+        self._channel(idxChannel)['enable'] = bool(enable)
+
+    def enableGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel)['enable']
+
+    def outputSet(self, idxChannel, output_mode):
+        _bus()
+        self._channel(idxChannel)['output'] = self.OUTPUT(output_mode)
+
+    def outputGet(self, idxChannel):
+        _bus()
+        return self.OUTPUT(self._channel(idxChannel)['output'])
+
+    def typeSet(self, idxChannel, output_type):
+        _bus()
+        self._channel(idxChannel)['type'] = self.TYPE(output_type)
+
+    def typeGet(self, idxChannel):
+        _bus()
+        return self.TYPE(self._channel(idxChannel)['type'])
+
+    def idleSet(self, idxChannel, idle_mode):
+        _bus()
+        self._channel(idxChannel)['idle'] = self.IDLE(idle_mode)
+
+    def idleGet(self, idxChannel):
+        _bus()
+        return self.IDLE(self._channel(idxChannel)['idle'])
+
+    def dividerInitSet(self, idxChannel, init):
+        _bus()
+        self._channel(idxChannel)['divider_init'] = init
+
+    def dividerInitGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel)['divider_init']
+
+    def dividerSet(self, idxChannel, value):
+        _bus()
+        self._channel(idxChannel)['divider'] = value
+
+    def dividerGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel)['divider']
+
+    def counterInitSet(self, idxChannel, start_high, init):
+        _bus()
+        self._channel(idxChannel)['counter_init'] = (bool(start_high), init)
+
+    def counterInitGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel)['counter_init']
+
+    def counterSet(self, idxChannel, low, high):
+        _bus()
+        self._channel(idxChannel)['counter'] = (low, high)
+
+    def counterGet(self, idxChannel):
+        _bus()
+        return self._channel(idxChannel)['counter']
+
+
+_devices = [_SimulatedDevice(0)]
+
+
+def install():
+    """Make `import dwf` load this simulation instead of the real package.
+
+    Must be called before any driver module imports `dwf`.
+    """
+    sys.modules['dwf'] = sys.modules[__name__]
@@ -38,8 +38,7 @@ class AnalogDiscovery2Stepper:
                                   for i, pin in enumerate(pins))
                               for pos in step_pattern]
 
-    @asyncio.coroutine
-    def step_async(self, num_steps=1, step_time=None):
+    async def step_async(self, num_steps=1, step_time=None):
         direction = 1 if num_steps > 0 else -1
         if not step_time:
             step_time = self.step_time
@@ -52,12 +51,11 @@ class AnalogDiscovery2Stepper:
                                       (self.position + direction)
                                       % len(self._masked_steps)])
             self.position += direction
-            yield from asyncio.sleep(step_time)
+            await asyncio.sleep(step_time)
 
         self.device.outputEnableSet(
             self.device.outputEnableGet() & ~self._pin_mask)
 
-    @asyncio.coroutine
-    def go_to(self, position, step_time=None):
-        yield from self.step_async(position - self.position,
-                                   step_time=step_time)
+    async def go_to(self, position, step_time=None):
+        await self.step_async(position - self.position,
+                              step_time=step_time)
@@ -0,0 +1,321 @@
+"""Append-only store for oscilloscope and logic analyzer captures.
+
+A store is a directory holding:
+
+- chunk files (`chunk_00000.bin`, ...) with the raw samples of the
+  captures, written back to back up to `chunk_bytes` per file
+- `index.bin`, one fixed size record per capture with its timestamp,
+  configuration, chunk, byte offset, dtype and shape
+- `configs.jsonl`, the distinct instrument configurations, one JSON
+  document per line
+
+Captures are read through memory maps of the chunk files, so indexing the
+store returns arrays without copying or loading the samples. Appending
+only copies the samples into a queue; a background thread writes them in
+batches so the acquisition loop never waits for the disk.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'),
+                        ('config', '<i4'),
+                        ('chunk', '<i4'),
+                        ('offset', '<i8'),
+                        ('dtype', 'S8'),
+                        ('channels', '<i8'),
+                        ('samples', '<i8')])
+
+Capture = namedtuple('Capture', 'timestamp, data, config')
+Capture.__doc__ = """A stored capture.
+
+`data` is a read-only memory mapped array shaped (channels, samples), and
+`config` the configuration stored with it, or None.
+"""
+
+
+class _Index:
+    """Growable structured array of index records.
+
+    Captures usually arrive in time order, so the index only sorts its
+    timestamps when they are out of order, and keeps that order until
+    more records are added.
+    """
+
+    def __init__(self, records):
+        self._records = np.array(records, dtype=INDEX_DTYPE)
+        self._size = len(records)
+        self._in_order = bool(np.all(np.diff(records['timestamp']) >= 0))
+        self._order = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def records(self):
+        return self._records[:self._size]
+
+    def extend(self, records):
+        end = self._size + len(records)
+        if end > len(self._records):
+            grown = np.empty(max(end, 2 * len(self._records), 1024),
+                             INDEX_DTYPE)
+            grown[:self._size] = self.records
+            self._records = grown
+        if self._in_order and len(records):
+            times = records['timestamp']
+            self._in_order = bool(
+                (not self._size
+                 or self._records['timestamp'][self._size - 1] <= times[0])
+                and np.all(np.diff(times) >= 0))
+        self._records[self._size:end] = records
+        self._size = end
+        self._order = None
+
+    def sorted_timestamps(self):
+        """Timestamps in time order, and the positions that sort them.
+
+        :return: (timestamps, positions), positions is None if the records
+            are already in time order
+        """
+        timestamps = self.records['timestamp']
+        if self._in_order:
+            return timestamps, None
+        if self._order is None:
+            order = np.argsort(timestamps, kind='stable')
+            self._order = (timestamps[order], order)
+        return self._order
+
+
+class CaptureStore:
+    """Append-only store of captures in a directory.
+
+    Captures become visible to readers once they have been written by the
+    background thread; call `flush` to wait for that.
+
+    :param path: directory of the store, created if needed
+    :param chunk_bytes: maximum size of a chunk file, unless it holds a
+        single larger capture
+    :param max_batch: most captures written in one batch
+    :param max_queued: most captures waiting to be written; `append`
+        blocks while the queue is full, so memory stays bounded when the
+        disk falls behind
+    """
+
+    def __init__(self, path, chunk_bytes=256 * 2 ** 20, max_batch=256,
+                 max_queued=1024):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.max_batch = max_batch
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, 'index.bin')
+        records = np.fromfile(index_path, INDEX_DTYPE) \
+            if os.path.exists(index_path) else np.empty(0, INDEX_DTYPE)
+        self._index = _Index(records)
+        self._index_file = open(index_path, 'ab')
+
+        self._configs = []
+        self._config_ids = {}
+        config_path = os.path.join(path, 'configs.jsonl')
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                for line in f:
+                    self._config_ids[line.strip()] = len(self._configs)
+                    self._configs.append(json.loads(line))
+        self._config_file = open(config_path, 'a')
+
+        self._chunk = int(records['chunk'].max()) if len(records) else 0
+        self._chunk_file = open(self._chunk_path(self._chunk), 'ab')
+        self._maps = {}
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(max_queued)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                        name='CaptureStore writer')
+        self._writer.start()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, i):
+        """Get a capture.
+
+        :param i: position of the capture in the store
+        :return: `Capture`
+        """
+        with self._lock:
+            record = self._index.records[i]
+        config = self._configs[record['config']] \
+            if record['config'] >= 0 else None
+        return Capture(record['timestamp'], self._data(record), config)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def index(self):
+        """Index records of the written captures (see INDEX_DTYPE)."""
+        with self._lock:
+            return self._index.records.copy()
+
+    @property
+    def timestamps(self):
+        with self._lock:
+            return self._index.records['timestamp'].copy()
+
+    def append(self, data, timestamp=None, config=None):
+        """Queue a capture to be written.
+
+        The samples are copied, so buffers that are reused by the next
+        capture can be passed directly. Blocks while `max_queued` captures
+        are waiting to be written.
+
+        :param data: array shaped (channels, samples), or (samples,) for a
+            single channel; a dict of {channel: samples} as returned by
+            `get_data` is stacked in order
+        :param timestamp: time of the capture in seconds since the epoch,
+            now if None
+        :param config: JSON serializable configuration of the instrument,
+            e.g. a snapshot from `InstrumentGroup.snapshot`
+        """
+        if self._error is not None:
+            raise self._error
+        if isinstance(data, dict):
+            data = np.stack(list(data.values()))
+        else:
+            data = np.array(data, copy=True)
+        if data.ndim == 1:
+            data = data[None]
+        elif data.ndim != 2:
+            raise ValueError('Captures must have one or two dimensions.')
+        if timestamp is None:
+            timestamp = time.time()
+        config = None if config is None else json.dumps(config,
+                                                        sort_keys=True)
+        self._queue.put((timestamp, data, config))
+
+    def flush(self):
+        """Wait until every queued capture has been written."""
+        self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Write the queued captures and close the files."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._chunk_file.close()
+        self._index_file.close()
+        self._config_file.close()
+        self._maps.clear()
+        if self._error is not None:
+            raise self._error
+
+    def select(self, start=None, stop=None):
+        """Find the captures taken within a time range.
+
+        :param start: earliest timestamp, inclusive
+        :param stop: latest timestamp, exclusive
+        :return: array of positions in the store
+        """
+        with self._lock:
+            sorted_times, order = self._index.sorted_timestamps()
+        first = 0 if start is None else np.searchsorted(sorted_times, start)
+        last = len(sorted_times) if stop is None \
+            else np.searchsorted(sorted_times, stop)
+        if order is None:
+            return np.arange(first, last)
+        return np.sort(order[first:last])
+
+    def query(self, start=None, stop=None):
+        """Iterate over the captures taken within a time range.
+
+        :param start: earliest timestamp, inclusive
+        :param stop: latest timestamp, exclusive
+        :return: generator of `Capture`
+        """
+        for i in self.select(start, stop):
+            yield self[i]
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.path, f'chunk_{chunk:05d}.bin')
+
+    def _data(self, record):
+        dtype = np.dtype(record['dtype'].decode())
+        end = record['offset'] + record['channels'] * record['samples'] \
+            * dtype.itemsize
+        chunk_map = self._maps.get(record['chunk'])
+        if chunk_map is None or len(chunk_map) < end:
+            chunk_map = np.memmap(self._chunk_path(record['chunk']),
+                                  dtype=np.uint8, mode='r')
+            self._maps[record['chunk']] = chunk_map
+        return chunk_map[record['offset']:end].view(dtype).reshape(
+            record['channels'], record['samples'])
+
+    def _config_id(self, config):
+        if config is None:
+            return -1
+        try:
+            return self._config_ids[config]
+        except KeyError:
+            self._config_file.write(config + '\n')
+            self._config_ids[config] = len(self._configs)
+            self._configs.append(json.loads(config))
+            return self._config_ids[config]
+
+    def _write_loop(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stop = True
+            items = [item for item in batch if item is not None]
+
+            try:
+                if items and self._error is None:
+                    self._write_batch(items)
+            except Exception as e:
+                self._error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, items):
+        records = np.empty(len(items), INDEX_DTYPE)
+        for record, (timestamp, data, config) in zip(records, items):
+            size = self._chunk_file.tell()
+            if size and size + data.nbytes > self.chunk_bytes:
+                self._chunk_file.close()
+                self._chunk += 1
+                self._chunk_file = open(self._chunk_path(self._chunk), 'ab')
+
+            record['timestamp'] = timestamp
+            record['config'] = self._config_id(config)
+            record['chunk'] = self._chunk
+            record['offset'] = self._chunk_file.tell()
+            record['dtype'] = data.dtype.str
+            record['channels'], record['samples'] = data.shape
+            self._chunk_file.write(np.ascontiguousarray(data).data)
+
+        self._chunk_file.flush()
+        self._config_file.flush()
+        self._index_file.write(records.tobytes())
+        self._index_file.flush()
+        with self._lock:
+            self._index.extend(records)
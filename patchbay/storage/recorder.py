@@ -0,0 +1,299 @@
+"""Record camera frames to disk without holding up acquisition.
+
+`Recorder.write` copies a frame into one of a fixed number of slots in
+shared memory and returns; a separate process writes the slots out, either
+encoded by `cv2.VideoWriter` or as raw frames back to back in one file,
+which is filled through a memory map.
+Pixel data is never pickled or sent through a pipe, only slot numbers.
+When every slot is taken the recorder either waits for the writer
+(backpressure) or drops the frame, and counts it.
+
+Every recording has a timestamp file next to it, `<path>.timestamps`, with
+one float64 per frame. Raw recordings also have `<path>.json` with the
+frame shape and dtype, and are read back as a memory map by `read_frames`.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from hardware.frame_pool import SharedFrameRing
+
+RecorderStats = namedtuple('RecorderStats',
+                           'received, recorded, dropped, queued')
+RecorderStats.__doc__ = """Frame counters of a `Recorder`.
+
+`received` frames were passed to `write`, `recorded` frames are on disk,
+`dropped` frames found no free slot, and `queued` frames are waiting for
+the writer.
+"""
+
+
+def read_frames(path):
+    """Open a raw recording.
+
+    :param path: path of the recording
+    :return: (frames, timestamps), frames as a read-only memory map shaped
+        (frames, *frame shape)
+    """
+    with open(f'{path}.json') as f:
+        header = json.load(f)
+    timestamps = np.fromfile(f'{path}.timestamps', '<f8')
+    frames = np.memmap(path, dtype=header['dtype'], mode='r',
+                       shape=(len(timestamps),) + tuple(header['shape']))
+    return frames, timestamps
+
+
+class _FrameMap:
+    """Append raw frames to a file through a memory map.
+
+    The file is mapped `chunk` frames at a time past its end, grown as the
+    map fills, and cut back to the frames written when closed.
+    """
+
+    def __init__(self, path, shape, dtype, chunk=64):
+        self.path = path
+        self.shape = shape
+        self.dtype = dtype
+        self.chunk = chunk
+        with open(path, 'ab'):
+            pass
+        self._end = os.path.getsize(path)
+        self._frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        self._map = None
+        self._index = 0
+
+    def write(self, frame):
+        if self._map is None or self._index == len(self._map):
+            self._map = None
+            self._map = np.memmap(self.path, self.dtype, 'r+',
+                                  offset=self._end,
+                                  shape=(self.chunk,) + self.shape)
+            self._index = 0
+        self._map[self._index] = frame
+        self._index += 1
+        self._end += self._frame_bytes
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        os.truncate(self.path, self._end)
+
+
+def _write_frames(ring_name, shape, dtype, num_slots, todo, done, opened,
+                  recorded, path, file_format, fps, fourcc):
+    """Write slots listed in `todo` until a None arrives (writer process).
+
+    Puts None in `opened` once the recording is open, or an error message.
+    """
+    ring = SharedFrameRing(num_slots, shape, dtype, name=ring_name)
+    if file_format == 'video':
+        import cv2
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps,
+                                 (shape[1], shape[0]), len(shape) == 3)
+        if not writer.isOpened():
+            ring.close()
+            opened.put(f'Could not open {path!r} for writing {fourcc} '
+                       f'video.')
+            return
+        write, close = writer.write, writer.release
+    else:
+        frame_map = _FrameMap(path, shape, dtype)
+        write, close = frame_map.write, frame_map.close
+    # videos start over, so their timestamps do too
+    timestamp_file = open(f'{path}.timestamps',
+                          'wb' if file_format == 'video' else 'ab')
+    opened.put(None)
+
+    try:
+        while True:
+            item = todo.get()
+            if item is None:
+                break
+            slot, timestamp = item
+            write(ring.slots[slot])
+            timestamp_file.write(np.float64(timestamp).tobytes())
+            done.put(slot)
+            with recorded.get_lock():
+                recorded.value += 1
+    finally:
+        close()
+        timestamp_file.close()
+        ring.close()
+
+
+class Recorder:
+    """Record frames in a separate process.
+
+    The writer process starts with the first frame, which sets the frame
+    shape and dtype of the recording. Video needs uint8 frames, shaped
+    (height, width) or (height, width, 3) in BGR order. A recorder records
+    once; after `close`, make a new one to record again.
+
+    :param path: file to record to; a raw recording that exists is
+        appended to if its frames have the same shape and dtype, and a
+        video that exists is overwritten
+    :param file_format: one of `file_formats`
+    :param slots: number of frames that can wait for the writer
+    :param block: when `slots` frames are already waiting, wait up to
+        `timeout` seconds for the writer to catch up rather than drop the
+        new frame
+    :param timeout: seconds to wait for the writer when blocking
+    :param fps: frame rate of a video
+    :param fourcc: codec of a video
+    """
+    file_formats = ('raw', 'video')
+
+    def __init__(self, path, file_format='raw', slots=32, block=False,
+                 timeout=1.0, fps=30.0, fourcc='MJPG'):
+        if file_format not in self.file_formats:
+            raise ValueError(f'Unknown file format {file_format!r}.')
+        self.path = path
+        self.file_format = file_format
+        self.num_slots = slots
+        self.block = block
+        self.timeout = timeout
+        self.fps = fps
+        self.fourcc = fourcc
+
+        self._received = self._dropped = 0
+        self._recorded = multiprocessing.Value('q', 0)
+        self._todo = multiprocessing.Queue()
+        # slots come back through `_done` once written
+        self._done = multiprocessing.Queue()
+        self._opened = multiprocessing.Queue()
+        self._ring = None
+        self._process = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def stats(self):
+        recorded = self._recorded.value
+        return RecorderStats(self._received, recorded, self._dropped,
+                             self._received - self._dropped - recorded)
+
+    def _check_append(self, shape, dtype):
+        """Raise ValueError unless frames can be added to the raw file."""
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return
+        try:
+            with open(f'{self.path}.json') as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f'{self.path!r} exists and is not a raw '
+                             f'recording.') from None
+        if tuple(header['shape']) != shape \
+                or np.dtype(header['dtype']) != dtype:
+            raise ValueError(f'Frames of shape {shape} and dtype {dtype} '
+                             f'cannot be appended to {self.path!r}, which '
+                             f'holds frames of shape {tuple(header["shape"])}'
+                             f' and dtype {np.dtype(header["dtype"])}.')
+
+    def _open(self, shape, dtype):
+        if self.file_format == 'raw':
+            self._check_append(shape, dtype)
+            with open(f'{self.path}.json', 'w') as f:
+                json.dump({'shape': shape, 'dtype': dtype.str}, f)
+        self._ring = SharedFrameRing(self.num_slots, shape, dtype)
+        self._process = multiprocessing.Process(
+            target=_write_frames, daemon=True, name=f'Recorder-{self.path}',
+            args=(self._ring.name, shape, dtype, self.num_slots, self._todo,
+                  self._done, self._opened, self._recorded, self.path,
+                  self.file_format, self.fps, self.fourcc))
+        self._process.start()
+
+        error = None
+        while True:
+            try:
+                error = self._opened.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if not self._process.is_alive():
+                    error = 'The recorder process has stopped.'
+                    break
+        if error is not None:
+            self._process.join()
+            self._process = None
+            self._ring.close()
+            self._ring = None
+            raise RuntimeError(error)
+
+    def write(self, image, timestamp=None):
+        """Queue a frame to be written to the recording.
+
+        The first frame starts the writer process and fixes the frame
+        shape and dtype of the recording. Returns as soon as the pixels
+        are in shared memory, before the frame is on disk.
+
+        :param image: the frame
+        :param timestamp: time of the frame, now if None
+        :return: True if the frame was queued, False if it was dropped
+        """
+        image = np.asarray(image)
+        if self._closed:
+            raise RuntimeError('The recorder is closed.')
+        if self._process is None:
+            self._open(image.shape, image.dtype)
+        else:
+            self._ring.check(image, 'recording')
+            if not self._process.is_alive():
+                raise RuntimeError('The recorder process has stopped.')
+
+        self._received += 1
+        slot = self._ring.put(image, self._done.get, self.block, self.timeout)
+        if slot is None:
+            self._dropped += 1
+            return False
+        self._todo.put((slot, time.time() if timestamp is None
+                        else timestamp))
+        return True
+
+    def record(self, grabber, num_frames=None, duration=None):
+        """Record frames taken from a `FrameGrabber`.
+
+        Runs on the calling thread while the grabber's thread grabs. Stops
+        after `num_frames` frames or `duration` seconds, or when the grabber
+        stops.
+
+        :param grabber: a started `hardware.frame_grabber.FrameGrabber`
+        :param num_frames: number of frames to take, no limit if None
+        :param duration: seconds to record for, no limit if None
+        """
+        start = time.perf_counter()
+        taken = 0
+        while num_frames is None or taken < num_frames:
+            remaining = None if duration is None \
+                else duration - (time.perf_counter() - start)
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                frame = grabber.get(timeout=remaining)
+            except TimeoutError:
+                break
+            if frame is None:
+                break
+            self.write(frame.image, frame.timestamp)
+            grabber.release(frame)
+            taken += 1
+
+    def close(self):
+        """Write the queued frames and stop the writer process."""
+        self._closed = True
+        if self._process is None:
+            return
+        self._todo.put(None)
+        self._process.join()
+        self._process = None
+        self._ring.close()
+        self._ring = None
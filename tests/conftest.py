@@ -0,0 +1,16 @@
+import os
+
+# Use the simulated Analog Discovery 2 when the WaveForms runtime or a device
+# is missing, or when PATCHBAY_SIMULATE_DWF is set. This has to happen before
+# any driver module imports dwf.
+try:
+    if os.environ.get('PATCHBAY_SIMULATE_DWF'):
+        raise ImportError
+    import dwf
+    simulate_dwf = not dwf.DwfEnumeration()
+except (ImportError, OSError):
+    simulate_dwf = True
+
+if simulate_dwf:
+    from hardware import simulated_dwf
+    simulated_dwf.install()
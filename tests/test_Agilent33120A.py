@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from hardware.fake_scpi import FakeResourceManager
+
+try:
+    from hardware.signal_generator import Agilent33120ASignalGenerator
+except (ImportError, OSError):
+    pytest.skip('skipping Agilent33120A tests, driver dependencies missing',
+                allow_module_level=True)
+
+ch_id = (0, 'carrier')
+resource_name = 'ASRL1::INSTR'
+
+
+@pytest.fixture
+def resource_manager():
+    return FakeResourceManager()
+
+
+@pytest.fixture
+def sig_gen(resource_manager):
+    return Agilent33120ASignalGenerator(resource_name, resource_manager)
+
+
+@pytest.fixture
+def resource(sig_gen, resource_manager):
+    return resource_manager.resources[resource_name]
+
+
+def test_details(sig_gen, resource):
+    """Channel details are read with a single query."""
+    transactions = resource.transactions
+    assert {'enabled': True, 'shape': 'sinusoid', 'frequency': 1e3,
+            'amplitude': 0.1, 'offset': 0, 'phase': 0, 'master': 0} == \
+        sig_gen.channel_details(ch_id)
+    assert {'enabled': True} == sig_gen.channel_details('sync')
+    assert transactions + 2 == resource.transactions
+
+
+def test_configure_single_transaction(sig_gen, resource):
+    """Configuring writes one program and reads the error queue once."""
+    transactions = resource.transactions
+    sig_gen.configure_channel(ch_id, shape='square', frequency=2e4,
+                              amplitude=0.5, offset=0.25, phase=15)
+    assert transactions + 2 == resource.transactions
+    assert [] == sig_gen.get_errors()
+
+    assert {'shape': 'square', 'frequency': 2e4, 'amplitude': 0.5,
+            'offset': 0.25} == sig_gen.channel_details(
+        ch_id, ['shape', 'frequency', 'amplitude', 'offset'])
+
+
+def test_configure_errors_attributed(sig_gen):
+    """Errors are read back with the program that caused them."""
+    sig_gen.configure_channel(ch_id, frequency=1e9, amplitude=1)
+    errors = sig_gen.get_errors()
+    assert [-222] == [err.code for err in errors]
+    assert 'frequency 1000000000.0;:voltage 1' == errors[0].commands[-1]
+
+
+def test_sync_output(sig_gen):
+    """The sync output can be switched off and on."""
+    sync = sig_gen.get_channel('sync')
+    sync.enabled = False
+    assert not sync.enabled
+    sync.enabled = True
+    assert sync.enabled
+
+
+def test_cache_holds_device_values(sig_gen):
+    """The cache holds values as the device reads them back."""
+    sig_gen.use_cache = True
+    sig_gen.configure_channel(ch_id, frequency=2000, phase=90, master=1)
+    assert {'frequency': 2000.0, 'phase': 0, 'master': 0} == \
+        sig_gen.channel_details(ch_id, ['frequency', 'phase', 'master'])
+    assert isinstance(sig_gen.get_channel(ch_id).frequency, float)
+
+
+def test_errors_kept_when_monitor_starts(sig_gen):
+    """Errors read before the monitor started are still returned."""
+    sig_gen.set_channel_attribute(ch_id, 'frequency', 1e9)
+    assert 1 == len(sig_gen.get_errors())
+
+    monitor = sig_gen.start_error_monitor(interval=10)
+    try:
+        received = threading.Event()
+        monitor.add_callback(lambda err: received.set())
+        sig_gen.configure_channel(ch_id, frequency=2e9)
+        assert received.wait(1)
+        assert [-222, -222] == [err.code for err in sig_gen.get_errors()]
+    finally:
+        sig_gen.stop_error_monitor()
+
+
+def test_rejected_write_not_cached(sig_gen):
+    """Values of a program the device rejected are read from it again."""
+    sig_gen.use_cache = True
+    sig_gen.configure_channel(ch_id, frequency=1e9)
+    assert [-222] == [err.code for err in sig_gen.get_errors()]
+    assert 1e3 == sig_gen.get_channel(ch_id).frequency
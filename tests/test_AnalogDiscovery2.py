@@ -1,13 +1,22 @@
+import asyncio
+import time
+
+import numpy as np
 import pytest
 import dwf
 
 from hardware.signal_generator import AnalogDiscovery2SignalGenerator
 from hardware.oscilloscope import AnalogDiscovery2Oscilloscope
+from hardware.servo import AnalogDiscovery2Servo
+from hardware.stepper import AnalogDiscovery2Stepper
 
 if not dwf.DwfEnumeration():
     pytest.skip("skipping AnalogDiscovery2 tests, no device present",
                 allow_module_level=True)
 
+simulated = dwf.__name__.endswith('simulated_dwf')
+
+
 @pytest.fixture
 def hdwf():
     """Get a handle for the device to test with."""
@@ -32,4 +41,293 @@ def test_2(hdwf):
 
     assert not cho.enabled
     assert chsg.shape == 'dc'
-    assert not chsg.enabled
\ No newline at end of file
+    assert not chsg.enabled
+
+
+def test_loopback(hdwf):
+    """A sine on W1 is captured on channel 1 (wired 1+ to W1)."""
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    adsg = AnalogDiscovery2SignalGenerator(hdwf)
+    adsg.configure_channel((0, 'carrier'), enabled=True, shape='sinusoid',
+                           frequency=10e3, amplitude=1, offset=0.5)
+    adsg.run()
+
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 2000
+    ado.sampling_rate = 1e6
+    ado.arm()
+    data = ado.get_data()
+
+    assert [0] == list(data)
+    samples = np.array(data[0])
+    assert 2000 == len(samples)
+    assert 0.5 == pytest.approx(samples.mean(), abs=0.02)
+    assert 1.5 == pytest.approx(samples.max(), abs=0.02)
+    assert -0.5 == pytest.approx(samples.min(), abs=0.02)
+
+
+def test_servo(hdwf):
+    servo = AnalogDiscovery2Servo(hdwf, 2)
+    servo.position = 30
+    assert 30 == pytest.approx(servo.position, abs=0.5)
+
+    servo.position = 100
+    assert servo.theta_max == pytest.approx(servo.position, abs=0.5)
+
+
+def test_stepper(hdwf):
+    stepper = AnalogDiscovery2Stepper(hdwf, range(4, 8), step_time=1e-4)
+    asyncio.run(stepper.go_to(6))
+    assert 6 == stepper.position
+    asyncio.run(stepper.step_async(-2))
+    assert 4 == stepper.position
+
+
+@pytest.mark.skipif(not simulated, reason='checks the simulation')
+def test_simulated_capture_time(hdwf):
+    """A simulated capture takes buffer size / sampling rate to finish."""
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.buffer_size = 1000
+    ado.sampling_rate = 10e3
+
+    ado.arm()
+    assert dwf.Dwf.STATE.TRIGGERED == ado.device.status(False)
+    assert 0 < ado.device.statusSamplesLeft() <= 1000
+    assert {} == ado.get_data()
+    assert dwf.Dwf.STATE.DONE == ado.device.status(False)
+
+
+def test_get_data_latency(hdwf):
+    """Short captures come back soon after the capture time."""
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 1000
+    ado.sampling_rate = 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(10):
+        ado.arm()
+        assert 1000 == len(ado.get_data()[0])
+    assert (time.perf_counter() - t0) / 10 < 0.02
+
+
+@pytest.mark.skipif(not simulated, reason='needs a capture that never ends')
+def test_get_data_timeout(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.buffer_size = 1000
+    ado.sampling_rate = 100
+
+    ado.arm()
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        ado.get_data(timeout=0.05)
+    assert time.perf_counter() - t0 < 1
+    ado.stop()
+
+
+def test_get_data_async(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(1).enabled = True
+    ado.buffer_size = 500
+    ado.sampling_rate = 1e6
+
+    ado.arm()
+    data = asyncio.run(ado.get_data_async(timeout=1))
+    assert [1] == list(data)
+    assert 500 == len(data[1])
+
+
+@pytest.fixture
+def streaming_scope(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.get_channel(1).enabled = True
+    ado.buffer_size = 8192
+    ado.sampling_rate = 1e6
+    return ado
+
+
+def test_stream(streaming_scope):
+    """Every sample of a finite record is either delivered or counted lost."""
+    position = 0
+    for chunk in streaming_scope.stream(duration=0.05, ring_size=20000):
+        assert (0, 1) == chunk.channels
+        assert position == chunk.start - chunk.lost
+        position = chunk.start + chunk.data.shape[1]
+    assert 50000 == position
+    assert dwf.DwfAnalogIn.ACQMODE.SINGLE == \
+        streaming_scope.device.acquisitionModeGet()
+
+
+def test_stream_reports_lost_samples(streaming_scope):
+    """Samples dropped by a slow reader are counted, not skipped silently."""
+    streaming_scope.buffer_size = 1000
+    chunks = list(streaming_scope.stream(duration=0.05, poll_interval=0.01))
+
+    lost = sum(chunk.lost for chunk in chunks)
+    received = sum(chunk.data.shape[1] for chunk in chunks)
+    assert 0 < lost
+    assert 50000 == lost + received
+    assert all(chunk.data.shape[1] <= 1000 for chunk in chunks)
+
+
+def test_stream_async(streaming_scope):
+    async def take(n):
+        chunks = []
+        async for chunk in streaming_scope.stream_async():
+            chunks.append(chunk.data.copy())
+            if len(chunks) == n:
+                break
+        return chunks
+
+    assert 3 == len(asyncio.run(take(3)))
+    assert dwf.DwfAnalogIn.STATE.READY == streaming_scope.device.status(False)
+
+
+def test_pooled_buffer(hdwf, monkeypatch):
+    """Repeated captures reuse one array and don't re-read the settings."""
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(1).enabled = True
+    ado.buffer_size = 1000
+    ado.sampling_rate = 10e6
+
+    ado.arm()
+    first = ado.get_array()
+    assert (1, 1000) == first.shape
+    assert (1,) == ado.plan.channels
+
+    def fail(*args):
+        raise AssertionError('settings read again')
+    monkeypatch.setattr(ado.device, 'channelEnableGet', fail)
+    monkeypatch.setattr(ado.device, 'bufferSizeGet', fail)
+    ado.arm()
+    assert first is ado.get_array()
+    monkeypatch.undo()
+
+    ado.get_channel(0).enabled = True
+    ado.arm()
+    assert (0, 1) == tuple(ado.get_data())
+
+
+def test_get_data_is_not_overwritten(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 500
+    ado.sampling_rate = 10e6
+
+    ado.arm()
+    first = ado.get_data()[0]
+    kept = first.copy()
+    ado.arm()
+    second = ado.get_data()[0]
+    assert not np.shares_memory(first, second)
+    assert np.array_equal(kept, first)
+
+
+def test_caller_buffer(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 500
+    ado.sampling_rate = 10e6
+
+    out = np.zeros((1, 500))
+    ado.arm()
+    assert out is ado.get_array(out=out)
+    assert out.any()
+
+    with pytest.raises(ValueError):
+        ado.get_array(out=np.zeros((2, 500)))
+    with pytest.raises(ValueError):
+        ado.get_array(out=np.zeros((1, 500), np.float32))
+
+
+def test_average(hdwf):
+    """Averaging a DC level brings the noise down."""
+    adsg = AnalogDiscovery2SignalGenerator(hdwf)
+    adsg.configure_channel((0, 'carrier'), enabled=True, shape='dc',
+                           offset=0.3)
+    adsg.run()
+
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 1000
+    ado.sampling_rate = 10e6
+
+    result = ado.average(16, history=4, timeout=1)
+    assert (0,) == result.channels
+    assert (1, 1000) == result.mean.shape
+    assert (4, 1, 1000) == result.segments.shape
+    assert 0.3 == pytest.approx(result.mean.mean(), abs=0.01)
+    assert result.mean.std() < result.segments[-1].std() / 2
+
+
+def test_trigger_settings(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    assert [0, 1] == ado.input_ids
+
+    ado.configure_channel('trigger', source=1, level=0.25, edge='falling',
+                          holdoff=1e-3, position=1e-4, auto_timeout=0.5)
+    assert {'source': 1, 'level': 0.25, 'edge': 'falling', 'holdoff': 1e-3,
+            'position': 1e-4, 'auto_timeout': 0.5} == \
+        ado.channel_details('trigger')
+
+    ado.trigger.source = 'external1'
+    assert 'external1' == ado.trigger.source
+    ado.trigger.source = None
+    assert ado.trigger.source is None
+    with pytest.raises(ValueError):
+        ado.trigger.source = 'bogus'
+
+
+def test_cache_holds_device_values(hdwf):
+    """Cached values are those the device reports, not those written."""
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.use_cache = True
+    ado.trigger.source = 'EXTERNAL1'
+    assert 'external1' == ado.trigger.source
+
+    sig_gen = AnalogDiscovery2SignalGenerator(hdwf)
+    sig_gen.use_cache = True
+    carrier = sig_gen.get_channel((0, 'carrier'))
+    carrier.frequency = 1234.5
+    assert sig_gen.get_channel_attribute((0, 'carrier'), 'frequency') == \
+        carrier.frequency
+
+
+def test_trigger_edge(hdwf):
+    """The rising edge through the level is at the middle of the buffer."""
+    adsg = AnalogDiscovery2SignalGenerator(hdwf)
+    adsg.configure_channel((0, 'carrier'), enabled=True, shape='sinusoid',
+                           frequency=10e3, amplitude=1)
+    adsg.run()
+
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.get_channel(0).enabled = True
+    ado.buffer_size = 1000
+    ado.sampling_rate = 1e6
+    ado.configure_channel('trigger', source=0, level=0.5, edge='rising',
+                          position=0)
+
+    for _ in range(3):
+        ado.arm()
+        samples = ado.get_data(timeout=1)[0]
+        assert samples[499] < 0.5 + 0.01
+        assert samples[500] >= 0.5 - 0.01
+        assert samples[510] > samples[490]
+
+
+@pytest.mark.skipif(not simulated, reason='needs a trigger that never comes')
+def test_trigger_auto_timeout(hdwf):
+    ado = AnalogDiscovery2Oscilloscope(hdwf)
+    ado.buffer_size = 100
+    ado.sampling_rate = 1e6
+    ado.trigger.source = 'external1'
+
+    ado.arm()
+    with pytest.raises(TimeoutError):
+        ado.get_data(timeout=0.05)
+
+    ado.trigger.auto_timeout = 0.01
+    ado.arm()
+    ado.get_data(timeout=1)
+    assert ado.device.statusAutotriggered()
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hardware.async_instrument import AsyncInstrument
+from hardware.dummy_instrument import DummySignalGenerator
+
+ch_id = (0, 'carrier')
+
+
+class SlowSignalGenerator(DummySignalGenerator):
+    """Dummy generator whose reads take time and track overlapping calls."""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_channel_attribute(self, channel_id, name):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return super().get_channel_attribute(channel_id, name)
+
+
+@pytest.fixture
+def async_sig_gen():
+    sg = AsyncInstrument(DummySignalGenerator())
+    yield sg
+    sg.close()
+
+
+def test_get_set_configure_details(async_sig_gen):
+    """The awaitable methods match the blocking instrument behaviour."""
+    async def exercise():
+        await async_sig_gen.set(ch_id, 'frequency', 2e3)
+        await async_sig_gen.configure(ch_id, amplitude=0.5, shape='square')
+
+        channel = async_sig_gen.get_channel(ch_id)
+        await channel.set('offset', 0.25)
+        return (await async_sig_gen.get(ch_id, 'frequency'),
+                await channel.details(['amplitude', 'shape', 'offset']))
+
+    frequency, details = asyncio.run(exercise())
+    assert 2e3 == frequency
+    assert {'amplitude': 0.5, 'shape': 'square', 'offset': 0.25} == details
+
+
+def test_errors_propagate(async_sig_gen):
+    """Driver exceptions are raised from the awaited call."""
+    with pytest.raises(AttributeError):
+        asyncio.run(async_sig_gen.get(ch_id, 'BadAttrName'))
+    with pytest.raises(KeyError):
+        async_sig_gen.get_channel('BadChannelID')
+
+
+def test_calls_serialized_per_device():
+    """Calls to one device never overlap; separate devices run together."""
+    devices = [SlowSignalGenerator(), SlowSignalGenerator()]
+    wrapped = [AsyncInstrument(d) for d in devices]
+
+    async def read_all():
+        await asyncio.gather(*(w.details(ch_id, ['frequency', 'amplitude'])
+                               for w in wrapped for _ in range(2)))
+
+    t0 = time.perf_counter()
+    asyncio.run(read_all())
+    elapsed = time.perf_counter() - t0
+
+    for w in wrapped:
+        w.close()
+    assert all(1 == d.max_active for d in devices)
+    # 4 reads per device, with both devices working at the same time
+    assert elapsed < 8 * devices[0].delay
+
+
+def test_timeout():
+    """A call that takes longer than the timeout raises TimeoutError."""
+    sg = AsyncInstrument(SlowSignalGenerator(delay=0.2), timeout=0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(sg.get(ch_id, 'frequency'))
+    sg.close()
+
+
+def test_concurrency_limit():
+    """A shared limit caps the number of calls in progress."""
+    delay = 0.02
+
+    async def read_all():
+        limit = asyncio.Semaphore(1)
+        wrapped = [AsyncInstrument(SlowSignalGenerator(delay), limit=limit)
+                   for _ in range(3)]
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(w.get(ch_id, 'frequency') for w in wrapped))
+        elapsed = time.perf_counter() - t0
+
+        for w in wrapped:
+            w.close()
+        return elapsed
+
+    # different devices, but only one call may run at a time
+    assert asyncio.run(read_all()) >= 3 * delay
+
+
+def test_timed_out_call_keeps_its_permit():
+    """A call that timed out counts towards the limit until it finishes."""
+    async def run():
+        limit = asyncio.Semaphore(1)
+        slow = AsyncInstrument(SlowSignalGenerator(0.2), limit=limit)
+        fast = AsyncInstrument(SlowSignalGenerator(0), limit=limit)
+        with pytest.raises(asyncio.TimeoutError):
+            await slow.call(slow.instrument.get_channel_attribute, ch_id,
+                            'frequency', timeout=0.01)
+        t0 = time.perf_counter()
+        await fast.get(ch_id, 'frequency')
+        elapsed = time.perf_counter() - t0
+        slow.close()
+        fast.close()
+        return elapsed
+
+    assert asyncio.run(run()) > 0.1
+
+
+def test_shared_executor_outlives_one_wrapper():
+    """Closing one wrapper leaves the device usable by the others."""
+    device = DummySignalGenerator()
+    first, second = AsyncInstrument(device), AsyncInstrument(device)
+    first.close()
+    first.close()
+    assert 1e3 == asyncio.run(second.get(ch_id, 'frequency'))
+    second.close()
@@ -1,13 +1,26 @@
+import os
+import time
+
 import pytest
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 import numpy as np
 
+# without a camera, use pylon's emulated one
+os.environ.setdefault('PYLON_CAMEMU', '1')
+pytest.importorskip('pypylon')
 
 from hardware.basler import BaslerAPI
 
 
+@pytest.fixture
+def camera():
+    cam = BaslerAPI().get_camera()
+    yield cam
+    cam.stop()
+
+
 def test_pass():
     bapi = BaslerAPI()
     cam = bapi.get_camera()
@@ -17,3 +30,57 @@ def test_pass():
     plt.imshow(im)
     print(np.min(im))
 
+
+def test_continuous_grab(camera):
+    """Grabbing does not stop after a fixed number of frames."""
+    camera.max_num_buffer = 4
+    camera.start()
+    frames = [camera.read(1000) for _ in range(20)]
+    assert all(frame is not None for frame in frames)
+    assert camera.device_handle.IsGrabbing()
+
+
+@pytest.mark.parametrize('strategy, skips', [('one_by_one', False),
+                                             ('latest_image_only', True),
+                                             ('latest_images', True)])
+def test_grab_strategy(camera, strategy, skips):
+    # with the default output queue size of 1, 'latest_images' keeps only
+    # the newest frame, like 'latest_image_only'
+    camera.grab_strategy = strategy
+    camera.start()
+    camera.read(1000)
+    time.sleep(0.1)
+    camera.read(1000)
+    assert skips == (0 < camera.skipped)
+
+
+def test_latest_images_queue(camera):
+    camera.grab_strategy = 'latest_images'
+    camera.max_num_buffer = 4
+    camera.output_queue_size = 4
+    camera.start()
+    assert 4 == camera.device_handle.OutputQueueSize.GetValue()
+    time.sleep(0.1)
+    frames = [camera.read(1000) for _ in range(4)]
+    assert all(frame is not None for frame in frames)
+
+
+def test_upcoming_image(camera):
+    """Each read waits for a frame acquired after the call."""
+    camera.grab_strategy = 'upcoming_image'
+    camera.start()
+    assert camera.read(1000) is not None
+    time.sleep(0.1)
+    assert camera.read(1000) is not None
+    assert camera.device_handle.IsGrabbing()
+
+
+def test_callback(camera):
+    frames = []
+    camera.buffer_mode = 'pool'
+    camera.start(callback=lambda image: (frames.append(image.shape),
+                                         camera.release(image)))
+    time.sleep(0.2)
+    camera.stop()
+    assert frames
+    assert camera.pool.size == camera.pool.available
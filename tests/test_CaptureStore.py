@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from storage.capture_store import CaptureStore
+
+config = [[0, {'enabled': True, 'scale': 5.0}],
+          ['trigger', {'source': None}]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with CaptureStore(str(tmp_path / 'store'), chunk_bytes=10000) as s:
+        yield s
+
+
+def test_append_and_read(store):
+    buffer = np.empty((2, 500))
+    for i in range(10):
+        buffer[:] = i
+        store.append(buffer, timestamp=100 + i, config=config)
+    store.append({0: np.arange(8, dtype=np.uint16)}, timestamp=200)
+    store.flush()
+
+    assert 11 == len(store)
+    capture = store[3]
+    assert 103 == capture.timestamp
+    assert (2, 500) == capture.data.shape
+    assert (capture.data == 3).all()
+    assert isinstance(capture.data, np.memmap)
+    assert config == capture.config
+
+    logic = store[-1]
+    assert np.uint16 == logic.data.dtype
+    assert [list(range(8))] == logic.data.tolist()
+    assert logic.config is None
+
+    # 8000 byte captures in 10000 byte chunks
+    assert list(range(10)) + [9] == list(store.index['chunk'])
+
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / 'store')
+    with CaptureStore(path) as store:
+        store.append(np.ones((1, 10)), timestamp=1, config=config)
+        store.append(np.zeros((1, 10)), timestamp=2, config=config)
+
+    with CaptureStore(path) as store:
+        store.append(np.full((1, 10), 2.0), timestamp=3, config={'a': 1})
+        store.flush()
+        assert 3 == len(store)
+        assert [1, 0, 2] == [c.data[0, 0] for c in
+                             (store[i] for i in range(3))]
+        assert [0, 0, 1] == list(store.index['config'])
+
+
+def test_time_range(store):
+    for t in (5, 1, 3, 2, 4):
+        store.append(np.full(4, t), timestamp=t)
+    store.flush()
+
+    assert [2, 3, 4] == list(store.select(2, 5))
+    assert [3, 2] == [c.timestamp for c in store.query(2, 4)]
+    assert 0 == len(store.select(10))
+
+    store.append(np.full(4, 0), timestamp=2.5)
+    store.flush()
+    assert [2, 3, 5] == list(store.select(2, 4))
+
+
+def test_time_range_in_order(store):
+    for t in range(5):
+        store.append(np.full(4, t), timestamp=t)
+    store.flush()
+    assert [1, 2] == list(store.select(1, 3))
+
+    store.append(np.full(4, 0), timestamp=0.5)
+    store.flush()
+    assert [1, 2, 5] == list(store.select(0.5, 3))
+
+
+def test_bad_data(store):
+    with pytest.raises(ValueError):
+        store.append(np.ones((1, 2, 3)))
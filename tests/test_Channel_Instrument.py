@@ -28,6 +28,30 @@ def test_get_channel(inst):
         inst.get_channel('BadChannelID')
 
 
+def test_get_channel_cached(inst):
+    """The same channel instance is returned on every call."""
+    for ch in test_specs.keys():
+        assert inst.get_channel(ch) is inst.get_channel(ch)
+
+
+def test_channel_class_per_spec(inst):
+    """Channels with the same spec share one generated class."""
+    other = Instrument({'a': ['enabled'], 'b': ('enabled', 'shape')})
+    assert type(inst.get_channel(0)) is type(other.get_channel('a'))
+    assert type(inst.get_channel('sync')) is type(other.get_channel('b'))
+    assert ('enabled', 'shape') == inst.get_channel('sync').attributes
+
+
+def test_channel_fixed_attributes(inst):
+    """Only attributes named in the spec can be set on a channel."""
+    channel = inst.get_channel('sync')
+    channel.shape = 'square'
+    with pytest.raises(AttributeError):
+        channel.frequency = 10
+    with pytest.raises(AttributeError):
+        getattr(channel, 'frequency')
+
+
 def test_get_channel_attribute(inst):
     """Confirm that the attributes match the specs."""
 
@@ -41,3 +65,93 @@ def test_get_channel_attribute(inst):
     with pytest.raises(KeyError):
         inst.get_channel_attribute('BadChannelID', 'frequency')
 
+
+class CountingInstrument(Instrument):
+    """Instrument that stores values and counts reads from the 'device'."""
+    live_attrs = ('test',)
+
+    def __init__(self, channel_specs):
+        super().__init__(channel_specs)
+        self.values = {}
+        self.reads = 0
+
+    def get_channel_attribute(self, channel_id, name):
+        super().get_channel_attribute(channel_id, name)
+        self.reads += 1
+        return self.values.get((channel_id, name))
+
+    def set_channel_attribute(self, channel_id, name, value):
+        super().set_channel_attribute(channel_id, name, value)
+        if value is None:
+            raise ValueError('rejected by the device')
+        self.values[(channel_id, name)] = value
+        self._cache_written(channel_id, name, value)
+
+
+@pytest.fixture
+def cached_inst():
+    """Return a `CountingInstrument` with the attribute cache enabled."""
+    instrument = CountingInstrument(test_specs)
+    instrument.use_cache = True
+    return instrument
+
+
+def test_cache_disabled_by_default():
+    """Without the cache every read goes to the device."""
+    instrument = CountingInstrument(test_specs)
+    instrument.configure_channel('sync', enabled=True, shape='square')
+    instrument.channel_details('sync')
+    instrument.channel_details('sync')
+    assert 4 == instrument.reads
+
+
+def test_cache_write_through(cached_inst):
+    """Written values are served from the cache without device reads."""
+    cached_inst.configure_channel('sync', enabled=True, shape='square')
+    assert {'enabled': True, 'shape': 'square'} == \
+        cached_inst.channel_details('sync')
+    assert cached_inst.get_channel('sync').shape == 'square'
+    assert 0 == cached_inst.reads
+
+
+def test_cache_failed_write(cached_inst):
+    """A write the device rejects leaves nothing cached."""
+    cached_inst.set_channel_attribute(0, 'enabled', True)
+    with pytest.raises(ValueError):
+        cached_inst.set_channel_attribute(0, 'enabled', None)
+    cached_inst.values[(0, 'enabled')] = False
+    assert not cached_inst.channel_details(0)['enabled']
+    assert 1 == cached_inst.reads
+
+
+def test_cache_read_once(cached_inst):
+    """Unknown values are read from the device once and then cached."""
+    cached_inst.channel_details(0)
+    cached_inst.channel_details(0)
+    assert 1 == cached_inst.reads
+
+
+def test_cache_live_attributes(cached_inst):
+    """Attributes in `live_attrs` are always read from the device."""
+    ch_id = (1, 'carrier')
+    cached_inst.configure_channel(ch_id, enabled=True, test=1, frequency=2)
+    cached_inst.channel_details(ch_id)
+    cached_inst.channel_details(ch_id)
+    assert 2 == cached_inst.reads
+
+
+def test_cache_invalidate_refresh(cached_inst):
+    """Invalidated entries are re-read and `refresh` reloads the cache."""
+    cached_inst.set_channel_attribute(0, 'enabled', True)
+    cached_inst.values[(0, 'enabled')] = False
+
+    assert cached_inst.channel_details(0)['enabled']
+    cached_inst.invalidate(0, 'enabled')
+    assert not cached_inst.channel_details(0)['enabled']
+    assert 1 == cached_inst.reads
+
+    cached_inst.values[(0, 'enabled')] = True
+    cached_inst.refresh()
+    assert 1 + 5 == cached_inst.reads
+    assert cached_inst.channel_details(0)['enabled']
+    assert 1 + 5 == cached_inst.reads
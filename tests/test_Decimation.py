@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from analysis.decimation import MinMaxPyramid, lttb, minmax
+
+
+@pytest.fixture
+def record():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=1_000_003)
+
+
+def test_minmax(record):
+    env = minmax(record, 1000)
+    assert 1000 == len(env.index) == len(env.lower) == len(env.upper)
+    assert record.min() == env.lower.min()
+    assert record.max() == env.upper.max()
+    assert record[:1000].max() == env.upper[0]
+
+
+def test_minmax_channels():
+    data = np.arange(20.).reshape(2, 10)
+    env = minmax(data, 5, start=100)
+    assert [100, 102, 104, 106, 108] == list(env.index)
+    assert [[0, 2, 4, 6, 8], [10, 12, 14, 16, 18]] == env.lower.tolist()
+    assert [[1, 3, 5, 7, 9], [11, 13, 15, 17, 19]] == env.upper.tolist()
+
+
+def test_lttb():
+    x = np.linspace(0, 4 * np.pi, 10000)
+    y = np.sin(x)
+    y[5000] = 10
+    selected = lttb(y, 200)
+    assert 200 == len(selected)
+    assert 0 == selected[0] and 9999 == selected[-1]
+    assert (np.diff(selected) > 0).all()
+    # spikes survive
+    assert 5000 in selected
+
+
+def test_pyramid_matches_minmax(record):
+    pyramid = MinMaxPyramid(record)
+    for start, stop in ((0, None), (12345, 812345), (500, 2500), (7, 70)):
+        env = pyramid.envelope(start, stop, pixels=500)
+        raw = record[start:stop]
+        assert len(env.index) <= 500
+        assert raw.min() == env.lower.min()
+        assert raw.max() == env.upper.max()
+        assert start == env.index[0]
+
+
+def test_pyramid_append(record):
+    """Appending in chunks gives the same envelopes as building at once."""
+    whole = MinMaxPyramid(record)
+    streamed = MinMaxPyramid()
+    for chunk in np.array_split(record, 37):
+        streamed.append(chunk)
+
+    assert len(whole) == len(streamed)
+    env_whole = whole.envelope(pixels=800)
+    env_streamed = streamed.envelope(pixels=800)
+    for a, b in zip(env_whole, env_streamed):
+        np.testing.assert_array_equal(a, b)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from hardware.dummy_bench import DummyBench
+
+
+@pytest.fixture
+def bench():
+    bench = DummyBench()
+    bench.scope.noise = {0: 0, 1: 0}
+    bench.sig_gen.configure_channel((0, 'carrier'), enabled=True,
+                                    shape='sine', frequency=1e3,
+                                    amplitude=1.0)
+    return bench
+
+
+def test_loopback(bench):
+    data = bench.capture()
+    assert {0: {0: 1.0}, 1: {1: 1.0}} == bench.wiring
+    assert 1.0 == pytest.approx(data[0].max(), abs=1e-3)
+    assert not data[1].any()
+
+
+def test_am(bench):
+    bench.sig_gen.configure_channel((0, 'am'), enabled=True, shape='sine',
+                                    frequency=100, amplitude=50)
+    bench.scope.buffer_size = 20000
+    samples = bench.capture()[0]
+    assert 1.5 == pytest.approx(samples.max(), abs=0.01)
+    assert 0.5 == pytest.approx(np.abs(samples[7000:8000]).max(), abs=0.01)
+
+
+def test_max_throughput_follows_generator(bench):
+    bench.scope.max_throughput = True
+    assert 1.0 == pytest.approx(bench.capture()[0].max(), abs=1e-3)
+    bench.sig_gen.get_channel((0, 'carrier')).amplitude = 0.3
+    assert 0.3 == pytest.approx(bench.capture()[0].max(), abs=1e-3)
+
+
+def test_wiring(bench):
+    bench.sig_gen.configure_channel((1, 'carrier'), enabled=True,
+                                    shape='dc', offset=0.5)
+    bench.wire(1, {0: 0.5, 1: 2.0}, noise=0.1)
+    assert {0: 0.5, 1: 2.0} == bench.wiring[1]
+
+    samples = bench.capture()[1]
+    assert 1.0 == pytest.approx(samples.mean(), abs=0.01)
+    assert 0.1 * np.sqrt(2) < (samples - 1.0).std()
+
+
+def test_filter(bench):
+    """A sine at the bandwidth of the filter is attenuated by 3 dB."""
+    bench.wire(0, 0, bandwidth=1e3)
+    bench.wire(1, 0, bandwidth=1e5)
+    result = bench.sweep([1e3])[0]
+    assert 1 / np.sqrt(2) == pytest.approx(result['pk2pk'][0] / 2, rel=0.01)
+    assert 1.0 == pytest.approx(result['pk2pk'][1] / 2, rel=0.01)
+
+
+def test_sweep(bench):
+    frequencies = [1e3, 5e3, 20e3]
+    result = bench.sweep(frequencies)
+    assert (3, 2) == result.shape
+    assert frequencies == pytest.approx(result['frequency'][:, 0], rel=1e-2)
+    assert 1 / np.sqrt(2) == pytest.approx(result['rms'][:, 0], rel=1e-2)
@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+import pytest
+
+from analysis.frame_pipeline import centroid
+from hardware.dummy_instrument import DummyCamera
+from hardware.frame_grabber import FrameGrabber
+
+
+@pytest.mark.parametrize('pattern', DummyCamera.patterns)
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.float32])
+def test_frames(pattern, dtype):
+    camera = DummyCamera(64, 48, dtype, frame_rate=None, pattern=pattern,
+                         num_frames=4)
+    assert camera.read() is None
+
+    camera.start()
+    frames = [camera.read() for _ in range(5)]
+    assert all((48, 64) == f.shape and dtype == f.dtype for f in frames)
+    assert np.shares_memory(frames[0], frames[4])
+    assert not np.array_equal(frames[0], frames[1])
+    assert not frames[0].flags.writeable
+    assert 0 < frames[0].max()
+
+
+def test_spot_moves():
+    camera = DummyCamera(200, 200, frame_rate=None, num_frames=4)
+    camera.start()
+    positions = [centroid(camera.read()) for _ in range(4)]
+    assert (100, 150) == pytest.approx(positions[0], abs=0.5)
+    assert (150, 100) == pytest.approx(positions[1], abs=0.5)
+
+
+def test_pacing():
+    camera = DummyCamera(frame_rate=200)
+    # a stalled test run must not make the camera skip frames
+    camera.buffer_frames = 1000
+    t0 = time.perf_counter()
+    camera.start()
+    timestamps = []
+    for i in range(20):
+        camera.read()
+        assert i / 200 <= time.perf_counter() - t0
+        timestamps.append(camera.timestamp)
+    assert 0 == camera.skipped
+    assert 0.005 == pytest.approx(np.diff(timestamps), abs=1e-6)
+
+
+def test_slow_reader_skips_frames():
+    camera = DummyCamera(frame_rate=1000)
+    camera.start()
+    time.sleep(0.05)
+    camera.read()
+    # at least 50 frames are due, of which the camera holds only the last
+    # few; a slower test run can only skip more
+    assert 50 - camera.buffer_frames <= camera.skipped
+    assert camera.read(timeout=0) is not None
+
+
+def test_timeout():
+    camera = DummyCamera(frame_rate=1)
+    camera.start()
+    camera.read()
+    with pytest.raises(TimeoutError):
+        camera.read(timeout=10)
+
+
+def test_grabber():
+    with FrameGrabber(DummyCamera(frame_rate=500), read_timeout=100) \
+            as grabber:
+        frames = [grabber.get(timeout=1) for _ in range(10)]
+    assert list(range(10)) == [f.index for f in frames]
+    assert np.all(np.diff([f.timestamp for f in frames]) > 0)
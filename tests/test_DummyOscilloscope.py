@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from hardware.dummy_instrument import DummyOscilloscope, DummySignalGenerator
+
+
+class CountingOscilloscope(DummyOscilloscope):
+    """Each capture is filled with its shot number."""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer_size = 10
+        self.shots = 0
+        self.armed = 0
+
+    def arm(self):
+        self.armed += 1
+
+    def get_data(self, timeout=None, out=None):
+        data = super().get_data(timeout, out)
+        for samples in data.values():
+            samples[:] = self.shots
+        self.shots += 1
+        return data
+
+
+@pytest.fixture
+def dummy_osc():
+    return DummyOscilloscope()
+
+
+def test_get_data(dummy_osc):
+    data = dummy_osc.get_data()
+    assert [0, 1] == list(data)
+    assert (4000,) == data[0].shape
+
+
+def test_average(dummy_osc):
+    dummy_osc.set_signal(0, {'shape': 'dc', 'offset': 0.5}, noise=0.1)
+    result = dummy_osc.average(20)
+    assert (0, 1) == result.channels
+    assert (2, 4000) == result.mean.shape
+    assert result.segments is None
+    assert 0.5 == pytest.approx(result.mean[0].mean(), abs=0.01)
+    assert 0.1 / np.sqrt(20) == pytest.approx(result.mean[0].std(), rel=0.1)
+
+
+def test_average_history():
+    """The most recent segments are kept, oldest first."""
+    osc = CountingOscilloscope()
+    result = osc.average(7, history=3)
+
+    assert 7 == osc.armed
+    assert np.allclose(3, result.mean)
+    assert [4, 5, 6] == list(result.segments[:, 0, 0])
+
+
+def test_trigger(dummy_osc):
+    """Captures are aligned on the trigger edge."""
+    dummy_osc.configure_channel('trigger', source=1, level=0.5,
+                                edge='falling', position=-1e-3)
+    samples = dummy_osc.get_data()[1]
+    assert samples[999] > 0.5 >= samples[1000]
+
+    with pytest.raises(ValueError):
+        dummy_osc.trigger.source = 'external1'
+
+
+def test_signals(dummy_osc):
+    """Inputs follow their signals, range and enabled state."""
+    dummy_osc.set_signal(0, {'shape': 'sinusoid', 'frequency': 1e3,
+                             'amplitude': 2},
+                         {'shape': 'square', 'frequency': 5e3,
+                          'amplitude': 0.5, 'offset': 1}, noise=0)
+    dummy_osc.configure_channel(0, scale=4, offset=1)
+    dummy_osc.get_channel(1).enabled = False
+
+    data = dummy_osc.get_data()
+    assert [0] == list(data)
+    assert 3 == pytest.approx(data[0].max())
+    assert -1 == pytest.approx(data[0].min())
+    assert 1 == pytest.approx(data[0].mean(), abs=0.01)
+
+
+def test_deterministic():
+    first, second = DummyOscilloscope(seed=3), DummyOscilloscope(seed=3)
+    for _ in range(3):
+        assert np.array_equal(first.get_data()[1], second.get_data()[1])
+    assert not np.array_equal(first.get_data()[0], first.get_data()[0])
+
+
+def test_out(dummy_osc):
+    """Captures go to new arrays unless `out` is given."""
+    first = dummy_osc.get_data()[0]
+    assert not np.shares_memory(first, dummy_osc.get_data()[0])
+
+    out = np.empty((2, 4000))
+    assert np.shares_memory(out, dummy_osc.get_data(out=out)[1])
+    with pytest.raises(ValueError):
+        dummy_osc.get_data(out=np.empty((1, 4000)))
+
+
+def test_connect(dummy_osc):
+    sig_gen = DummySignalGenerator()
+    sig_gen.configure_channel((1, 'carrier'), enabled=True, shape='sine',
+                              frequency=2e3, amplitude=0.3, offset=0.1)
+    dummy_osc.connect(sig_gen)
+    dummy_osc.noise = {0: 0, 1: 0}
+
+    data = dummy_osc.get_data()
+    assert not data[0].any()
+    assert 0.4 == pytest.approx(data[1].max(), abs=1e-3)
+    assert 0.1 == pytest.approx(data[1].mean(), abs=1e-3)
+
+
+def test_max_throughput(dummy_osc):
+    """Captures are served from a bank synthesized once."""
+    dummy_osc.max_throughput = True
+    first = dummy_osc.get_data()[0]
+    second = dummy_osc.get_data()[0]
+    assert not np.array_equal(first, second)
+    for _ in range(dummy_osc.bank_size - 2):
+        dummy_osc.get_data()
+    again = dummy_osc.get_data()[0]
+    assert again is not first
+    assert np.array_equal(again, first)
+
+
+def test_trigger_timeout(dummy_osc):
+    dummy_osc.configure_channel('trigger', source=0, level=2)
+    with pytest.raises(TimeoutError):
+        dummy_osc.get_data(timeout=0.01)
+
+    dummy_osc.trigger.auto_timeout = 0.01
+    assert [0, 1] == list(dummy_osc.get_data())
@@ -30,7 +30,7 @@ def test_get_channel_valid(sig_gen):
 
     for channel_id in valid_channels:
         ch = sig_gen.get_channel(channel_id)
-        assert Channel is type(ch)
+        assert isinstance(ch, Channel)
 
 
 def test_get_channel_invalid(sig_gen):
@@ -0,0 +1,75 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from hardware.scpi import ErrorMessage, ErrorMonitor
+
+
+class QueueInstrument:
+    """Minimal instrument exposing an error queue and a bus lock."""
+
+    def __init__(self):
+        self.queue = []
+        self.lock = threading.Lock()
+
+    def _drain_errors(self, blocking=True):
+        if not self.lock.acquire(blocking):
+            return None
+        try:
+            errors, self.queue = self.queue, []
+            return errors
+        finally:
+            self.lock.release()
+
+
+@pytest.fixture
+def monitor():
+    m = ErrorMonitor(QueueInstrument(), interval=10, maxlen=3)
+    m.start()
+    yield m
+    m.stop()
+
+
+def make_errors(n):
+    return [ErrorMessage(datetime.now(), -100 - i, 'Command error', ('x',))
+            for i in range(n)]
+
+
+def test_notify_drains_and_calls_back(monitor):
+    """Errors are collected and reported soon after `notify`."""
+    received = threading.Event()
+    seen = []
+    monitor.add_callback(lambda err: (seen.append(err), received.set()))
+
+    monitor.instrument.queue.extend(make_errors(1))
+    monitor.notify()
+
+    assert received.wait(1)
+    assert [-100] == [err.code for err in seen]
+    assert ('x',) == seen[0].commands
+    assert seen == list(monitor.errors)
+
+
+def test_bounded_history(monitor):
+    """Only the most recent `maxlen` errors are kept."""
+    done = threading.Event()
+    monitor.add_callback(lambda err: err.code == -104 and done.set())
+
+    monitor.instrument.queue.extend(make_errors(5))
+    monitor.notify()
+
+    assert done.wait(1)
+    assert [-102, -103, -104] == [err.code for err in monitor.errors]
+
+
+def test_busy_bus_is_retried(monitor):
+    """A drain that finds the bus busy is retried without blocking."""
+    received = threading.Event()
+    monitor.add_callback(lambda err: received.set())
+
+    with monitor.instrument.lock:
+        monitor.instrument.queue.extend(make_errors(1))
+        monitor.notify()
+        assert not received.wait(0.05)
+    assert received.wait(1)
@@ -0,0 +1,51 @@
+import socket
+import time
+
+from hardware.fake_scpi import (FakeAgilent33120A, FakeResourceManager,
+                                FakeScpiServer)
+
+
+def test_fake_device_headers():
+    """Long and short forms of headers are accepted in any case."""
+    device = FakeAgilent33120A()
+    device.execute('FUNC:SHAP SQU;:freq 2e3;:VOLTage:OFFSet 0.5')
+    assert 'SQU;+2.00000000000000E+03;+5.00000000000000E-01' == \
+        device.execute('function:shape?;:FREQ?;:volt:offs?')
+    assert '+0,"No error"' == device.execute('SYST:ERR?')
+
+
+def test_fake_device_errors():
+    """Bad commands are reported through the error queue."""
+    device = FakeAgilent33120A()
+    device.execute('bogus 1;:frequency 1e9;:voltage abc;:function:shape X')
+    errors = [device.execute('system:error?') for _ in range(5)]
+    assert ['-113,"Undefined header"', '-222,"Data out of range"',
+            '-104,"Data type error"', '-224,"Illegal parameter value"',
+            '+0,"No error"'] == errors
+
+
+def test_latency_model():
+    """Transactions take the configured latency plus transfer time."""
+    rm = FakeResourceManager(latency=0.01, jitter=0.005,
+                             bytes_per_second=1e4, seed=1)
+    resource = rm.open_resource('ASRL1::INSTR')
+    delays = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        resource.query('frequency?')
+        delays.append(time.perf_counter() - t0)
+    # 0.01 +/- 0.005 s, plus 33 bytes at 10 kB/s
+    assert all(0.0083 - 1e-4 < d < 0.05 for d in delays)
+
+
+def test_socket_server():
+    """The TCP server runs programs and returns query responses."""
+    server = FakeScpiServer()
+    server.start()
+    try:
+        with socket.create_connection(server.server_address[:2]) as s:
+            s.sendall(b'freq 5e3\nfreq?;:outp:sync?\n')
+            assert b'+5.00000000000000E+03;1\n' == s.makefile('rb').readline()
+    finally:
+        server.stop()
+    assert 5e3 == server.device.settings['frequency']
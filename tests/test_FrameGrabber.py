@@ -0,0 +1,156 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from hardware.frame_grabber import FrameGrabber
+from hardware.frame_pool import FramePool
+
+
+class CountingCamera:
+    """Camera whose frames hold their frame number, one every `period`."""
+
+    def __init__(self, period=1e-3, frames=None):
+        self.period = period
+        self.frames = frames
+        self.count = 0
+        self.started = False
+        self.buffer = np.zeros((4, 4), np.uint8)
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def read(self, timeout):
+        time.sleep(self.period)
+        if self.frames is not None and self.count >= self.frames:
+            raise TimeoutError
+        if self.count == 3:
+            self.count += 1
+            return None
+        self.buffer[:] = self.count
+        self.count += 1
+        return self.buffer
+
+
+def test_block_keeps_every_frame():
+    camera = CountingCamera(frames=50)
+    with FrameGrabber(camera, size=4, policy='block', copy=True) as grabber:
+        values = []
+        for frame in grabber:
+            values.append(frame.image[0, 0])
+            time.sleep(1e-3)
+            if len(values) == 49:
+                break
+    assert [i for i in range(50) if i != 3] == values
+    assert not camera.started
+    assert 0 == grabber.stats.dropped
+
+
+def test_drop_oldest():
+    camera = CountingCamera()
+    grabber = FrameGrabber(camera, size=4, copy=True)
+    grabber.start()
+    time.sleep(0.05)
+    grabber.stop()
+
+    stats = grabber.stats
+    assert 4 == stats.queued
+    assert stats.grabbed == stats.dropped + 4
+    frames = [grabber.get(timeout=0) for _ in range(4)]
+    assert [f.index for f in frames] == list(range(stats.grabbed - 4,
+                                                   stats.grabbed))
+    assert grabber.get() is None
+    assert 3 == grabber.stats.late
+
+
+def test_latest():
+    grabber = FrameGrabber(CountingCamera(), policy='latest')
+    assert grabber.latest() is None
+    with grabber:
+        time.sleep(0.02)
+        latest = grabber.latest()
+        frame = grabber.get(timeout=1)
+        assert latest.index <= frame.index
+    assert 1 >= grabber.stats.queued
+
+
+def test_get_timeout():
+    grabber = FrameGrabber(CountingCamera(frames=0), read_timeout=0)
+    with grabber:
+        with pytest.raises(TimeoutError):
+            grabber.get(timeout=0.01)
+
+
+def test_camera_error_reaches_consumer():
+    class BrokenCamera(CountingCamera):
+        def read(self, timeout):
+            raise RuntimeError('unplugged')
+
+    with FrameGrabber(BrokenCamera()) as grabber:
+        with pytest.raises(RuntimeError):
+            grabber.get(timeout=1)
+
+
+def test_stop_unblocks_full_buffer():
+    grabber = FrameGrabber(CountingCamera(), size=2, policy='block')
+    grabber.start()
+    time.sleep(0.02)
+    stopper = threading.Thread(target=grabber.stop)
+    stopper.start()
+    stopper.join(timeout=1)
+    assert not stopper.is_alive()
+    assert not grabber.running
+
+
+def test_stop_keeps_blocked_frame():
+    grabber = FrameGrabber(CountingCamera(), size=2, policy='block',
+                           copy=True)
+    grabber.start()
+    time.sleep(0.02)
+    grabber.stop()
+    assert 3 == grabber.stats.queued
+    assert 0 == grabber.stats.dropped
+    assert [0, 1, 2] == [f.image[0, 0] for f in grabber]
+
+
+def test_restart_starts_over():
+    grabber = FrameGrabber(CountingCamera(), size=4, copy=True)
+    with grabber:
+        time.sleep(0.02)
+    with grabber:
+        frame = grabber.get(timeout=1)
+    assert 0 == frame.index
+    assert grabber.stats.grabbed < 15
+
+
+def test_pooled_frames_go_back_to_the_camera():
+    class PooledCamera(CountingCamera):
+        def __init__(self):
+            super().__init__()
+            self.pool = FramePool(4)
+
+        def read(self, timeout):
+            time.sleep(self.period)
+            image = self.pool.acquire((4, 4), np.uint8, timeout=1)
+            image[:] = self.count
+            self.count += 1
+            return image
+
+        def release(self, image):
+            self.pool.release(image)
+
+    camera = PooledCamera()
+    with FrameGrabber(camera, size=2) as grabber:
+        for _, frame in zip(range(20), grabber):
+            assert frame.index % 256 == frame.image[0, 0]
+            grabber.release(frame)
+    assert grabber.stats.queued == 4 - camera.pool.available
+
+    for frame in list(grabber):
+        grabber.release(frame)
+    assert grabber.latest() is None
+    assert 4 == camera.pool.available
@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+import pytest
+
+from analysis.frame_pipeline import (FramePipeline, blobs, centroid,
+                                     threshold)
+
+
+def spot(row, column, shape=(60, 80), sigma=2.0):
+    y, x = np.indices(shape)
+    image = 200 * np.exp(-((y - row) ** 2 + (x - column) ** 2)
+                         / (2 * sigma ** 2))
+    return image.astype(np.uint8)
+
+
+def fail(image):
+    raise ArithmeticError('bad frame')
+
+
+class UnpicklableError(Exception):
+    def __init__(self, lock):
+        super().__init__('cannot be pickled')
+        self.lock = lock
+
+
+def fail_unpicklable(image):
+    raise UnpicklableError(threading.Lock())
+
+
+def test_stages():
+    image = spot(20, 30)
+    assert (20, 30) == pytest.approx(centroid(image), abs=0.05)
+    assert np.isnan(centroid(np.zeros((4, 4)))[0])
+
+    image[50:54, 70:73] = 255
+    found = blobs(threshold(image, 100))
+    assert 2 == len(found)
+    assert (20, 30) == pytest.approx((found[0]['row'], found[0]['column']))
+    assert 12 == found[1]['area']
+    assert 1 == len(blobs(threshold(image, 100), min_area=13))
+
+
+def test_results_in_order():
+    positions = [(10 + i, 15 + 2 * i) for i in range(12)]
+    with FramePipeline(workers=2, slots=3) as pipeline:
+        pipeline.register(centroid)
+        pipeline.register(threshold, output=False, level=100)
+        pipeline.register(blobs, source='threshold')
+        with pytest.raises(ValueError):
+            pipeline.register(blobs, name='spots', source='mask')
+        for i, position in enumerate(positions):
+            assert i == pipeline.submit(spot(*position), timestamp=i)
+        results = list(pipeline)
+
+    assert list(range(12)) == [r.index for r in results]
+    assert list(range(12)) == [r.timestamp for r in results]
+    for result, position in zip(results, positions):
+        assert {'centroid', 'blobs'} == set(result.results)
+        assert position == pytest.approx(result.results['centroid'], abs=0.05)
+        assert 1 == len(result.results['blobs'])
+    assert pipeline.get() is None
+
+
+def test_latency_stats():
+    with FramePipeline(workers=1) as pipeline:
+        pipeline.register(threshold, name='mask', level=10)
+        for _ in range(5):
+            pipeline.submit(np.zeros((8, 8), np.uint16))
+        list(pipeline.results(timeout=5))
+        stats = pipeline.stats
+        with pytest.raises(RuntimeError):
+            pipeline.register(centroid)
+
+    assert {'queue', 'mask', 'total'} == set(stats)
+    assert all(5 == s.count for s in stats.values())
+    assert stats['mask'].mean <= stats['total'].mean
+    assert stats['total'].mean <= stats['total'].max
+
+
+def test_errors_and_drops():
+    with FramePipeline(workers=1, slots=1, block=False) as pipeline:
+        pipeline.register(fail)
+        indices = [pipeline.submit(np.zeros((4, 4))) for _ in range(3)]
+        assert 0 == indices[0]
+        assert indices.count(None) == pipeline.dropped
+        with pytest.raises(ArithmeticError):
+            pipeline.get(timeout=5)
+        with pytest.raises(ValueError):
+            pipeline.submit(np.zeros((4, 5)))
+
+
+def test_unpicklable_error():
+    with FramePipeline(workers=1) as pipeline:
+        pipeline.register(fail_unpicklable)
+        pipeline.submit(np.zeros((4, 4)))
+        with pytest.raises(RuntimeError, match='UnpicklableError'):
+            pipeline.get(timeout=5)
+
+
+def test_reopen():
+    pipeline = FramePipeline(workers=1)
+    pipeline.register(centroid)
+    pipeline.submit(spot(10, 20))
+    pipeline.submit(spot(10, 20))
+    pipeline.close()
+    assert 0 == pipeline.pending
+
+    assert 0 == pipeline.submit(spot(30, 40))
+    result = pipeline.get(timeout=5)
+    pipeline.close()
+    assert (30, 40) == pytest.approx(result.results['centroid'], abs=0.05)
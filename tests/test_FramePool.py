@@ -0,0 +1,60 @@
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+from hardware.frame_pool import FramePool, SharedFrameRing
+
+
+def test_buffers_are_reused():
+    pool = FramePool(2)
+    first = pool.acquire((4, 6), np.uint8)
+    second = pool.acquire((4, 6), np.uint8)
+    assert first is not second
+    assert 0 == pool.available
+
+    assert pool.release(first)
+    assert first is pool.acquire((4, 6), 'uint8')
+    assert not pool.release(np.empty((4, 6), np.uint8))
+
+
+def test_format_change_drops_old_buffers():
+    pool = FramePool(2)
+    old = pool.acquire((4, 6), np.uint8)
+    pool.release(old)
+    new = pool.acquire((8, 6), np.uint16)
+    assert (8, 6) == new.shape
+    assert np.uint16 == new.dtype
+    assert new is not old
+
+
+def test_acquire_waits_for_release():
+    pool = FramePool(1)
+    frame = pool.acquire((2, 2), np.uint8)
+    with pytest.raises(TimeoutError):
+        pool.acquire((2, 2), np.uint8, timeout=0.01)
+
+    threading.Timer(0.01, pool.release, (frame,)).start()
+    assert frame is pool.acquire((2, 2), np.uint8, timeout=1)
+
+
+def test_shared_ring():
+    returned = queue.Queue()
+    ring = SharedFrameRing(2, (3, 4), np.uint16)
+    other = SharedFrameRing(2, (3, 4), np.uint16, name=ring.name)
+    try:
+        first = ring.put(np.full((3, 4), 7), returned.get)
+        second = ring.put(np.full((3, 4), 9), returned.get)
+        assert {0, 1} == {first, second}
+        assert np.all(9 == other.slots[second])
+        assert ring.put(np.zeros((3, 4)), returned.get, timeout=0.01) is None
+
+        returned.put(first)
+        assert first == ring.put(np.ones((3, 4)), returned.get, block=False)
+        assert np.all(1 == other.slots[first])
+        with pytest.raises(ValueError):
+            ring.check(np.zeros((3, 4), np.uint8), 'test')
+    finally:
+        other.close()
+        ring.close()
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from hardware.dummy_instrument import DummySignalGenerator
+from hardware.instrument_group import InstrumentGroup, diff_snapshots
+
+ch_id = (0, 'carrier')
+
+
+class CountingSignalGenerator(DummySignalGenerator):
+    """Dummy generator that records every attribute write."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def set_channel_attribute(self, channel_id, name, value):
+        super().set_channel_attribute(channel_id, name, value)
+        self.writes.append((channel_id, name, value))
+
+
+@pytest.fixture
+def group():
+    with InstrumentGroup({'sg1': CountingSignalGenerator(),
+                          'sg2': CountingSignalGenerator()}) as group:
+        yield group
+
+
+def test_snapshot(group):
+    """A snapshot holds the details of every channel of every instrument."""
+    group['sg1'].configure_channel(ch_id, frequency=5e3)
+    snapshot = group.snapshot()
+
+    assert ['sg1', 'sg2'] == sorted(snapshot)
+    for name, channels in snapshot.items():
+        instrument = group[name]
+        assert instrument.channel_ids == [c for c, _ in channels]
+        for c, details in channels:
+            assert instrument.channel_details(c) == details
+    assert 5e3 == dict(snapshot['sg1'])[ch_id]['frequency']
+
+
+def test_restore_writes_only_changes(group):
+    """Restoring sends only the attributes that differ."""
+    saved = group.snapshot()
+    group['sg1'].configure_channel(ch_id, frequency=2e4, amplitude=1)
+    group['sg2'].configure_channel('sync', enabled=True)
+    for instrument in group.instruments.values():
+        instrument.writes.clear()
+
+    changes = group.restore(saved)
+
+    assert {'sg1': {ch_id: {'frequency': 1e3, 'amplitude': 0.1}},
+            'sg2': {'sync': {'enabled': False}}} == changes
+    assert [(ch_id, 'frequency', 1e3), (ch_id, 'amplitude', 0.1)] == \
+        group['sg1'].writes
+    assert [('sync', 'enabled', False)] == group['sg2'].writes
+    assert saved == group.snapshot()
+
+
+def test_restore_json_round_trip(group):
+    """Snapshots survive saving as JSON."""
+    group['sg1'].configure_channel(ch_id, shape='square', phase=90)
+    saved = json.loads(json.dumps(group.snapshot()))
+    group['sg1'].configure_channel(ch_id, shape='noise')
+
+    assert {'sg1': {ch_id: {'shape': 'square'}}} == group.restore(saved)
+    assert 'square' == group['sg1'].get_channel(ch_id).shape
+
+
+def test_restore_with_reference(group):
+    """A reference snapshot is used instead of reading the instruments."""
+    current = group.snapshot()
+    target = json.loads(json.dumps(current))
+    for channel_id, details in target['sg2']:
+        if channel_id == 'sync':
+            details['enabled'] = True
+
+    assert {'sg2': {'sync': {'enabled': True}}} == \
+        diff_snapshots(target, current)
+    group.restore(target, reference=current)
+    assert group['sg2'].get_channel('sync').enabled
+    assert [] == group['sg1'].writes
+
+
+def test_failure_names_instrument(group):
+    """Every instrument is handled before the failure is raised."""
+    class BrokenSignalGenerator(CountingSignalGenerator):
+        def channel_details(self, channel_id, attributes=None):
+            raise OSError('unplugged')
+
+    group.instruments['bad'] = BrokenSignalGenerator()
+    saved = group.snapshot(['sg1', 'sg2'])
+    saved['bad'] = saved['sg1']
+
+    with pytest.raises(RuntimeError, match='bad') as info:
+        group.snapshot()
+    assert isinstance(info.value.__cause__, OSError)
+    with pytest.raises(RuntimeError, match='bad'):
+        group.restore(saved)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from analysis.measurements import measure, measure_array
+
+fs = 1e6
+t = np.arange(10000) / fs
+
+
+@pytest.fixture
+def capture():
+    return {0: 0.5 + np.sin(2 * np.pi * 1e3 * t),
+            1: np.clip((t - 2e-3) / 1e-4, 0, 1)}
+
+
+def test_measure_capture(capture):
+    result = measure(capture, fs)
+    assert (2,) == result.shape
+    assert [0, 1] == list(result['channel'])
+
+    sine = result[0]
+    assert 0.5 == pytest.approx(sine['mean'], abs=1e-3)
+    assert np.sqrt(0.75) == pytest.approx(sine['rms'], abs=1e-3)
+    assert 2 == pytest.approx(sine['pk2pk'], abs=1e-3)
+    assert 1e3 == pytest.approx(sine['frequency'], rel=1e-3)
+    assert 2 * np.arcsin(0.8) / (2 * np.pi * 1e3) == \
+        pytest.approx(sine['rise_time'], rel=1e-2)
+
+    ramp = result[1]
+    assert 0.8e-4 == pytest.approx(ramp['rise_time'], rel=1e-6)
+
+
+def test_frequency_with_large_offset():
+    """A DC offset larger than the amplitude does not hide the tone."""
+    result = measure({0: 1.0 + 0.3 * np.sin(2 * np.pi * 1e3 * t),
+                      1: 5 + np.sin(2 * np.pi * 20e3 * t)}, fs, ['frequency'])
+    assert [1e3, 20e3] == pytest.approx(result['frequency'], rel=1e-3)
+
+
+def test_measure_batch(capture):
+    result = measure([capture] * 3, fs, ['mean', 'spectrum'])
+    assert (3, 2) == result.shape
+    assert ('channel', 'mean', 'spectrum') == result.dtype.names
+    assert (5001,) == result['spectrum'].shape[2:]
+    assert 1.0 == pytest.approx(result['spectrum'][0, 0].max(), rel=1e-2)
+
+
+def test_no_edge():
+    """Rise time is NaN when there is no rising edge."""
+    result = measure_array(np.ones((4, 100)), fs, ['rise_time', 'max'])
+    assert np.isnan(result['rise_time']).all()
+    assert (1 == result['max']).all()
+
+
+def test_unknown_measurement():
+    with pytest.raises(KeyError):
+        measure_array(np.ones(10), fs, ['bogus'])
+
+
+@pytest.mark.parametrize('data', [{}, [], [{}]])
+def test_nothing_to_measure(data):
+    with pytest.raises(ValueError, match='No captures'):
+        measure(data, fs)
@@ -0,0 +1,118 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from hardware.frame_grabber import FrameGrabber
+from storage.recorder import Recorder, read_frames
+
+
+def frames(n, shape=(48, 64)):
+    for i in range(n):
+        yield np.full(shape, i, np.uint8)
+
+
+def test_raw_roundtrip(tmp_path):
+    path = str(tmp_path / 'session.raw')
+    with Recorder(path, block=True, slots=4) as recorder:
+        for i, frame in enumerate(frames(20)):
+            assert recorder.write(frame, timestamp=100.0 + i)
+    assert (20, 20, 0, 0) == recorder.stats
+
+    data, timestamps = read_frames(path)
+    assert (20, 48, 64) == data.shape
+    assert data.nbytes == os.path.getsize(path)
+    assert np.arange(20) == pytest.approx(data[:, 0, 0])
+    assert 100.0 + np.arange(20) == pytest.approx(timestamps)
+
+
+def test_append(tmp_path):
+    path = str(tmp_path / 'session.raw')
+    for _ in range(2):
+        with Recorder(path, block=True) as recorder:
+            for frame in frames(5):
+                recorder.write(frame)
+    assert (10, 48, 64) == read_frames(path)[0].shape
+    with pytest.raises(RuntimeError):
+        recorder.write(np.zeros((48, 64), np.uint8))
+
+    with Recorder(path) as recorder:
+        with pytest.raises(ValueError):
+            recorder.write(np.zeros((48, 64), np.uint16))
+    assert (10, 48, 64) == read_frames(path)[0].shape
+
+
+def test_drops_are_counted(tmp_path):
+    recorder = Recorder(str(tmp_path / 'session.raw'), slots=1)
+    results = [recorder.write(frame) for frame in frames(50, (480, 640))]
+    recorder.close()
+
+    stats = recorder.stats
+    assert results[0]
+    assert results.count(False) == stats.dropped
+    assert 50 == stats.recorded + stats.dropped
+    assert stats.recorded == len(read_frames(recorder.path)[0])
+
+
+def test_frame_must_match(tmp_path):
+    with Recorder(str(tmp_path / 'session.raw')) as recorder:
+        recorder.write(np.zeros((4, 4), np.uint8))
+        with pytest.raises(ValueError):
+            recorder.write(np.zeros((4, 5), np.uint8))
+        with pytest.raises(ValueError):
+            recorder.write(np.zeros((4, 4), np.uint16))
+
+
+def test_video(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    path = str(tmp_path / 'session.avi')
+    with Recorder(path, file_format='video', block=True) as recorder:
+        for frame in frames(10, (48, 64, 3)):
+            recorder.write(frame)
+
+    with Recorder(path, file_format='video', block=True) as recorder:
+        for frame in frames(10, (48, 64, 3)):
+            recorder.write(frame)
+
+    capture = cv2.VideoCapture(path)
+    assert 10 == int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    assert 10 == len(np.fromfile(f'{path}.timestamps'))
+    capture.release()
+
+
+def test_video_not_opened(tmp_path):
+    pytest.importorskip('cv2')
+    path = str(tmp_path / 'missing' / 'session.avi')
+    recorder = Recorder(path, file_format='video')
+    with pytest.raises(RuntimeError):
+        recorder.write(np.zeros((48, 64), np.uint8))
+    assert (0, 0, 0, 0) == recorder.stats
+    recorder.close()
+
+
+def test_record_from_grabber(tmp_path):
+    class Camera:
+        def __init__(self):
+            self.count = 0
+
+        def start(self):
+            pass
+
+        def stop(self):
+            pass
+
+        def read(self, timeout):
+            time.sleep(1e-3)
+            self.count += 1
+            return np.full((8, 8), self.count, np.uint16)
+
+    path = str(tmp_path / 'session.raw')
+    with FrameGrabber(Camera()) as grabber, \
+            Recorder(path, block=True) as recorder:
+        recorder.record(grabber, num_frames=25)
+
+    data, timestamps = read_frames(path)
+    assert 25 == len(data)
+    assert np.uint16 == data.dtype
+    assert np.all(np.diff(timestamps) > 0)